@@ -8,11 +8,15 @@ from import_export.admin import ImportExportModelAdmin
 from import_export import resources, fields
 import json
 
+from .autocomplete import MAX_LIMIT as AUTOCOMPLETE_LIMIT, autocomplete
+from .choices import get_model_choices
+
 # Импортируем ВСЕ модели
 from .models import (
     Student, Supervisor, DiplomaProject, Group, GroupOrder,
     OrderTemplate, TemplateSection, GeneratedDocument, 
-    DocumentCollaborator, DocumentHistory,  DiplomaAIAnalysis, PageAIInteraction, AIQuestionBank 
+    DocumentCollaborator, DocumentHistory,  DiplomaAIAnalysis, PageAIInteraction, AIQuestionBank,
+    RenderJob, FileBlob, AnalysisJob, AnalysisResult
 )
 
 # === Ресурсы для импорта/экспорта ===
@@ -59,31 +63,46 @@ class DocumentCollaboratorInline(admin.TabularInline):
     extra = 1
     autocomplete_fields = ['user']
 
+# === Фильтры ===
+
+class CachedRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    """Фильтр по руководителю или группе со списком из кэша (diploma_orders/choices.py)"""
+
+    def field_choices(self, field, request, model_admin):
+        return get_model_choices(field.related_model)
+
 # === Admin классы ===
 
+class PrefixAutocompleteMixin:
+    """Поиск для autocomplete_fields через индекс автодополнения, а не LIKE по таблице"""
+    autocomplete_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        match = request.resolver_match
+        if search_term and match is not None and match.url_name == 'autocomplete':
+            ids = [pk for pk, _ in autocomplete(self.autocomplete_kind, search_term, AUTOCOMPLETE_LIMIT)]
+            return queryset.filter(pk__in=ids), False
+        return super().get_search_results(request, queryset, search_term)
+
+
 @admin.register(Group)
-class GroupAdmin(ImportExportModelAdmin):
+class GroupAdmin(PrefixAutocompleteMixin, ImportExportModelAdmin):
+    autocomplete_kind = 'group'
     resource_class = GroupResource
     list_display = ('name', 'faculty', 'course', 'student_count', 'diploma_count')
     search_fields = ('name', 'faculty')
     list_filter = ('course', 'faculty')
     ordering = ['course', 'name']
 
-    def student_count(self, obj):
-        return obj.students.count()
-    student_count.short_description = "Студентов"
-
-    def diploma_count(self, obj):
-        return obj.students.filter(diploma_project__isnull=False).count()
-    diploma_count.short_description = "Дипломов"
 
 @admin.register(Student)
-class StudentAdmin(ImportExportModelAdmin):
+class StudentAdmin(PrefixAutocompleteMixin, ImportExportModelAdmin):
+    autocomplete_kind = 'student'
     resource_class = StudentResource
     list_display = ('get_photo', 'get_full_name', 'student_id', 'group', 'get_diploma_status', 'get_supervisor')
     list_display_links = ('get_full_name',)
     search_fields = ('last_name', 'first_name', 'patronymic', 'student_id', 'email')
-    list_filter = ('group', 'group__course', 'diploma_project__status')
+    list_filter = (('group', CachedRelatedFieldListFilter), 'group__course', 'diploma_project__status')
     inlines = [DiplomaProjectInline]
     fieldsets = (
         ('Основная информация', {
@@ -124,7 +143,8 @@ class StudentAdmin(ImportExportModelAdmin):
     get_diploma_status.short_description = "Статус диплома"
 
 @admin.register(Supervisor)
-class SupervisorAdmin(ImportExportModelAdmin):
+class SupervisorAdmin(PrefixAutocompleteMixin, ImportExportModelAdmin):
+    autocomplete_kind = 'supervisor'
     resource_class = SupervisorResource
     list_display = ('get_full_name', 'academic_degree', 'position', 'student_count', 'email', 'phone')
     search_fields = ('last_name', 'first_name', 'patronymic', 'email')
@@ -134,15 +154,12 @@ class SupervisorAdmin(ImportExportModelAdmin):
         return obj.get_full_name()
     get_full_name.short_description = "ФИО"
 
-    def student_count(self, obj):
-        return obj.diploma_projects.count()
-    student_count.short_description = "Кол-во студентов"
 
 @admin.register(DiplomaProject)
 class DiplomaProjectAdmin(ImportExportModelAdmin):
     resource_class = DiplomaProjectResource
     list_display = ('topic_short', 'student', 'supervisor', 'status_display', 'registration_date', 'deadline')
-    list_filter = ('supervisor', 'status', 'registration_date', 'deadline')
+    list_filter = (('supervisor', CachedRelatedFieldListFilter), 'status', 'registration_date', 'deadline')
     search_fields = ('topic', 'student__last_name', 'student__first_name')
     autocomplete_fields = ['student', 'supervisor']
 
@@ -158,7 +175,7 @@ class DiplomaProjectAdmin(ImportExportModelAdmin):
 @admin.register(GroupOrder)
 class GroupOrderAdmin(admin.ModelAdmin):
     list_display = ('order_number', 'group', 'order_date', 'study_form', 'direction')
-    list_filter = ('order_date', 'study_form', 'group')
+    list_filter = ('order_date', 'study_form', ('group', CachedRelatedFieldListFilter))
     search_fields = ('order_number', 'group__name', 'direction')
     ordering = ('-order_date',)
 
@@ -216,6 +233,38 @@ class GeneratedDocumentAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(RenderJob)
+class RenderJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'format_type', 'document', 'group_order', 'status', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind', 'format_type', 'created_at')
+    search_fields = ('document__document_number', 'group_order__order_number')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+    ordering = ('-created_at',)
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'diploma_project', 'analysis_type', 'ai_provider', 'status', 'force_refresh', 'created_at', 'finished_at')
+    list_filter = ('status', 'analysis_type', 'ai_provider', 'force_refresh', 'created_at')
+    search_fields = ('diploma_project__topic',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+    ordering = ('-created_at',)
+
+@admin.register(AnalysisResult)
+class AnalysisResultAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'analysis_type', 'ai_provider', 'model', 'prompt_version', 'hits', 'last_used_at')
+    list_filter = ('analysis_type', 'ai_provider', 'model')
+    search_fields = ('sha256',)
+    readonly_fields = ('created_at', 'last_used_at', 'hits')
+    ordering = ('-last_used_at',)
+
+@admin.register(FileBlob)
+class FileBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'pending_refs', 'created_at')
+    search_fields = ('name', 'sha256')
+    # Счетчики ведут сигналы и команда rebuild_blob_refs
+    readonly_fields = ('name', 'sha256', 'size', 'ref_count', 'pending_refs', 'created_at')
+    ordering = ('-created_at',)
+
 @admin.register(DocumentCollaborator)
 class DocumentCollaboratorAdmin(admin.ModelAdmin):
     list_display = ('user', 'document', 'role', 'can_edit', 'is_active')
@@ -2,28 +2,59 @@
 import os
 from datetime import datetime
 
+from .text_cache import get_extracted_text
+from .text_extraction import ExtractionError
+
 class DiplomaAnalyzer:
-    def __init__(self, *args, **kwargs):
-        pass
+    # Входят в ключ кэша результатов (diploma_orders/result_cache.py):
+    # PROMPT_VERSION увеличивается при изменении промптов
+    MODEL = "demo"
+    PROMPT_VERSION = 1
+    
+    def __init__(self, provider="openai", model=None, *args, **kwargs):
+        self.provider = provider
+        self.model = model or self.MODEL
+    
+    def extract_text_from_file(self, file_path):
+        """(текст, метаданные) файла диплома; страницы разделены символом \\f.
+        
+        Текст извлекается один раз на содержимое файла (diploma_orders/text_cache.py).
+        """
+        extracted = get_extracted_text(file_path)
+        return extracted.get_text(), dict(extracted.metadata)
+    
+    def check_format_compliance(self, text, metadata):
+        return {
+            "score": 85,
+            "issues": ["ИИ-анализ в разработке"],
+            "metadata": {"demo": True}
+        }
+    
+    def generate_review(self, text, diploma_data):
+        return {
+            "text": "Демо-режим. Установите библиотеки для полного анализа.",
+            "grade": "хорошо",
+            "generated_at": datetime.now().isoformat()
+        }
+    
+    def generate_page_questions(self, text):
+        return [
+            {"text": "В чем актуальность темы?", "type": "theory"},
+            {"text": "Какие методы использованы?", "type": "methodology"},
+            {"text": "Какие практические результаты?", "type": "practical"}
+        ]
     
     def analyze_diploma(self, file_path, diploma_data):
+        try:
+            text, metadata = self.extract_text_from_file(file_path)
+        except ExtractionError as error:
+            text, metadata = "", {"error": str(error)}
+        metadata["status"] = "demo"
         return {
-            "format_check": {
-                "score": 85,
-                "issues": ["ИИ-анализ в разработке"],
-                "metadata": {"demo": True}
-            },
-            "review": {
-                "text": "Демо-режим. Установите библиотеки для полного анализа.",
-                "grade": "хорошо",
-                "generated_at": datetime.now().isoformat()
-            },
-            "questions": [
-                {"text": "В чем актуальность темы?", "type": "theory"},
-                {"text": "Какие методы использованы?", "type": "methodology"},
-                {"text": "Какие практические результаты?", "type": "practical"}
-            ],
-            "metadata": {"status": "demo"}
+            "format_check": self.check_format_compliance(text, metadata),
+            "review": self.generate_review(text, diploma_data),
+            "questions": self.generate_page_questions(text),
+            "metadata": metadata
         }
 
 class AIChatAssistant:
@@ -0,0 +1,334 @@
+# diploma_orders/analysis_jobs.py
+"""
+Очередь фонового ИИ-анализа дипломов.
+
+View ставят задание (AnalysisJob) и сразу отвечают 202 с его номером;
+задания выполняет команда `manage.py ai_worker` в пуле потоков или
+процессов. Брокер не нужен: очередь - таблица в базе, задания
+захватываются условным UPDATE, поэтому воркеров может быть несколько.
+
+DiplomaAIAnalysis.status дипломного проекта сводится по заданиям всех
+типов (_sync_analysis_status): processing или pending, пока идет или ждет
+задание любого типа, иначе - итог последнего завершенного. Задание одного
+типа не затирает статус другого; статус конкретного задания отдает
+AnalysisJob. Запрос к провайдеру выполняется вне транзакции, и SQLite не
+держит блокировку записи, пока ждет ответа. Результаты анализа файла
+кэшируются (diploma_orders/result_cache.py).
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import result_cache
+from .ai_services import DiplomaAnalyzer
+from .analysis_scheduler import Candidate, schedule
+from .models import AnalysisJob, DiplomaAIAnalysis
+from .text_cache import file_sha256
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'processing')
+
+ANALYSIS_TYPES = [analysis_type for analysis_type, _ in AnalysisJob.ANALYSIS_TYPE_CHOICES]
+
+# Сколько старейших ожидающих заданий рассматривает планировщик за один захват
+SCHEDULER_CANDIDATES = 1000
+
+
+def _find_job(diploma, analysis_type, user, idempotency_key):
+    """Задание, к которому присоединяется запрос: по ключу идемпотентности или активное"""
+    if idempotency_key:
+        job = AnalysisJob.objects.filter(created_by=user, idempotency_key=idempotency_key).first()
+        if job:
+            return job
+    return AnalysisJob.objects.filter(
+        diploma_project=diploma,
+        analysis_type=analysis_type,
+        status__in=ACTIVE_STATUSES,
+    ).first()
+
+
+def job_matches(job, diploma, analysis_type):
+    """Относится ли задание к тому же диплому и типу анализа (иначе Idempotency-Key чужой)"""
+    return (job.diploma_project_id, job.analysis_type) == (diploma.id, analysis_type)
+
+
+def enqueue_analysis(diploma, analysis_type='full', ai_provider='openai', user=None, diploma_file=None,
+                     force_refresh=False, idempotency_key=''):
+    """Поставить анализ в очередь или присоединиться к уже поставленному.
+
+    На диплом выполняется не больше одного задания каждого типа: повторный
+    запрос (двойной клик, несколько вкладок, другой процесс) получает
+    активное задание и дождется его результата. Гарантию дает частичный
+    уникальный индекс analysis_job_single_flight - строка задания служит
+    блокировкой; проигравший гонку запрос ловит IntegrityError и берет
+    задание победителя. Запрос с тем же Idempotency-Key того же
+    пользователя возвращает свое задание и после его завершения; если ключ
+    уже использован для другого диплома или типа анализа, задание
+    возвращается без изменений (view отвечает 422, job_matches).
+
+    diploma_file - загруженный для анализа файл, по умолчанию анализируется
+    файл диплома. Если найденное задание уже выполняется, оно будет
+    выполнено заново по новому файлу. Если результат для файла уже есть в
+    кэше и не задан force_refresh, он сразу копируется в анализ и задание
+    создается выполненным.
+    """
+    user = user if user and user.is_authenticated else None
+    for attempt in range(3):
+        job = _find_job(diploma, analysis_type, user, idempotency_key)
+        if job and not job_matches(job, diploma, analysis_type):
+            return job
+        if job:
+            if diploma_file is not None:
+                # Ожидающее задание проанализирует новый файл; выполняемое увидит
+                # замену при записи результата и вернется в очередь
+                # (process_analysis_job)
+                DiplomaAIAnalysis.objects.update_or_create(
+                    diploma_project=diploma, defaults={'diploma_file': diploma_file}
+                )
+            if force_refresh:
+                AnalysisJob.objects.filter(id=job.id, status='pending').update(force_refresh=True)
+            return job
+
+        try:
+            return _create_job(diploma, analysis_type, ai_provider, user, diploma_file, force_refresh, idempotency_key)
+        except IntegrityError:
+            # Задание одновременно поставил другой запрос
+            if attempt == 2:
+                raise
+
+
+def _create_job(diploma, analysis_type, ai_provider, user, diploma_file, force_refresh, idempotency_key):
+    with transaction.atomic():
+        # Сначала строка задания: INSERT сразу берет блокировку записи (SQLite
+        # ждет ее, а не обрывает транзакцию) и проверяет уникальность
+        job = AnalysisJob.objects.create(
+            diploma_project=diploma,
+            analysis_type=analysis_type,
+            ai_provider=ai_provider,
+            force_refresh=force_refresh,
+            idempotency_key=idempotency_key,
+            created_by=user,
+        )
+        analysis, _ = DiplomaAIAnalysis.objects.update_or_create(
+            diploma_project=diploma,
+            defaults={
+                'ai_provider': ai_provider,
+                'diploma_file': diploma_file or diploma.file.name,
+            }
+        )
+
+        result = None
+        field_file = _analyzed_file(analysis)
+        if not force_refresh and field_file:
+            result = result_cache.lookup(
+                file_sha256(field_file.path), analysis_type, DiplomaAnalyzer(provider=ai_provider)
+            )
+        if result is not None:
+            fields = apply_result(analysis, result)
+            analysis.save(update_fields=fields + ['updated_at'])
+            job.status = 'completed'
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'finished_at'])
+        _sync_analysis_status([diploma.id])
+    return job
+
+
+def _sync_analysis_status(diploma_ids):
+    """Свести DiplomaAIAnalysis.status по заданиям всех типов анализа диплома"""
+    for diploma_id in set(diploma_ids):
+        jobs = AnalysisJob.objects.filter(diploma_project_id=diploma_id)
+        active = set(jobs.filter(status__in=ACTIVE_STATUSES).values_list('status', flat=True))
+        if active:
+            status = 'processing' if 'processing' in active else 'pending'
+        else:
+            status = jobs.exclude(finished_at=None).order_by('-finished_at', '-id').values_list(
+                'status', flat=True
+            ).first()
+            if status is None:
+                continue
+        DiplomaAIAnalysis.objects.filter(diploma_project_id=diploma_id).update(
+            status=status, updated_at=timezone.now()
+        )
+
+
+def claim_jobs(limit):
+    """Захват до `limit` ожидающих заданий (безопасно для нескольких воркеров).
+
+    Порядок определяет планировщик diploma_orders/analysis_scheduler.py:
+    близкий срок сдачи, дешевый тип анализа, справедливость между
+    руководителями.
+    """
+    now = timezone.now()
+    pending = AnalysisJob.objects.filter(status='pending').order_by('created_at').values_list(
+        'id', 'diploma_project__supervisor_id', 'diploma_project__deadline', 'analysis_type', 'created_at',
+        'diploma_project_id',
+    )[:SCHEDULER_CANDIDATES]
+    diploma_ids = {row[0]: row[-1] for row in pending}
+    candidates = [Candidate(*row[:-1]) for row in pending]
+    running = dict(
+        AnalysisJob.objects.filter(status='processing')
+        .values_list('diploma_project__supervisor_id')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+
+    claimed = []
+    # Выбранное задание мог захватить другой воркер - берем следующие по порядку
+    for candidate in schedule(candidates, len(candidates), now, running):
+        if len(claimed) >= limit:
+            break
+        updated = AnalysisJob.objects.filter(id=candidate.id, status='pending').update(
+            status='processing',
+            started_at=timezone.now(),
+        )
+        if updated:
+            _sync_analysis_status([diploma_ids[candidate.id]])
+            claimed.append(candidate.id)
+    return claimed
+
+
+def requeue_stale_jobs(older_than):
+    """Вернуть в очередь задания, зависшие в обработке (например, после падения воркера)"""
+    stale = AnalysisJob.objects.filter(status='processing', started_at__lt=timezone.now() - older_than)
+    diploma_ids = list(stale.values_list('diploma_project_id', flat=True))
+    requeued = stale.update(status='pending', started_at=None)
+    _sync_analysis_status(diploma_ids)
+    return requeued
+
+
+def run_analysis(analysis_type, analyzer, file_path, diploma):
+    """Выполнить анализ типа analysis_type.
+
+    Возвращает нормализованный результат - значения полей DiplomaAIAnalysis,
+    в таком виде он хранится в кэше (diploma_orders/result_cache.py).
+    """
+    diploma_data = {
+        'topic': diploma.topic,
+        'student_name': diploma.student.get_full_name(),
+        'supervisor_name': diploma.supervisor.get_full_name() if diploma.supervisor else 'Не указан'
+    }
+
+    if analysis_type == 'format':
+        text, metadata = analyzer.extract_text_from_file(file_path)
+        format_check = analyzer.check_format_compliance(text, metadata)
+        return {
+            'format_score': format_check['score'],
+            'format_issues': format_check['issues'],
+            'format_metadata': format_check['metadata'],
+            'file_metadata': metadata,
+        }
+
+    if analysis_type == 'review':
+        text, metadata = analyzer.extract_text_from_file(file_path)
+        review = analyzer.generate_review(text, diploma_data)
+        return {
+            'review_text': review['text'],
+            'review_grade': review['grade'],
+            'review_generated_at': timezone.now().isoformat(),
+            'file_metadata': metadata,
+        }
+
+    if analysis_type == 'questions':
+        text, metadata = analyzer.extract_text_from_file(file_path)
+        return {
+            'questions': analyzer.generate_page_questions(text),
+            'file_metadata': metadata,
+        }
+
+    # Полный анализ
+    result = analyzer.analyze_diploma(file_path, diploma_data)
+    format_check = result.get('format_check', {})
+    review = result.get('review', {})
+    return {
+        'format_score': format_check.get('score', 0),
+        'format_issues': format_check.get('issues', []),
+        'format_metadata': format_check.get('metadata', {}),
+        'review_text': review.get('text', ''),
+        'review_grade': review.get('grade', ''),
+        'review_generated_at': timezone.now().isoformat(),
+        'questions': result.get('questions', []),
+        'content_analysis': result.get('content_analysis', {}),
+        'file_metadata': result.get('metadata', {}),
+        'raw_response': result,
+    }
+
+
+def apply_result(analysis, result):
+    """Записать результат анализа в analysis, вернуть список измененных полей"""
+    for field, value in result.items():
+        if field == 'review_generated_at':
+            value = parse_datetime(value)
+        setattr(analysis, field, value)
+    return list(result)
+
+
+def _analyzed_file(analysis):
+    return analysis.diploma_file or analysis.diploma_project.file
+
+
+def process_analysis_job(job_id):
+    """Выполнение одного задания (вызывается в потоке или процессе пула).
+
+    Результат записывается условным UPDATE - только если анализируемый файл
+    не заменили, пока шел анализ. Иначе задание возвращается в очередь и
+    выполняется заново уже по новому файлу.
+    """
+    job = AnalysisJob.objects.get(id=job_id)
+    analysis = DiplomaAIAnalysis.objects.select_related(
+        'diploma_project__student', 'diploma_project__supervisor'
+    ).get(diploma_project_id=job.diploma_project_id)
+    analyzed_name = analysis.diploma_file.name or ''
+
+    try:
+        field_file = _analyzed_file(analysis)
+        if not field_file:
+            raise ValueError('Файл диплома не загружен')
+        analyzer = DiplomaAnalyzer(provider=job.ai_provider)
+        sha256 = file_sha256(field_file.path)
+        result = None if job.force_refresh else result_cache.lookup(sha256, job.analysis_type, analyzer)
+        if result is None:
+            result = run_analysis(job.analysis_type, analyzer, field_file.path, analysis.diploma_project)
+            result_cache.store(sha256, job.analysis_type, analyzer, result)
+        # Несколько заданий одного диплома пишут каждое только свои поля
+        fields = apply_result(analysis, result)
+        job.status = 'completed'
+        job.error = ''
+    except Exception as e:
+        logger.exception('Ошибка ИИ-анализа, задание %s', job_id)
+        fields = ['raw_response']
+        analysis.raw_response = {'error': str(e)}
+        job.status = 'failed'
+        job.error = str(e)
+
+    values = {field: getattr(analysis, field) for field in fields}
+    same_file = Q(diploma_file=analyzed_name)
+    if not analyzed_name:
+        same_file |= Q(diploma_file__isnull=True)
+    updated = DiplomaAIAnalysis.objects.filter(same_file, pk=analysis.pk).update(
+        updated_at=timezone.now(), **values
+    )
+    if not updated:
+        # Файл заменили во время анализа: результат относится к старому файлу
+        AnalysisJob.objects.filter(id=job.id, status='processing').update(status='pending', started_at=None)
+        _sync_analysis_status([job.diploma_project_id])
+        return 'pending'
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    _sync_analysis_status([job.diploma_project_id])
+    return job.status
+
+
+def mark_failed(job_id, error):
+    """Пометить задание как завершившееся ошибкой"""
+    AnalysisJob.objects.filter(id=job_id).update(
+        status='failed',
+        error=error,
+        finished_at=timezone.now(),
+    )
+    diploma_ids = AnalysisJob.objects.filter(id=job_id).values_list('diploma_project_id', flat=True)
+    _sync_analysis_status(list(diploma_ids))
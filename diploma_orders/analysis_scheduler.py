@@ -0,0 +1,71 @@
+# diploma_orders/analysis_scheduler.py
+"""
+Порядок выполнения заданий ИИ-анализа.
+
+Перед защитами в очередь одновременно попадают сотни дипломов, и при
+обработке по порядку постановки студент со сроком сдачи завтра ждет, пока
+обработаются работы со сроком через месяц. Планировщик выбирает задания по
+оценке в часах (меньше - раньше):
+
+    запас до срока сдачи (DiplomaProject.deadline, просроченные - 0)
+    + стоимость типа анализа (короткие проверки не ждут полных анализов)
+    - ожидание в очереди * AGING_FACTOR (дальние сроки тоже доходят до обработки)
+    + FAIRNESS_HOURS * задания руководителя, уже выполняемые или выбранные
+
+Последнее слагаемое не дает пакету одного руководителя занять всех
+воркеров: каждое его задание в работе откладывает следующие на сутки
+запаса, и задания других руководителей с близким сроком идут вперемешку.
+
+Функция schedule не обращается к базе - ее использует и claim_jobs
+(diploma_orders/analysis_jobs.py), и симуляция bench_analysis_scheduler.
+"""
+import heapq
+from collections import Counter, namedtuple
+
+# Стоимость анализа в часах запаса до срока сдачи
+ANALYSIS_COST_HOURS = {
+    'format': 0,
+    'questions': 2,
+    'review': 4,
+    'full': 8,
+}
+
+# Час ожидания в очереди приравнивается к суткам приближения срока
+AGING_FACTOR = 24
+
+FAIRNESS_HOURS = 24
+
+Candidate = namedtuple('Candidate', 'id supervisor_id deadline analysis_type created_at')
+
+
+def priority(candidate, now):
+    """Оценка задания без учета справедливости, часы"""
+    slack = max((candidate.deadline - now.date()).days * 24, 0) if candidate.deadline else 0
+    waited = (now - candidate.created_at).total_seconds() / 3600
+    return slack + ANALYSIS_COST_HOURS.get(candidate.analysis_type, 0) - waited * AGING_FACTOR
+
+
+def schedule(candidates, limit, now, running_by_supervisor=None):
+    """До `limit` кандидатов в порядке выполнения.
+
+    running_by_supervisor - число заданий каждого руководителя, уже
+    выполняемых воркерами.
+    """
+    active = Counter(running_by_supervisor or {})
+    heap = []
+    for candidate in candidates:
+        score = priority(candidate, now)
+        heap.append((score + FAIRNESS_HOURS * active[candidate.supervisor_id], score, candidate.id, candidate))
+    heapq.heapify(heap)
+
+    chosen = []
+    while heap and len(chosen) < limit:
+        key, score, job_id, candidate = heapq.heappop(heap)
+        # Штраф руководителя мог вырасти после того, как задание попало в кучу
+        current = score + FAIRNESS_HOURS * active[candidate.supervisor_id]
+        if current > key:
+            heapq.heappush(heap, (current, score, job_id, candidate))
+            continue
+        chosen.append(candidate)
+        active[candidate.supervisor_id] += 1
+    return chosen
@@ -4,4 +4,9 @@ from django.apps import AppConfig
 class DiplomaOrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'diploma_orders'
-    
\ No newline at end of file
+
+    def ready(self):
+        # Счетчики групп и руководителей, поисковый индекс, автодополнение,
+        # кэш списков выбора, снимок главной страницы, фасеты, ссылки на
+        # файлы хранилища и извлеченный текст (diploma_orders/signals.py)
+        from . import signals  # noqa: F401
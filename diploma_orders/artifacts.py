@@ -0,0 +1,111 @@
+# diploma_orders/artifacts.py
+"""
+Кэш готовых файлов сгенерированных документов.
+
+Файл хранится в полях html_file/docx_file/pdf_file под именем, равным
+хэшу исходных данных рендера (содержимое, данные, версия шаблона, формат).
+Пока хэш совпадает, файл отдается без повторной генерации.
+"""
+import hashlib
+import json
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+
+from .models import GeneratedDocument
+
+# Поле GeneratedDocument для каждого формата
+DOCUMENT_FILE_FIELDS = {
+    'html': 'html_file',
+    'docx': 'docx_file',
+    'pdf': 'pdf_file',
+}
+
+# Увеличивается при изменении рендереров, чтобы сбросить старые файлы
+RENDERER_VERSION = 3
+
+
+def artifact_key(document, format_type):
+    """Хэш всех данных, от которых зависит результат рендера"""
+    template = document.template
+    template_version = None
+    if template:
+        template_version = [
+            template.pk,
+            template.updated_at.isoformat() if template.updated_at else None,
+            template.docx_template.name if template.docx_template else None,
+        ]
+
+    payload = json.dumps([
+        RENDERER_VERSION,
+        format_type,
+        document.content,
+        document.document_data,
+        document.document_number,
+        document.document_date.isoformat(),
+        template_version,
+    ], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_document_artifact(document, format_type):
+    """Готовый файл документа или None, если его нужно сгенерировать"""
+    field_file = getattr(document, DOCUMENT_FILE_FIELDS[format_type])
+    if not field_file:
+        return None
+    if not field_file.storage.exists(field_file.name):
+        return None
+
+    # Зафиксированные документы отдаем как есть
+    if document.is_frozen():
+        return field_file
+
+    if document.artifact_keys.get(format_type) != artifact_key(document, format_type):
+        return None
+    return field_file
+
+
+def store_document_artifact(document, format_type, data, key=None):
+    """Записать файл в поле документа под именем-хэшем, не меняя updated_at.
+
+    data - байты или File (например, временный файл рендера).
+    """
+    field_name = DOCUMENT_FILE_FIELDS[format_type]
+    field_file = getattr(document, field_name)
+    old_name = field_file.name
+    key = key or artifact_key(document, format_type)
+
+    name = field_file.field.generate_filename(document, f'{key}.{format_type}')
+    if field_file.storage.exists(name):
+        field_file.name = name
+    else:
+        content = data if isinstance(data, File) else ContentFile(data)
+        field_file.save(f'{key}.{format_type}', content, save=False)
+
+    document.artifact_keys = {**document.artifact_keys, format_type: key}
+    GeneratedDocument.objects.filter(pk=document.pk).update(**{
+        field_name: field_file.name,
+        'artifact_keys': document.artifact_keys,
+    })
+
+    if old_name and old_name != field_file.name:
+        field_file.storage.delete(old_name)
+    return field_file
+
+
+def invalidate_document_artifacts(document):
+    """Удалить готовые файлы документа (после изменения содержимого)"""
+    if document.is_frozen():
+        return
+
+    updates = {}
+    for field_name in DOCUMENT_FILE_FIELDS.values():
+        field_file = getattr(document, field_name)
+        if field_file:
+            field_file.delete(save=False)
+            updates[field_name] = None
+
+    if updates or document.artifact_keys:
+        document.artifact_keys = {}
+        updates['artifact_keys'] = {}
+        GeneratedDocument.objects.filter(pk=document.pk).update(**updates)
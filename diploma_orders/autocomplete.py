@@ -0,0 +1,244 @@
+# diploma_orders/autocomplete.py
+"""
+Автодополнение студентов, руководителей и групп.
+
+Для каждого вида записей в процессе хранится отсортированный массив ключей
+(нормализованное ФИО, номер студбилета, название группы). Поиск по префиксу -
+двоичный поиск и проход по соседним ключам, без запросов к базе.
+
+Индекс строится в фоновом потоке при первом обращении (пока он строится,
+запросы получают пустой ответ с ready=False) и обновляется сигналами
+сохранения и удаления моделей (diploma_orders/signals.py). Изменения,
+сделанные в других процессах, сигналы не видят, поэтому индекс старше
+AUTOCOMPLETE_INDEX_TTL секунд тоже перестраивается в фоне. Изменения,
+пришедшие во время перестройки, записываются в журнал и применяются к новому
+индексу после загрузки, чтобы загрузка не затерла их. При
+AUTOCOMPLETE_BACKGROUND_BUILD = False индекс строится в самом запросе.
+"""
+import bisect
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .search import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Разделитель ключа и id записи (меньше любого печатного символа)
+KEY_SEPARATOR = '\x00'
+
+DEFAULT_INDEX_TTL = 300
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+class PrefixIndex:
+    """Отсортированный массив ключей вида «ключ\\x00id» с подписями записей"""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.keys = []
+        self.records = {}
+        self.built_at = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        # Изменения, пришедшие во время перестройки: (id, подпись, ключи), ключи None - удаление
+        self._journal = None
+
+    @staticmethod
+    def _make_keys(pk, keys):
+        return {f'{normalize_text(key)}{KEY_SEPARATOR}{pk}' for key in keys if key}
+
+    def _is_stale(self):
+        ttl = getattr(settings, 'AUTOCOMPLETE_INDEX_TTL', DEFAULT_INDEX_TTL)
+        return time.monotonic() - self.built_at > ttl
+
+    def rebuild(self):
+        """Полная загрузка из базы"""
+        with self._lock:
+            self._journal = []
+        try:
+            keys = []
+            records = {}
+            for pk, label, record_keys in self.loader():
+                entry_keys = self._make_keys(pk, record_keys)
+                records[pk] = (label, entry_keys)
+                keys.extend(entry_keys)
+            keys.sort()
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self.keys = keys
+            self.records = records
+            self.built_at = time.monotonic()
+            for pk, label, record_keys in journal:
+                self._apply_locked(pk, label, record_keys)
+
+    def _refresh_in_background(self):
+        """Перестроить индекс в отдельном потоке; пока - отвечать по старому"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            try:
+                self.rebuild()
+            except Exception:
+                logger.exception('Не удалось перестроить индекс автодополнения')
+            finally:
+                self._refreshing = False
+                connection.close()
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    @property
+    def ready(self):
+        return self.built_at is not None
+
+    def update(self, pk, label, keys):
+        """Добавить или заменить запись (если индекс построен или строится)"""
+        with self._lock:
+            self._apply_locked(pk, label, keys)
+
+    def remove(self, pk):
+        with self._lock:
+            self._apply_locked(pk, None, None)
+
+    def _apply_locked(self, pk, label, keys):
+        if self._journal is not None:
+            self._journal.append((pk, label, keys))
+        if self.built_at is None:
+            return
+        self._remove_locked(pk)
+        if keys is not None:
+            entry_keys = self._make_keys(pk, keys)
+            self.records[pk] = (label, entry_keys)
+            for key in entry_keys:
+                bisect.insort(self.keys, key)
+
+    def _remove_locked(self, pk):
+        record = self.records.pop(pk, None)
+        if record is None:
+            return
+        for key in record[1]:
+            index = bisect.bisect_left(self.keys, key)
+            if index < len(self.keys) and self.keys[index] == key:
+                del self.keys[index]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """До limit записей [(id, подпись)], у которых ключ начинается с query"""
+        prefix = normalize_text(query).strip()
+        if not prefix:
+            return []
+        if self.built_at is None:
+            if getattr(settings, 'AUTOCOMPLETE_BACKGROUND_BUILD', True):
+                self._refresh_in_background()
+                return []
+            self.rebuild()
+        elif self._is_stale():
+            self._refresh_in_background()
+
+        results = []
+        seen = set()
+        with self._lock:
+            keys = self.keys
+            index = bisect.bisect_left(keys, prefix)
+            while index < len(keys) and len(results) < limit:
+                key = keys[index]
+                if not key.startswith(prefix):
+                    break
+                pk = int(key.rpartition(KEY_SEPARATOR)[2])
+                if pk not in seen:
+                    seen.add(pk)
+                    results.append((pk, self.records[pk][0]))
+                index += 1
+        return results
+
+
+def student_entry(pk, last_name, first_name, patronymic, student_id):
+    """(id, подпись, ключи) студента"""
+    full_name = ' '.join(part for part in (last_name, first_name, patronymic) if part)
+    return pk, f'{full_name} ({student_id})', (full_name, student_id)
+
+
+def supervisor_entry(pk, last_name, first_name, patronymic):
+    full_name = f'{last_name} {first_name} {patronymic}'
+    return pk, full_name, (full_name,)
+
+
+def group_entry(pk, name):
+    return pk, name, (name,)
+
+
+STUDENT_FIELDS = ('id', 'last_name', 'first_name', 'patronymic', 'student_id')
+SUPERVISOR_FIELDS = ('id', 'last_name', 'first_name', 'patronymic')
+GROUP_FIELDS = ('id', 'name')
+
+
+def _load_students():
+    from .models import Student
+    for row in Student.objects.order_by().values_list(*STUDENT_FIELDS).iterator(chunk_size=5000):
+        yield student_entry(*row)
+
+
+def _load_supervisors():
+    from .models import Supervisor
+    for row in Supervisor.objects.order_by().values_list(*SUPERVISOR_FIELDS):
+        yield supervisor_entry(*row)
+
+
+def _load_groups():
+    from .models import Group
+    for row in Group.objects.order_by().values_list(*GROUP_FIELDS):
+        yield group_entry(*row)
+
+
+INDEXES = {
+    'student': PrefixIndex(_load_students),
+    'supervisor': PrefixIndex(_load_supervisors),
+    'group': PrefixIndex(_load_groups),
+}
+
+
+def autocomplete(kind, query, limit=DEFAULT_LIMIT):
+    """Подсказки [(id, подпись)] для вида записей kind"""
+    return INDEXES[kind].search(query, min(max(limit, 1), MAX_LIMIT))
+
+
+def is_index_ready(kind):
+    """Построен ли индекс (до этого autocomplete отвечает пустым списком)"""
+    return INDEXES[kind].ready
+
+
+def update_student(student):
+    INDEXES['student'].update(*student_entry(*(getattr(student, name) for name in STUDENT_FIELDS)))
+
+
+def update_supervisor(supervisor):
+    INDEXES['supervisor'].update(*supervisor_entry(*(getattr(supervisor, name) for name in SUPERVISOR_FIELDS)))
+
+
+def update_group(group):
+    INDEXES['group'].update(*group_entry(*(getattr(group, name) for name in GROUP_FIELDS)))
+
+
+def remove(model, pk):
+    """Удалить запись модели model из индекса"""
+    INDEXES[model._meta.model_name].remove(pk)
+
+
+def reset_indexes():
+    """Сбросить индексы (перестроятся при следующем запросе)"""
+    for index in INDEXES.values():
+        with index._lock:
+            index.keys = []
+            index.records = {}
+            index.built_at = None
@@ -0,0 +1,276 @@
+# diploma_orders/blobs.py
+"""
+Хранилище файлов дипломов с адресацией по содержимому.
+
+Файл сохраняется под именем из SHA-256 содержимого
+(blobs/ab/<sha256>.pdf), поэтому повторная загрузка того же файла - тем же
+студентом еще раз или для анализа ИИ - не создает новую копию. Хэш
+читается из имени (sha256_of_name), на нем строятся ETag и кэши.
+
+Каждому файлу соответствует запись FileBlob со счетчиком ссылок из полей
+BLOB_FIELDS. Счетчики меняются сигналами (diploma_orders/signals.py) в той
+же транзакции, что и сама ссылка; когда уходит последняя ссылка, запись
+удаляется, а файл - после фиксации транзакции. Команда rebuild_blob_refs
+пересчитывает счетчики по базе, удаляет файлы без ссылок и переносит в
+хранилище файлы, загруженные до него.
+
+Ссылка появляется только в post_save модели, уже после того как save
+хранилища увидел, что файл есть, и не стал его записывать. Чтобы
+параллельное удаление последней ссылки не удалило файл в этом окне, save
+сначала увеличивает FileBlob.pending_refs (в одной транзакции с проверкой
+наличия), а acquire переводит это сохранение в ссылку. Отметка живет не
+дольше сохранения модели (BlobReferencesMixin, pin_scope): если модель не
+сохранилась или не сослалась на файл, отметка снимается. Удаление файла
+занимает имя вставкой записи FileBlob: сохранение того же файла ждет
+фиксации удаления и записывает файл заново, а удаление, не сумевшее
+вставить запись, файл не трогает.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+# Каталог хранилища внутри MEDIA_ROOT (upload_to полей с этим хранилищем)
+BLOB_PREFIX = 'blobs/'
+
+# (модель, поле) - ссылки на файлы хранилища
+BLOB_FIELDS = (
+    ('DiplomaProject', 'file'),
+    ('DiplomaAIAnalysis', 'diploma_file'),
+)
+
+HASH_BLOCK_SIZE = 64 * 1024
+
+# blobs/ab/<sha256>.ext: только в каталоге хранилища и в подкаталоге по началу хэша
+BLOB_NAME_RE = re.compile(rf'^{re.escape(BLOB_PREFIX)}([0-9a-f]{{2}})/(\1[0-9a-f]{{62}})(?:\.\w+)?$')
+
+
+def content_sha256(content):
+    """SHA-256 содержимого файла (File), читается блоками"""
+    hasher = hashlib.sha256()
+    for chunk in content.chunks(HASH_BLOCK_SIZE):
+        hasher.update(chunk.encode() if isinstance(chunk, str) else chunk)
+    return hasher.hexdigest()
+
+
+def blob_name(directory, sha256, extension=''):
+    return f'{directory.rstrip("/")}/{sha256[:2]}/{sha256}{extension.lower()}'
+
+
+def sha256_of_name(name):
+    """Хэш содержимого по имени файла хранилища; None для файлов вне хранилища"""
+    match = BLOB_NAME_RE.match(name or '')
+    return match.group(2) if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, где имя файла - хэш его содержимого.
+
+    Каталог берется из имени, предложенного полем (upload_to), расширение -
+    из исходного имени файла. Если такой файл уже есть, он не записывается
+    повторно. Хэш можно передать заранее атрибутом sha256 у content.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        sha256 = getattr(content, 'sha256', None) or content_sha256(content)
+        name = blob_name(os.path.dirname(name) or BLOB_PREFIX, sha256, os.path.splitext(name)[1])
+        with transaction.atomic():
+            # Сохранение учитывается до проверки наличия файла
+            pin(name, content.size)
+            if not self.exists(name):
+                name = super().save(name, content, max_length)
+        _pending_names()[name] += 1
+        if getattr(_pending, 'depth', 0):
+            _pending.scoped[name] += 1
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # Одно имя - одно содержимое, суффиксы не нужны
+        return name
+
+    def _save(self, name, content):
+        # Пишем во временный файл и переименовываем: параллельная загрузка
+        # того же содержимого или чтение не увидят недописанный файл
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk.encode() if isinstance(chunk, str) else chunk)
+            os.chmod(temp_name, self.file_permissions_mode or 0o644)
+            os.replace(temp_name, full_path)
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
+        return name
+
+
+blob_storage = ContentAddressedStorage()
+
+# Имена, сохраненные в этом потоке, но еще не учтенные как ссылки
+_pending = threading.local()
+
+
+def _pending_names():
+    names = getattr(_pending, 'names', None)
+    if names is None:
+        names = _pending.names = Counter()
+    return names
+
+
+def _unpin(names):
+    """Снять отметки сохранения {имя: число}, не ставшие ссылками"""
+    from .models import FileBlob
+
+    for name, count in names.items():
+        FileBlob.objects.filter(name=name).update(pending_refs=Greatest(F('pending_refs') - count, 0))
+
+
+@contextmanager
+def pin_scope():
+    """Блок сохранения модели: отметки сохранения файлов не переживают его.
+
+    Сохранения файлов в хранилище до блока (FieldFile.save перед
+    instance.save) и внутри него должны стать ссылками в post_save. Если
+    блок завершился, а ссылки нет, отметка снимается; если блок упал,
+    отметки внутри него откатываются вместе с его транзакцией, сделанные до
+    него снимаются, а записанный в блоке файл удаляется, если на него нет
+    ссылок. Вложенные блоки работают как внешний.
+    """
+    if getattr(_pending, 'depth', 0):
+        _pending.depth += 1
+        try:
+            yield
+        finally:
+            _pending.depth -= 1
+        return
+
+    names = _pending_names()
+    # Откат блока откатывает и acquire, поэтому сделанные до него отметки снова все на месте
+    earlier = Counter(names)
+    _pending.depth = 1
+    _pending.scoped = Counter()
+    try:
+        with transaction.atomic():
+            yield
+            _unpin(names)
+    except BaseException:
+        if not transaction.get_connection().needs_rollback:
+            _unpin(earlier)
+        for name in _pending.scoped:
+            transaction.on_commit(lambda name=name: delete_if_unreferenced(name))
+        raise
+    finally:
+        names.clear()
+        _pending.depth = 0
+        _pending.scoped = None
+
+
+class BlobReferencesMixin:
+    """Модель со ссылками на файлы хранилища (BLOB_FIELDS): сохранение в pin_scope"""
+
+    def save(self, *args, **kwargs):
+        with pin_scope():
+            super().save(*args, **kwargs)
+
+
+def _take_pending(name):
+    """Было ли имя сохранено в этом потоке (и снять отметку)"""
+    names = _pending_names()
+    if not names[name]:
+        return False
+    names[name] -= 1
+    if not names[name]:
+        del names[name]
+    return True
+
+
+def blob_references():
+    """[(модель, поле)] ссылок на файлы хранилища"""
+    from django.apps import apps
+
+    return [(apps.get_model('diploma_orders', model), field) for model, field in BLOB_FIELDS]
+
+
+def _upsert(name, size, changes, initial):
+    """UPDATE записи name, а если ее нет - INSERT (как в diploma_orders/text_cache.py)"""
+    from .models import FileBlob
+
+    if FileBlob.objects.filter(name=name).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            FileBlob.objects.create(name=name, sha256=sha256_of_name(name), size=size, **initial)
+    except IntegrityError:
+        # Запись параллельно создал другой запрос
+        FileBlob.objects.filter(name=name).update(**changes)
+
+
+def pin(name, size=0):
+    """Учесть сохранение файла name, пока оно не стало ссылкой"""
+    if sha256_of_name(name):
+        _upsert(name, size, {'pending_refs': F('pending_refs') + 1}, {'pending_refs': 1})
+
+
+def acquire(name):
+    """Учесть новую ссылку на файл хранилища name"""
+    if not sha256_of_name(name):
+        return
+    try:
+        size = blob_storage.size(name)
+    except OSError:
+        size = 0
+    changes = {'ref_count': F('ref_count') + 1}
+    if _take_pending(name):
+        changes['pending_refs'] = Greatest(F('pending_refs') - 1, 0)
+    _upsert(name, size, changes, {'ref_count': 1})
+
+
+def settle(name):
+    """Сохраненный заново файл уже был ссылкой этой записи - снять отметку сохранения"""
+    from .models import FileBlob
+
+    if _take_pending(name):
+        FileBlob.objects.filter(name=name).update(pending_refs=Greatest(F('pending_refs') - 1, 0))
+
+
+def release(name):
+    """Снять ссылку на файл name; после последней файл удаляется"""
+    from .models import FileBlob
+
+    if not sha256_of_name(name):
+        return
+    FileBlob.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+    deleted, _ = FileBlob.objects.filter(name=name, ref_count=0, pending_refs=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: delete_if_unreferenced(name))
+
+
+def delete_if_unreferenced(name):
+    """Удалить файл хранилища, если на него нет ссылок"""
+    from .models import FileBlob
+
+    try:
+        with transaction.atomic():
+            # Запись-блокировка имени: не вставится, если файл снова сохраняют или на него есть ссылка
+            lock = FileBlob.objects.create(name=name, sha256=sha256_of_name(name) or '')
+            blob_storage.delete(name)
+            FileBlob.objects.filter(pk=lock.pk).delete()
+    except IntegrityError:
+        pass
@@ -0,0 +1,113 @@
+# diploma_orders/bulk_orders.py
+"""
+Массовая генерация приказов по группам в ZIP-архив.
+
+Архив пишется в файл по мере рендера: в памяти одновременно находится лишь
+ограниченное окно приказов. Из веба архив собирается заданием RenderJob
+(diploma_orders/render_jobs.py) и отдается только целиком - ошибка рендера
+завершает задание ошибкой, а не обрывает скачивание. И задание, и команда
+bulk_group_orders рендерят приказы параллельно в пуле процессов.
+"""
+import zipfile
+from collections import deque
+
+from django.db import connections
+from django.db.models import OuterRef, Subquery
+
+from .models import GroupOrder
+from .renderers import group_order_filename, render_group_order_docx
+from .workers import create_process_pool
+
+ZIP_CONTENT_TYPE = 'application/zip'
+
+
+def select_group_orders(course=None, faculty=None, latest_only=True):
+    """Приказы по группам с фильтром по курсу/факультету.
+
+    По умолчанию берется последний приказ каждой группы.
+    """
+    orders = GroupOrder.objects.select_related('group')
+    if course:
+        orders = orders.filter(group__course=course)
+    if faculty:
+        orders = orders.filter(group__faculty=faculty)
+
+    if latest_only:
+        # Последний по дате приказ группы; при равных датах - созданный позже
+        latest = (
+            GroupOrder.objects.filter(group=OuterRef('group'))
+            .order_by('-order_date', '-id')
+            .values('id')[:1]
+        )
+        orders = orders.filter(id=Subquery(latest))
+
+    return list(orders.order_by('group__course', 'group__name', '-order_date'))
+
+
+def render_order_file(order_id):
+    """Рендер одного приказа в процессе пула: (имя файла, байты)"""
+    try:
+        order = GroupOrder.objects.select_related('group').get(id=order_id)
+        return group_order_filename(order), render_group_order_docx(order)
+    finally:
+        connections.close_all()
+
+
+def render_orders(order_ids, processes=1):
+    """Генератор (имя файла, байты) в исходном порядке приказов.
+
+    При processes > 1 приказы рендерятся в пуле процессов, одновременно в
+    работе не больше 2 * processes приказов, поэтому память не растет с
+    количеством групп.
+    """
+    if processes <= 1:
+        orders = GroupOrder.objects.select_related('group').in_bulk(order_ids)
+        for order_id in order_ids:
+            order = orders[order_id]
+            yield group_order_filename(order), render_group_order_docx(order)
+        return
+
+    window = processes * 2
+    order_ids = iter(order_ids)
+
+    with create_process_pool(processes) as pool:
+        pending = deque()
+        for order_id in order_ids:
+            pending.append(pool.submit(render_order_file, order_id))
+            if len(pending) >= window:
+                break
+
+        while pending:
+            yield pending.popleft().result()
+            next_id = next(order_ids, None)
+            if next_id is not None:
+                pending.append(pool.submit(render_order_file, next_id))
+
+
+def unique_name(name, used_names, counters):
+    """Имя файла, еще не занятое в архиве (приказ_1.docx -> приказ_1_2.docx)"""
+    base, dot, ext = name.rpartition('.')
+    if not dot:
+        base = name
+    candidate = name
+    while candidate in used_names:
+        counters[name] = counters.get(name, 1) + 1
+        candidate = f'{base}_{counters[name]}{dot}{ext}'
+    used_names.add(candidate)
+    return candidate
+
+
+def write_zip(entries, output):
+    """ZIP из итератора (имя, байты) в файловый объект output"""
+    used_names = set()
+    counters = {}
+
+    # DOCX уже сжат, поэтому файлы кладем без сжатия
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, data in entries:
+            archive.writestr(unique_name(name, used_names, counters), data)
+
+
+def write_group_orders_zip(orders, output, processes=1):
+    """ZIP-архив с DOCX всех переданных приказов"""
+    write_zip(render_orders([order.id for order in orders], processes), output)
@@ -0,0 +1,84 @@
+# diploma_orders/choices.py
+"""
+Кэш списков выбора: руководители, группы, статусы ВКР.
+
+Списки (id, подпись) хранятся в кэше Django под ключом с номером версии.
+Сигналы сохранения и удаления руководителей и групп увеличивают версию
+(diploma_orders/signals.py), и следующий запрос строит список заново.
+Формы, список студентов, главная страница и фильтры админки берут списки
+отсюда и на прогретом кэше не обращаются к базе.
+
+Версия видна всем процессам только при общем для них бэкенде кэша (CACHES в
+core/settings.py); с LocMemCache у каждого процесса своя версия, и список
+обновляется в других процессах лишь через CHOICES_CACHE_TIMEOUT.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+CACHE_PREFIX = 'diploma_orders:choices'
+
+# Время жизни списка в кэше, секунд (обычно сбрасывается раньше - сменой версии)
+DEFAULT_CHOICES_TIMEOUT = 24 * 60 * 60
+
+
+def _choice_models():
+    from .models import Group, Supervisor
+    return {'supervisor': Supervisor, 'group': Group}
+
+
+def _version_key(kind):
+    return f'{CACHE_PREFIX}:{kind}:version'
+
+
+def _get_version(kind):
+    key = _version_key(kind)
+    version = cache.get(key)
+    if version is None:
+        # Начальная версия по времени, чтобы не совпасть со списком до вытеснения ключа версии
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _build_choices(kind):
+    if kind == 'status':
+        from .models import DiplomaProject
+        return list(DiplomaProject.STATUS_CHOICES)
+    model = _choice_models()[kind]
+    return [(obj.pk, str(obj)) for obj in model.objects.all()]
+
+
+def get_choices(kind):
+    """Список [(id, подпись)] для kind: 'supervisor', 'group' или 'status'"""
+    key = f'{CACHE_PREFIX}:{kind}:{_get_version(kind)}'
+    choices = cache.get(key)
+    if choices is None:
+        choices = _build_choices(kind)
+        timeout = getattr(settings, 'CHOICES_CACHE_TIMEOUT', DEFAULT_CHOICES_TIMEOUT)
+        cache.set(key, choices, timeout=timeout)
+    return choices
+
+
+def get_choice_label(kind, value):
+    """Подпись значения value из списка kind (None, если его нет)"""
+    value = str(value)
+    for choice_value, label in get_choices(kind):
+        if str(choice_value) == value:
+            return label
+    return None
+
+
+def get_model_choices(model):
+    """Список выбора для модели (руководитель или группа)"""
+    return get_choices(model._meta.model_name)
+
+
+def invalidate_choices(kind):
+    """Сменить версию списка kind"""
+    key = _version_key(kind)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
@@ -0,0 +1,220 @@
+# diploma_orders/chunked_upload.py
+"""
+Загрузка файлов дипломов по частям с докачкой.
+
+Протокол:
+1. init - клиент сообщает имя, размер (и при желании SHA-256) файла,
+   получает id загрузки (UploadSession);
+2. PUT части с заголовком Upload-Offset - байты сразу пишутся во временный
+   файл на диске с этого смещения; смещение должно совпадать с уже
+   полученным, иначе 409 и текущее смещение для продолжения;
+3. finalize - после получения всех байт файл проверяется и прикрепляется
+   к DiplomaProject.file (в хранилище с адресацией по содержимому,
+   diploma_orders/blobs.py, уже посчитанный хэш передается ему).
+
+Лимит MAX_UPLOAD_SIZE проверяется при init и по мере поступления байт.
+Часть пишется под исключительной блокировкой временного файла (между
+процессами), а смещение проверяется заново уже под ней: два PUT с одним
+смещением не пишут в файл одновременно, второй получает 409. SHA-256
+считается при finalize по самому временному файлу - он всегда соответствует
+тому, что будет сохранено.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from .blobs import content_sha256, delete_if_unreferenced
+from .models import DiplomaProject, UploadSession
+
+# Расширения, разрешенные для файла диплома
+ALLOWED_EXTENSIONS = ['.pdf', '.docx', '.doc', '.txt', '.jpg', '.jpeg', '.png']
+
+DEFAULT_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+# Рекомендуемый клиенту размер части
+CHUNK_SIZE = 1024 * 1024
+
+# Блок чтения тела запроса
+READ_BLOCK_SIZE = 64 * 1024
+
+OFFSET_HEADER = 'Upload-Offset'
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class UploadError(Exception):
+    """Ошибка загрузки с HTTP-статусом для ответа"""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def max_upload_size():
+    return getattr(settings, 'MAX_UPLOAD_SIZE', DEFAULT_MAX_UPLOAD_SIZE)
+
+
+def upload_dir():
+    path = getattr(settings, 'CHUNKED_UPLOAD_DIR', None) or os.path.join(
+        tempfile.gettempdir(), 'diploma_orders_uploads'
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def temp_path(session):
+    return os.path.join(upload_dir(), f'{session.pk}.part')
+
+
+def validate_upload(filename, size):
+    """Проверка имени и заявленного размера файла"""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise UploadError(f"Неподдерживаемый формат. Разрешенные форматы: {', '.join(ALLOWED_EXTENSIONS)}")
+    limit = max_upload_size()
+    if size <= 0:
+        raise UploadError('Пустой файл')
+    if size > limit:
+        raise UploadError(
+            f'Файл слишком большой. Максимальный размер: {limit // 1024 // 1024}MB', status=413
+        )
+
+
+def start_upload(diploma, user, filename, size, sha256=''):
+    """Создать загрузку и пустой временный файл"""
+    filename = os.path.basename(filename or '')
+    validate_upload(filename, size)
+    session = UploadSession.objects.create(
+        diploma_project=diploma,
+        user=user if user and user.is_authenticated else None,
+        filename=filename,
+        size=size,
+        expected_sha256=(sha256 or '').lower(),
+    )
+    open(temp_path(session), 'wb').close()
+    return session
+
+
+def _lock_file(file):
+    """Неблокирующая исключительная блокировка файла; False, если он занят"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+@contextmanager
+def _locked_temp_file(session):
+    """Временный файл загрузки, открытый на запись под блокировкой"""
+    with open(temp_path(session), 'r+b') as file:
+        if not _lock_file(file):
+            raise UploadError('Часть уже принимается параллельным запросом', status=409, offset=session.offset)
+        # Блокировка снимается при закрытии файла
+        yield file
+
+
+def write_chunk(session, offset, stream, content_length=None):
+    """Записать часть из потока stream со смещения offset, вернуть новое смещение"""
+    with _locked_temp_file(session) as file:
+        # Под блокировкой - смещение, которое зафиксировала предыдущая часть
+        session.refresh_from_db(fields=['offset', 'status'])
+        if session.status != 'active':
+            raise UploadError('Загрузка уже завершена', status=409, offset=session.offset)
+        if offset != session.offset:
+            raise UploadError('Неверное смещение части', status=409, offset=session.offset)
+        if content_length is not None and offset + content_length > session.size:
+            raise UploadError('Часть выходит за заявленный размер файла', status=413, offset=session.offset)
+
+        position = offset
+        file.seek(offset)
+        while True:
+            block = stream.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            position += len(block)
+            # Лимит проверяется по мере поступления, а не после приема всего тела
+            if position > session.size:
+                file.truncate(offset)
+                raise UploadError('Часть выходит за заявленный размер файла', status=413, offset=offset)
+            file.write(block)
+        file.truncate(position)
+
+        updated = UploadSession.objects.filter(pk=session.pk, offset=offset, status='active').update(offset=position)
+        if not updated:
+            # Загрузку успели завершить или отменить
+            raise UploadError('Загрузка уже завершена', status=409, offset=offset)
+
+    session.offset = position
+    return position
+
+
+def finish_upload(session):
+    """Проверить полученный файл и прикрепить его к дипломному проекту.
+
+    Возвращает SHA-256 файла.
+    """
+    if session.status != 'active':
+        raise UploadError('Загрузка уже завершена', status=409, offset=session.offset)
+    if session.offset != session.size:
+        raise UploadError('Файл получен не полностью', status=409, offset=session.offset)
+
+    path = temp_path(session)
+    if os.path.getsize(path) != session.size:
+        raise UploadError('Временный файл поврежден, начните загрузку заново', status=409, offset=0)
+
+    with open(path, 'rb') as file:
+        sha256 = content_sha256(File(file))
+    if session.expected_sha256 and session.expected_sha256 != sha256:
+        raise UploadError('Контрольная сумма файла не совпадает', status=422)
+
+    stored_name = ''
+    try:
+        with transaction.atomic():
+            # Блокируем сессию, чтобы параллельный finalize не прикрепил файл дважды
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            if session.status != 'active':
+                raise UploadError('Загрузка уже завершена', status=409, offset=session.offset)
+            diploma = DiplomaProject.objects.select_for_update().get(pk=session.diploma_project_id)
+
+            with open(path, 'rb') as file:
+                content = File(file)
+                content.sha256 = sha256
+                diploma.file.save(session.filename, content, save=False)
+            diploma.file_original_name = session.filename
+            stored_name = diploma.file.name
+            diploma.save(update_fields=['file', 'file_original_name'])
+            session.status = 'completed'
+            session.save(update_fields=['status', 'updated_at'])
+    except Exception:
+        # Если запись в базу не удалась, сохраненная копия не должна остаться в
+        # хранилище - но только если на это содержимое нет других ссылок
+        # (после отката транзакции, вместе с которой откатилось и сохранение)
+        if stored_name:
+            delete_if_unreferenced(stored_name)
+        raise
+
+    discard_upload(session, delete_session=False)
+    return sha256
+
+
+def discard_upload(session, delete_session=True):
+    """Удалить временный файл (и саму загрузку)"""
+    try:
+        os.remove(temp_path(session))
+    except FileNotFoundError:
+        pass
+    if delete_session:
+        session.delete()
@@ -0,0 +1,62 @@
+# diploma_orders/counters.py
+"""
+Денормализованные счетчики групп и руководителей.
+
+Group.student_count / Group.diploma_count и Supervisor.student_count
+изменяются инкрементально (UPDATE ... SET x = x + 1) из сигналов
+Student и DiplomaProject. Массовые операции в обход save()/delete()
+(queryset.update, bulk_create) счетчики не трогают, после них нужно
+выполнить `manage.py recount`.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+def bump(model, pk, **deltas):
+    """Изменить счетчики записи на заданные величины (не ниже нуля)"""
+    if pk is None:
+        return
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    model.objects.filter(pk=pk).update(**{
+        field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items()
+    })
+
+
+def _count_subquery(queryset, field):
+    """Подзапрос: количество записей queryset с field = OuterRef('pk')"""
+    counts = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def recount_group_counters(group_model, student_model):
+    """Пересчет счетчиков всех групп одним UPDATE"""
+    students = student_model.objects.all()
+    return group_model.objects.update(
+        student_count=_count_subquery(students, 'group'),
+        diploma_count=_count_subquery(students.filter(diploma_project__isnull=False), 'group'),
+    )
+
+
+def recount_supervisor_counters(supervisor_model, diploma_model):
+    """Пересчет счетчиков всех руководителей одним UPDATE"""
+    return supervisor_model.objects.update(
+        student_count=_count_subquery(diploma_model.objects.all(), 'supervisor'),
+    )
+
+
+def recount_all():
+    """Пересчет всех счетчиков: (групп, руководителей)"""
+    from .models import DiplomaProject, Group, Student, Supervisor
+
+    return (
+        recount_group_counters(Group, Student),
+        recount_supervisor_counters(Supervisor, DiplomaProject),
+    )
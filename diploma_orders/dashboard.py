@@ -0,0 +1,92 @@
+# diploma_orders/dashboard.py
+"""
+Снимок данных главной страницы.
+
+Итоги, последние студенты и группы с разбивкой дипломов по статусам
+собираются одним блоком и хранятся в кэше Django. Сигналы изменения
+студентов, руководителей, групп и дипломных проектов удаляют снимок
+(diploma_orders/signals.py), и следующий запрос собирает его заново.
+Главная страница при попадании в кэш выполняет одно чтение из кэша и ни
+одного запроса к базе. Удаление снимка видно всем процессам, если бэкенд
+кэша у них общий (CACHES в core/settings.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+DASHBOARD_CACHE_KEY = 'diploma_orders:dashboard'
+
+# Время жизни снимка, секунд (обычно он сбрасывается раньше сигналами)
+DEFAULT_DASHBOARD_TIMEOUT = 10 * 60
+
+RECENT_STUDENTS = 5
+
+
+def build_dashboard():
+    """Собрать снимок из базы"""
+    from .models import DiplomaProject, Group, Student, Supervisor
+
+    recent_students = [
+        {
+            'id': pk,
+            'full_name': ' '.join(part for part in (last_name, first_name, patronymic) if part),
+            'student_id': student_id,
+        }
+        for pk, last_name, first_name, patronymic, student_id in (
+            Student.objects.order_by('-id')
+            .values_list('id', 'last_name', 'first_name', 'patronymic', 'student_id')[:RECENT_STUDENTS]
+        )
+    ]
+
+    # Разбивка дипломов по статусам для всех групп - одним GROUP BY
+    by_status = {}
+    rows = (
+        DiplomaProject.objects.order_by()
+        .values_list('student__group_id', 'status')
+        .annotate(total=Count('id'))
+    )
+    for group_id, status, total in rows:
+        by_status.setdefault(group_id, {})[status] = total
+
+    statuses = DiplomaProject.STATUS_CHOICES
+    groups = [
+        {
+            'id': pk,
+            'name': name,
+            'course': course,
+            'student_count': student_count,
+            'diploma_count': diploma_count,
+            'statuses': [by_status.get(pk, {}).get(status, 0) for status, _ in statuses],
+        }
+        for pk, name, course, student_count, diploma_count in (
+            Group.objects.order_by('course', 'name')
+            .values_list('id', 'name', 'course', 'student_count', 'diploma_count')
+        )
+    ]
+
+    return {
+        'total_students': Student.objects.count(),
+        'total_supervisors': Supervisor.objects.count(),
+        'total_groups': len(groups),
+        # Напрямую, а не суммой Group.diploma_count: у студента может не быть группы
+        'total_diplomas': DiplomaProject.objects.count(),
+        'recent_students': recent_students,
+        'statuses': [label for _, label in statuses],
+        'groups': groups,
+    }
+
+
+def get_dashboard():
+    """(снимок, взят ли он из кэша)"""
+    dashboard = cache.get(DASHBOARD_CACHE_KEY)
+    if dashboard is not None:
+        return dashboard, True
+
+    dashboard = build_dashboard()
+    timeout = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', DEFAULT_DASHBOARD_TIMEOUT)
+    cache.set(DASHBOARD_CACHE_KEY, dashboard, timeout=timeout)
+    return dashboard, False
+
+
+def invalidate_dashboard():
+    cache.delete(DASHBOARD_CACHE_KEY)
@@ -0,0 +1,353 @@
+# diploma_orders/docx_blocks.py
+"""
+Библиотека блоков DOCX для приказов по группам.
+
+Неизменная часть приказа (настройки страницы, стили, шапка министерства,
+подписи) собирается один раз за процесс в «скелет». На каждый запрос
+разбирается только word/document.xml скелета, заполняются строка с
+датой/номером, вводный абзац и таблица студентов, а остальные части
+пакета копируются без изменений.
+"""
+import io
+import os
+import threading
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from docx import Document
+from docx.shared import Pt, Inches, Cm
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.enum.table import WD_TABLE_ALIGNMENT
+from docx.oxml.ns import nsdecls, qn
+from docx.oxml import OxmlElement, parse_xml
+from docx.opc.oxml import serialize_part_xml
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+
+_skeleton_bytes = None
+_docx_skeleton = None
+_skeleton_lock = threading.Lock()
+
+# Порядок таблиц в скелете
+DATE_TABLE_INDEX = 0
+STUDENTS_TABLE_INDEX = 1
+
+
+def set_table_borderless(table):
+    """Убрать все границы у таблицы"""
+    tblPr = table._tbl.tblPr
+    tblBorders = OxmlElement('w:tblBorders')
+
+    for border_name in ['top', 'left', 'bottom', 'right', 'insideH', 'insideV']:
+        border = OxmlElement(f'w:{border_name}')
+        border.set(qn('w:val'), 'nil')
+        tblBorders.append(border)
+
+    tblPr.append(tblBorders)
+
+
+def add_spacer(document, space_after):
+    """Пустой абзац-интервал"""
+    document.add_paragraph().paragraph_format.space_after = space_after
+
+
+def add_bold_paragraph(document, text, size, alignment=None):
+    """Абзац с одним полужирным фрагментом"""
+    p = document.add_paragraph()
+    if alignment is not None:
+        p.alignment = alignment
+    run = p.add_run(text)
+    run.bold = True
+    run.font.size = size
+    return p
+
+
+def add_page_setup(document):
+    """Формат A4, поля и шрифт Times New Roman 14"""
+    section = document.sections[0]
+    section.page_height = Cm(29.7)
+    section.page_width = Cm(21.0)
+    section.left_margin = Cm(2.5)
+    section.right_margin = Cm(1.5)
+    section.top_margin = Cm(2.0)
+    section.bottom_margin = Cm(2.0)
+    section.header_distance = Cm(1.25)
+    section.footer_distance = Cm(1.25)
+
+    style = document.styles['Normal']
+    style.font.name = 'Times New Roman'
+    style.font.size = Pt(14)
+
+
+def add_ministry_header(document):
+    """Шапка: министерство, учреждение, ПРИКАЗ"""
+    add_bold_paragraph(document, 'Министерство науки и высшего образования Российской Федерации',
+                       Pt(14), WD_ALIGN_PARAGRAPH.CENTER)
+    add_spacer(document, Pt(28))
+
+    add_bold_paragraph(document, 'Федеральное государственное бюджетное образовательное учреждение\nвысшего образования',
+                       Pt(14), WD_ALIGN_PARAGRAPH.CENTER)
+    add_spacer(document, Pt(14))
+
+    add_bold_paragraph(document, '«Государственный университет управления»',
+                       Pt(16), WD_ALIGN_PARAGRAPH.CENTER)
+    add_spacer(document, Pt(28))
+
+    add_bold_paragraph(document, 'ПРИКАЗ', Pt(16), WD_ALIGN_PARAGRAPH.CENTER)
+    add_spacer(document, Pt(28))
+
+
+def add_date_table(document):
+    """Строка «дата - город - номер» (дата и номер заполняются на запрос)"""
+    table = document.add_table(rows=1, cols=3)
+    table.alignment = WD_TABLE_ALIGNMENT.LEFT
+
+    widths = [Inches(2), Inches(3), Inches(2)]
+    for i, width in enumerate(widths):
+        table.columns[i].width = width
+
+    row = table.rows[0]
+    row.cells[1].paragraphs[0].add_run('г. Москва')
+
+    row.cells[0].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.LEFT
+    row.cells[1].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+    row.cells[2].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.RIGHT
+    return table
+
+
+def add_order_preamble(document):
+    """Заголовок приказа и «ПРИКАЗЫВАЮ:»"""
+    add_spacer(document, Pt(28))
+    add_bold_paragraph(document, 'ОБ утверждении тем выпускных\nквалификационных работ и назначении руководителей', Pt(14))
+    add_spacer(document, Pt(28))
+    add_bold_paragraph(document, 'ПРИКАЗЫВАЮ:', Pt(14))
+    add_spacer(document, Pt(28))
+
+
+def add_students_table(document):
+    """Вводный абзац п.1 и таблица студентов с заголовком (без строк)"""
+    p = document.add_paragraph()
+    p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+    run = p.add_run('')
+    run.font.size = Pt(14)
+
+    table = document.add_table(rows=1, cols=3)
+    table.style = 'Table Grid'
+
+    hdr_cells = table.rows[0].cells
+    hdr_cells[0].text = '№ п/п'
+    hdr_cells[1].text = 'ФИО студента, тема ВКР'
+    hdr_cells[2].text = 'Научный руководитель'
+
+    table.columns[0].width = Cm(2)
+    table.columns[1].width = Cm(10)
+    table.columns[2].width = Cm(6)
+    return table
+
+
+def add_signatures(document):
+    """Пункт 2 приказа и блоки подписей"""
+    add_spacer(document, Pt(28))
+
+    p = document.add_paragraph()
+    p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+    run = p.add_run('2. Контроль за исполнением настоящего приказа возложить на и.о. заведующего кафедрой информационных систем Д.В. Стефановского.')
+    run.font.size = Pt(14)
+
+    # Интервал 2 см для подписей
+    add_spacer(document, Pt(56))
+
+    table = document.add_table(rows=6, cols=2)
+    table.alignment = WD_TABLE_ALIGNMENT.LEFT
+    table.columns[0].width = Cm(9)
+    table.columns[1].width = Cm(9)
+    set_table_borderless(table)
+
+    signature_rows = [
+        ('Проректор', ''),
+        ('___________________ Д.Ю. Брюханов', ''),
+        ('', ''),
+        ('Проект приказа вносит:', 'Согласовано:'),
+        ('И.о. заведующего кафедрой\nинформационных систем', 'И.о. директора Института\nинформационных систем'),
+        ('___________________ Д.В. Стефановский', '___________________ О.М. Писарева'),
+    ]
+    for row, (left, right) in zip(table.rows, signature_rows):
+        row.cells[0].text = left
+        row.cells[1].text = right
+
+    right_blocks = [
+        ('Заместитель директора\nПравового департамента', '___________________ В.В. Андросенко'),
+        ('Директор Департамента академической политики\nи реализации образовательных программ', '___________________ Н.А. Стракова'),
+    ]
+    for position, signature in right_blocks:
+        add_spacer(document, Pt(28))
+
+        table = document.add_table(rows=3, cols=1)
+        table.alignment = WD_TABLE_ALIGNMENT.RIGHT
+        table.columns[0].width = Cm(9)
+        set_table_borderless(table)
+
+        table.rows[0].cells[0].text = position
+        table.rows[1].cells[0].text = signature
+        table.rows[2].cells[0].text = ''
+
+
+def _run_xml(text):
+    """Содержимое w:r: строки через w:br, как при присвоении cell.text"""
+    parts = []
+    for i, line in enumerate(text.split('\n')):
+        if i:
+            parts.append('<w:br/>')
+        if line != line.strip():
+            parts.append(f'<w:t xml:space="preserve">{escape(line)}</w:t>')
+        else:
+            parts.append(f'<w:t>{escape(line)}</w:t>')
+    return ''.join(parts)
+
+
+def append_table_rows(table, rows):
+    """Добавить строки в таблицу одним фрагментом XML.
+
+    rows - итерируемое кортежей с текстом ячеек. Результат совпадает с
+    table.add_row() + cell.text, но без объектного слоя python-docx.
+    """
+    tbl = table._tbl
+    widths = [grid_col.get(qn('w:w')) for grid_col in tbl.tblGrid.gridCol_lst]
+    cell_starts = [
+        f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr><w:p><w:r>'
+        if width is not None else '<w:tc><w:tcPr/><w:p><w:r>'
+        for width in widths
+    ]
+
+    parts = [f'<w:tbl {nsdecls("w")}>']
+    for row in rows:
+        parts.append('<w:tr>')
+        for cell_start, text in zip(cell_starts, row):
+            parts.append(cell_start)
+            parts.append(_run_xml(str(text)))
+            parts.append('</w:r></w:p></w:tc>')
+        parts.append('</w:tr>')
+    parts.append('</w:tbl>')
+
+    fragment = parse_xml(''.join(parts))
+    tbl.extend(list(fragment))
+
+
+def build_group_order_skeleton():
+    """Сборка скелета приказа по группе, возвращает байты .docx"""
+    document = Document()
+    add_page_setup(document)
+    add_ministry_header(document)
+    add_date_table(document)
+    add_order_preamble(document)
+    add_students_table(document)
+    add_signatures(document)
+
+    file_stream = io.BytesIO()
+    document.save(file_stream)
+    return file_stream.getvalue()
+
+
+class DocxSkeleton:
+    """Готовый .docx, в котором на запрос меняются только отдельные XML-части.
+
+    Неизменные части пакета (стили, тема, настройки) один раз сжимаются в
+    базовый архив; на запрос к его копии дописываются изменяемые части
+    (режим 'a' ZipFile), без разбора и повторного сжатия остального.
+    """
+    DOCUMENT_PART = 'word/document.xml'
+
+    def __init__(self, docx_bytes, is_dynamic=None):
+        """is_dynamic(name) - какие части меняются (по умолчанию только document.xml)"""
+        is_dynamic = is_dynamic or (lambda name: name == self.DOCUMENT_PART)
+        self.parts = {}
+        base = io.BytesIO()
+        with zipfile.ZipFile(io.BytesIO(docx_bytes)) as archive, \
+                zipfile.ZipFile(base, 'w', compression=zipfile.ZIP_DEFLATED) as static:
+            for zinfo in archive.infolist():
+                if is_dynamic(zinfo.filename):
+                    self.parts[zinfo.filename] = archive.read(zinfo)
+                else:
+                    static.writestr(zinfo, archive.read(zinfo), compress_type=zinfo.compress_type)
+        self.base = base.getvalue()
+
+    @property
+    def document_xml(self):
+        return self.parts[self.DOCUMENT_PART]
+
+    def parse_document(self):
+        """Новый экземпляр дерева word/document.xml"""
+        return parse_xml(self.document_xml)
+
+    def write_parts(self, parts):
+        """Собрать .docx с новым содержимым изменяемых частей {имя: байты}"""
+        output = io.BytesIO(self.base)
+        with zipfile.ZipFile(output, 'a', compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, data in parts.items():
+                archive.writestr(name, data)
+        return output.getvalue()
+
+    def write(self, document_element):
+        """Собрать .docx с новым word/document.xml"""
+        return self.write_parts({self.DOCUMENT_PART: serialize_part_xml(document_element)})
+
+
+def get_group_order_skeleton():
+    """Байты скелета: из файла GROUP_ORDER_SKELETON_PATH или собранные один раз"""
+    global _skeleton_bytes
+    if _skeleton_bytes is None:
+        with _skeleton_lock:
+            if _skeleton_bytes is None:
+                path = getattr(settings, 'GROUP_ORDER_SKELETON_PATH', None)
+                if path and os.path.exists(path):
+                    with open(path, 'rb') as skeleton_file:
+                        _skeleton_bytes = skeleton_file.read()
+                else:
+                    _skeleton_bytes = build_group_order_skeleton()
+    return _skeleton_bytes
+
+
+def reset_group_order_skeleton():
+    """Сбросить закэшированный скелет (например, после замены файла)"""
+    global _skeleton_bytes, _docx_skeleton
+    with _skeleton_lock:
+        _skeleton_bytes = None
+        _docx_skeleton = None
+
+
+def get_group_order_docx_skeleton():
+    """Разобранный скелет приказа (один на процесс)"""
+    global _docx_skeleton
+    if _docx_skeleton is None:
+        skeleton = DocxSkeleton(get_group_order_skeleton())
+        with _skeleton_lock:
+            if _docx_skeleton is None:
+                _docx_skeleton = skeleton
+    return _docx_skeleton
+
+
+class GroupOrderDocument:
+    """Клон скелета с доступом к заполняемым частям"""
+
+    def __init__(self):
+        self.skeleton = get_group_order_docx_skeleton()
+        self.element = self.skeleton.parse_document()
+
+        tables = self.element.body.findall(qn('w:tbl'))
+        self.date_table = Table(tables[DATE_TABLE_INDEX], None)
+        self.students_table = Table(tables[STUDENTS_TABLE_INDEX], None)
+
+    def fill_header(self, order_date_str, order_number):
+        """Дата и номер приказа"""
+        cells = self.date_table.rows[0].cells
+        cells[0].paragraphs[0].add_run(order_date_str)
+        cells[2].paragraphs[0].add_run(f'№ {order_number}')
+
+    def fill_intro(self, text):
+        """Текст вводного абзаца п.1 (абзац непосредственно перед таблицей студентов)"""
+        intro = Paragraph(self.students_table._tbl.getprevious(), None)
+        intro.runs[0].text = text
+
+    def save(self):
+        return self.skeleton.write(self.element)
@@ -0,0 +1,155 @@
+# diploma_orders/docx_template_engine.py
+"""
+Подстановка значений в загруженные DOCX-шаблоны (OrderTemplate.docx_template).
+
+При первом использовании файла шаблона все плейсхолдеры {{key}} и {key}
+в document.xml, колонтитулах и таблицах находятся с учетом разбиения текста
+на фрагменты (runs): плейсхолдер сводится в первый фрагмент, заменяется
+маркером, и XML каждой части режется по маркерам на сегменты. Индекс
+кэшируется в процессе; экспорт только склеивает сегменты со значениями,
+форматирование фрагментов сохраняется.
+"""
+import bisect
+import re
+from xml.sax.saxutils import escape
+
+from lxml import etree
+
+from .docx_blocks import DocxSkeleton
+from .template_engine import get_cached
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W_P = f'{{{W_NS}}}p'
+W_T = f'{{{W_NS}}}t'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+# Части пакета, в которых ищутся плейсхолдеры
+TEMPLATE_PART_RE = re.compile(r'^word/(document|header\d*|footer\d*)\.xml$')
+
+# {{key}} (как в OrderTemplate.content) и {key} (прежний формат DOCX-шаблонов)
+DOCX_PLACEHOLDER_RE = re.compile(r'\{\{([^{}]+?)\}\}|\{([^{}\s]+)\}')
+
+# Маркер слота в XML: символы из области частного использования Unicode
+SLOT_MARKER = '\ue000{}\ue001'
+SLOT_MARKER_RE = re.compile('\ue000(\\d+)\ue001'.encode('utf-8'))
+
+# Перенос строки в значении - разрыв строки внутри того же фрагмента
+LINE_BREAK = b'</w:t><w:br/><w:t xml:space="preserve">'
+
+
+def _paragraph_text_nodes(root):
+    """w:t каждого абзаца в порядке документа (вложенные абзацы - отдельно)"""
+    paragraphs = {}
+    for node in root.iter(W_T):
+        parent = node.getparent()
+        while parent is not None and parent.tag != W_P:
+            parent = parent.getparent()
+        if parent is not None:
+            paragraphs.setdefault(parent, []).append(node)
+    return paragraphs.values()
+
+
+def _collapse_placeholders(nodes, slots):
+    """Заменить плейсхолдеры абзаца маркерами; каждый - в первом его фрагменте"""
+    texts = [node.text or '' for node in nodes]
+    text = ''.join(texts)
+    matches = list(DOCX_PLACEHOLDER_RE.finditer(text))
+    if not matches:
+        return
+
+    starts = []
+    offset = 0
+    for node_text in texts:
+        starts.append(offset)
+        offset += len(node_text)
+
+    pieces = [[] for _ in nodes]
+
+    def copy_literal(begin, end):
+        index = max(bisect.bisect_right(starts, begin) - 1, 0)
+        while begin < end:
+            node_end = starts[index] + len(texts[index])
+            if node_end > begin:
+                pieces[index].append(text[begin:min(end, node_end)])
+                begin = min(end, node_end)
+            index += 1
+
+    position = 0
+    for match in matches:
+        copy_literal(position, match.start())
+        index = bisect.bisect_right(starts, match.start()) - 1
+        pieces[index].append(SLOT_MARKER.format(len(slots)))
+        slots.append((match.group(1) or match.group(2), match.group(0)))
+        position = match.end()
+    copy_literal(position, len(text))
+
+    for node, old_text, node_pieces in zip(nodes, texts, pieces):
+        new_text = ''.join(node_pieces)
+        if new_text != old_text:
+            node.text = new_text
+            node.set(XML_SPACE, 'preserve')
+
+
+class CompiledDocxTemplate:
+    """Индекс плейсхолдеров DOCX-шаблона: части пакета, нарезанные на сегменты"""
+
+    def __init__(self, docx_bytes):
+        self.skeleton = DocxSkeleton(docx_bytes, is_dynamic=TEMPLATE_PART_RE.match)
+        self.slots = []
+        self.parts = {}
+        for name, xml in self.skeleton.parts.items():
+            self.parts[name] = self._compile_part(xml)
+
+    def _compile_part(self, xml):
+        root = etree.fromstring(xml)
+        first_slot = len(self.slots)
+        for nodes in _paragraph_text_nodes(root):
+            _collapse_placeholders(nodes, self.slots)
+        if len(self.slots) == first_slot:
+            return [xml]
+
+        data = etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+        # Чередование: литерал, номер слота, литерал, ...
+        segments = SLOT_MARKER_RE.split(data)
+        for i in range(1, len(segments), 2):
+            segments[i] = int(segments[i])
+        return segments
+
+    @property
+    def fields(self):
+        """Имена полей, встречающихся в шаблоне (в порядке появления)"""
+        return list(dict.fromkeys(key for key, _ in self.slots))
+
+    def _slot_value(self, index, data):
+        key, placeholder = self.slots[index]
+        value = str(data[key]) if key in data else placeholder
+        return escape(value).encode('utf-8').replace(b'\n', LINE_BREAK)
+
+    def render(self, data):
+        """Байты .docx с подставленными значениями; неизвестные поля остаются как есть"""
+        parts = {}
+        for name, segments in self.parts.items():
+            chunks = list(segments)
+            for i in range(1, len(chunks), 2):
+                chunks[i] = self._slot_value(chunks[i], data)
+            parts[name] = b''.join(chunks)
+        return self.skeleton.write_parts(parts)
+
+
+def _read_template_file(template):
+    with template.docx_template.open('rb') as template_file:
+        return template_file.read()
+
+
+def compile_docx_template(template):
+    """Индекс плейсхолдеров файла шаблона (ключ: id + updated_at + имя файла)"""
+    if template.pk is None:
+        return CompiledDocxTemplate(_read_template_file(template))
+    version = (template.updated_at, template.docx_template.name)
+    return get_cached(('docx', template.pk), version,
+                      lambda: CompiledDocxTemplate(_read_template_file(template)))
+
+
+def render_docx_template(template, data):
+    """DOCX по файлу шаблона с подставленными данными"""
+    return compile_docx_template(template).render(data)
@@ -0,0 +1,295 @@
+# diploma_orders/facets.py
+"""
+Фасеты списка студентов: число студентов по группам, руководителям и
+статусам ВКР.
+
+Для каждого значения фасета в процессе хранится битовая карта студентов
+(целое число Python, бит с номером id студента). Счетчик значения - число
+единиц в пересечении его карты с картой найденных студентов и картами
+выбранных значений других фасетов. У каждого фасета учитываются выбранные
+значения остальных фасетов, но не его собственное, чтобы были видны
+альтернативы («в группе ИС-41 - 12, в ИС-42 - 8»).
+
+Карты строятся одним запросом в фоновом потоке при первом обращении и
+после invalidate(); пока они строятся, счетчики считаются запросами
+GROUP BY к базе. Карты обновляются сигналами по одному студенту
+(diploma_orders/signals.py) и перестраиваются целиком в фоне, если старше
+FACET_INDEX_TTL секунд (изменения из других процессов). Изменения,
+пришедшие во время перестройки, записываются в журнал и применяются к новым
+картам после загрузки. При FACET_INDEX_BACKGROUND_BUILD = False карты
+строятся в самом запросе. Подписи значений берутся из кэша списков выбора
+(diploma_orders/choices.py).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+from .choices import get_choices
+from .search import search_students
+
+logger = logging.getLogger(__name__)
+
+# (параметр запроса, поле студента, список выбора для подписей)
+FACETS = (
+    ('group', 'group_id', 'group'),
+    ('supervisor', 'diploma_project__supervisor_id', 'supervisor'),
+    ('status', 'diploma_project__status', 'status'),
+)
+
+FACET_FIELDS = tuple(field for _, field, _ in FACETS)
+
+# Значение фасета, когда поле не заполнено (нет группы, руководителя или темы ВКР)
+EMPTY_VALUE = ''
+
+EMPTY_LABELS = {
+    'group': 'Без группы',
+    'supervisor': 'Без руководителя',
+    'status': 'Нет темы ВКР',
+}
+
+DEFAULT_INDEX_TTL = 300
+
+
+def search_queryset(params):
+    """Студенты по строке поиска ?query= (без фильтров фасетов)"""
+    from .models import Student
+
+    queryset = Student.objects.all()
+    query = params.get('query')
+    if query:
+        # Полнотекстовый индекс, результаты упорядочены по релевантности
+        queryset = search_students(queryset, query)
+    return queryset
+
+
+def selected_facets(params):
+    """Выбранные значения фасетов из GET-параметров: {имя: строка}"""
+    return {name: params.get(name) for name, _, _ in FACETS if params.get(name)}
+
+
+def filter_by_facets(queryset, selected):
+    """Применить выбранные значения фасетов к queryset студентов"""
+    for name, field, _ in FACETS:
+        if name in selected:
+            queryset = queryset.filter(**{field: selected[name]})
+    return queryset
+
+
+def _key(value):
+    return EMPTY_VALUE if value is None else str(value)
+
+
+def ids_bitmap(ids):
+    """Битовая карта из набора id"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    data = bytearray((max(ids) >> 3) + 1)
+    for pk in ids:
+        data[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(data, 'little')
+
+
+class FacetIndex:
+    """Битовые карты студентов по значениям фасетов"""
+
+    def __init__(self):
+        self.values = {}
+        self.bitmaps = [{} for _ in FACETS]
+        self.all = 0
+        self.built_at = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        # Изменения, пришедшие во время перестройки: (id студента, строка FACET_FIELDS или None)
+        self._journal = None
+        # Увеличивается при invalidate(): загрузка, начатая раньше, не объявляет карты готовыми
+        self._generation = 0
+
+    @staticmethod
+    def _load_rows():
+        from .models import Student
+        return Student.objects.order_by().values_list('id', *FACET_FIELDS).iterator(chunk_size=5000)
+
+    def rebuild(self):
+        """Полная загрузка из базы"""
+        with self._lock:
+            self._journal = []
+            generation = self._generation
+        try:
+            values = {}
+            members = [{} for _ in FACETS]
+            for pk, *row in self._load_rows():
+                keys = tuple(_key(value) for value in row)
+                values[pk] = keys
+                for index, key in enumerate(keys):
+                    members[index].setdefault(key, []).append(pk)
+
+            bitmaps = [
+                {key: ids_bitmap(ids) for key, ids in facet_members.items()}
+                for facet_members in members
+            ]
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self.values = values
+            self.bitmaps = bitmaps
+            self.all = ids_bitmap(values)
+            for student_id, row in journal:
+                self._apply_locked(student_id, row)
+            self.built_at = time.monotonic() if generation == self._generation else None
+
+    def invalidate(self):
+        """Перестроить при следующем обращении"""
+        with self._lock:
+            self._generation += 1
+            self.built_at = None
+
+    @property
+    def ready(self):
+        return self.built_at is not None
+
+    def _is_stale(self):
+        ttl = getattr(settings, 'FACET_INDEX_TTL', DEFAULT_INDEX_TTL)
+        return time.monotonic() - self.built_at > ttl
+
+    def _refresh_in_background(self):
+        """Перестроить карты в отдельном потоке; пока - считать по старым или по базе"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            try:
+                self.rebuild()
+            except Exception:
+                logger.exception('Не удалось перестроить индекс фасетов')
+            finally:
+                self._refreshing = False
+                connection.close()
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def refresh_student(self, student_id):
+        """Перечитать значения фасетов одного студента (после сохранения или удаления)"""
+        from .models import Student
+
+        if self.built_at is None and self._journal is None:
+            return
+        row = Student.objects.filter(pk=student_id).values_list(*FACET_FIELDS).first()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((student_id, row))
+            if self.built_at is not None:
+                self._apply_locked(student_id, row)
+
+    def _apply_locked(self, student_id, row):
+        bit = 1 << student_id
+        old_keys = self.values.pop(student_id, None)
+        if old_keys is not None:
+            self.all &= ~bit
+            for bitmaps, key in zip(self.bitmaps, old_keys):
+                bitmaps[key] &= ~bit
+        if row is not None:
+            keys = tuple(_key(value) for value in row)
+            self.values[student_id] = keys
+            self.all |= bit
+            for bitmaps, key in zip(self.bitmaps, keys):
+                bitmaps[key] = bitmaps.get(key, 0) | bit
+
+    def count(self, base, selected):
+        """(total, [{значение: число}] по фасетам) для карты найденных студентов base.
+
+        Пока карты не построены, возвращает None (считать по базе, count_from_db).
+        """
+        if self.built_at is None:
+            self._refresh_in_background()
+            return None
+        if self._is_stale():
+            self._refresh_in_background()
+
+        with self._lock:
+            if base is None:
+                base = self.all
+            masks = [
+                self.bitmaps[index].get(selected[name], 0) if name in selected else None
+                for index, (name, _, _) in enumerate(FACETS)
+            ]
+
+            counts = []
+            for index, bitmaps in enumerate(self.bitmaps):
+                mask = base
+                for other, other_mask in enumerate(masks):
+                    if other != index and other_mask is not None:
+                        mask &= other_mask
+                facet_counts = {}
+                for key, bitmap in bitmaps.items():
+                    total = (mask & bitmap).bit_count()
+                    if total:
+                        facet_counts[key] = total
+                counts.append(facet_counts)
+
+            total = base
+            for mask in masks:
+                if mask is not None:
+                    total &= mask
+        return total.bit_count(), counts
+
+
+facet_index = FacetIndex()
+
+
+def count_from_db(params, selected):
+    """То же, что FacetIndex.count, запросами GROUP BY (пока карты строятся)"""
+    from .models import Student
+
+    found = Student.objects.filter(id__in=search_queryset(params).order_by().values('id'))
+    counts = []
+    for name, field, _ in FACETS:
+        others = {key: value for key, value in selected.items() if key != name}
+        rows = filter_by_facets(found, others).order_by().values_list(field).annotate(total=Count('id'))
+        counts.append({_key(value): total for value, total in rows if total})
+    return filter_by_facets(found, selected).count(), counts
+
+
+def count_facets(params):
+    """Счетчики фасетов для GET-параметров списка студентов.
+
+    Возвращает (total, facets): total - число студентов со всеми выбранными
+    значениями, facets - {имя: [{'value', 'label', 'count', 'selected'}]}
+    по убыванию count.
+    """
+    selected = selected_facets(params)
+    if not facet_index.ready and not getattr(settings, 'FACET_INDEX_BACKGROUND_BUILD', True):
+        facet_index.rebuild()
+    base = None
+    if params.get('query') and facet_index.ready:
+        # Найденные студенты - один запрос к полнотекстовому индексу
+        base = ids_bitmap(search_queryset(params).order_by().values_list('id', flat=True))
+    result = facet_index.count(base, selected)
+    total, counts = result if result is not None else count_from_db(params, selected)
+
+    facets = {}
+    for (name, _, kind), facet_counts in zip(FACETS, counts):
+        labels = {str(value): label for value, label in get_choices(kind)}
+        facets[name] = sorted(
+            (
+                {
+                    'value': value,
+                    'label': labels.get(value, value) if value != EMPTY_VALUE else EMPTY_LABELS[name],
+                    'count': count,
+                    'selected': selected.get(name) == value,
+                }
+                for value, count in facet_counts.items()
+            ),
+            key=lambda item: (-item['count'], item['label']),
+        )
+    return total, facets
@@ -0,0 +1,160 @@
+# diploma_orders/file_serving.py
+"""
+Отдача файлов из хранилища: потоково, с докачкой и условными запросами.
+
+- ETag и Last-Modified; If-None-Match / If-Modified-Since дают 304,
+  If-Match / If-Unmodified-Since - 412 (django.utils.cache).
+- Range: bytes=... (один диапазон) - ответ 206 с нужным куском файла,
+  If-Range проверяется по ETag или дате. Несколько диапазонов не
+  поддерживаются - отдается весь файл, как разрешает RFC 9110.
+- Файл читается блоками, целиком в память не загружается.
+
+Режим FILE_SERVE_OFFLOAD переносит отдачу байтов на веб-сервер после
+проверки прав в Django:
+- 'nginx': заголовок X-Accel-Redirect: FILE_SERVE_ACCEL_PREFIX + имя файла
+  (в nginx - internal location с alias на MEDIA_ROOT);
+- 'sendfile': заголовок X-Sendfile с путем к файлу (Apache mod_xsendfile,
+  lighttpd).
+Диапазоны и условные запросы в этом режиме обрабатывает веб-сервер.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Размер блока при отдаче части файла
+BLOCK_SIZE = 64 * 1024
+
+DEFAULT_ACCEL_PREFIX = '/protected-media/'
+
+
+def parse_range(header, size):
+    """(start, end) включительно для одного диапазона; None - отдать весь файл;
+    'unsatisfiable' - диапазон за пределами файла"""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Несколько диапазонов или другой формат - игнорируем заголовок
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: последние N байт
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return 'unsatisfiable'
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    """Совпадает ли If-Range с текущей версией файла (если заголовка нет - да)"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and last_modified is not None and since == last_modified
+
+
+def _file_stamp(field_file):
+    """(размер, время изменения в секундах или None)"""
+    storage = field_file.storage
+    size = storage.size(field_file.name)
+    try:
+        last_modified = int(storage.get_modified_time(field_file.name).timestamp())
+    except (NotImplementedError, OSError):
+        last_modified = None
+    return size, last_modified
+
+
+def _offload_response(field_file, mode):
+    response = HttpResponse()
+    if mode == 'nginx':
+        prefix = getattr(settings, 'FILE_SERVE_ACCEL_PREFIX', DEFAULT_ACCEL_PREFIX)
+        response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + field_file.name.lstrip('/'))
+    else:
+        response['X-Sendfile'] = field_file.storage.path(field_file.name)
+    return response
+
+
+def _read_range(file, start, end):
+    try:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            block = file.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+    finally:
+        file.close()
+
+
+def serve_file(request, field_file, filename=None, content_type=None, as_attachment=True, etag=None):
+    """Ответ с содержимым FieldFile field_file.
+
+    etag - непрозрачная версия содержимого (например, хэш); по умолчанию
+    строится из размера и времени изменения файла.
+    """
+    filename = filename or os.path.basename(field_file.name)
+    content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    size, last_modified = _file_stamp(field_file)
+    if etag is None:
+        etag = f'{size:x}-{last_modified or 0:x}'
+    etag = f'"{etag}"'
+
+    def finish(response):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        return response
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        return finish(conditional)
+
+    mode = getattr(settings, 'FILE_SERVE_OFFLOAD', None)
+    if mode in ('nginx', 'sendfile'):
+        response = _offload_response(field_file, mode)
+        response['Content-Type'] = content_type
+        return finish(response)
+
+    byte_range = None
+    if request.method in ('GET', 'HEAD') and 'Range' in request.headers:
+        if _if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.headers['Range'], size)
+
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    file = field_file.storage.open(field_file.name, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response['Content-Length'] = str(size)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(file, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    return finish(response)
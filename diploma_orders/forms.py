@@ -2,9 +2,12 @@ from django import forms
 from datetime import date
 from django.core.exceptions import ValidationError
 import json
+import os
 
 from .models import Student, Supervisor, DiplomaProject, Group, GroupOrder
 from .models import OrderTemplate, TemplateSection, GeneratedDocument, DocumentCollaborator
+from .choices import get_choices
+from .chunked_upload import UploadError, validate_upload
 
 
 class StudentSearchForm(forms.Form):
@@ -18,29 +21,30 @@ class StudentSearchForm(forms.Form):
         })
     )
     
-    supervisor = forms.ModelChoiceField(
-        queryset=Supervisor.objects.all(),
+    # Списки выбора берутся из кэша (diploma_orders/choices.py) при проверке формы,
+    # а не запросом к базе при каждом ее создании
+    supervisor = forms.TypedChoiceField(
+        choices=lambda: [('', 'Все руководители')] + get_choices('supervisor'),
+        coerce=int,
+        empty_value=None,
         required=False,
         label='Фильтр по руководителю',
-        widget=forms.Select(attrs={'class': 'form-select'})
+        # Варианты не выводятся списком - id выбирается через api_autocomplete
+        widget=forms.HiddenInput(attrs={'data-autocomplete': 'supervisor'})
     )
     
-    group = forms.ModelChoiceField(
-        queryset=Group.objects.all(),
+    group = forms.TypedChoiceField(
+        choices=lambda: [('', 'Все группы')] + get_choices('group'),
+        coerce=int,
+        empty_value=None,
         required=False,
         label='Фильтр по группе',
-        widget=forms.Select(attrs={'class': 'form-select'})
+        # Варианты не выводятся списком - id выбирается через api_autocomplete
+        widget=forms.HiddenInput(attrs={'data-autocomplete': 'group'})
     )
     
     status = forms.ChoiceField(
-        choices=[
-            ('', 'Все статусы'),
-            ('registered', 'Зарегистрирована'),
-            ('in_progress', 'В работе'),
-            ('review', 'На рецензии'),
-            ('completed', 'Завершена'),
-            ('defended', 'Защищена'),
-        ],
+        choices=lambda: [('', 'Все статусы')] + get_choices('status'),
         required=False,
         label='Статус работы',
         widget=forms.Select(attrs={'class': 'form-select'})
@@ -273,6 +277,12 @@ class AIAnalysisForm(forms.Form):
         ],
         widget=forms.Select(attrs={'class': 'form-select'})
     )
+    
+    force_refresh = forms.BooleanField(
+        label='Не использовать сохраненный результат',
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
 
 
 class AIQuestionForm(forms.Form):
@@ -310,18 +320,18 @@ class DiplomaUploadForm(forms.ModelForm):
     def clean_file(self):
         file = self.cleaned_data.get('file')
         if file:
-            # Проверяем размер файла (макс 10MB)
-            max_size = 10 * 1024 * 1024  # 10MB
-            if file.size > max_size:
-                raise forms.ValidationError(f"Файл слишком большой. Максимальный размер: {max_size//1024//1024}MB")
-            
-            # Проверяем расширение
-            allowed_extensions = ['.pdf', '.docx', '.doc', '.txt', '.jpg', '.jpeg', '.png']
-            ext = os.path.splitext(file.name)[1].lower()
-            if ext not in allowed_extensions:
-                raise forms.ValidationError(f"Неподдерживаемый формат. Разрешенные форматы: {', '.join(allowed_extensions)}")
+            # Те же проверки размера (MAX_UPLOAD_SIZE) и расширения, что и при загрузке по частям
+            try:
+                validate_upload(file.name, file.size)
+            except UploadError as error:
+                raise forms.ValidationError(str(error))
         
         return file
+    
+    def save(self, commit=True):
+        if 'file' in self.changed_data and self.cleaned_data.get('file'):
+            self.instance.file_original_name = os.path.basename(self.cleaned_data['file'].name)
+        return super().save(commit)
 
 
 class AIAnalysisRequestForm(forms.Form):
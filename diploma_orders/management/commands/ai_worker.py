@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from diploma_orders.analysis_jobs import claim_jobs, mark_failed, process_analysis_job, requeue_stale_jobs
+from diploma_orders.workers import create_process_pool
+
+# Анализ в основном ждет ответа провайдера, поэтому по умолчанию - потоки
+DEFAULT_CONCURRENCY = 4
+
+
+def run_job(job_id):
+    try:
+        return process_analysis_job(job_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Фоновый ИИ-анализ дипломов из очереди AnalysisJob'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int,
+                            default=getattr(settings, 'AI_WORKER_CONCURRENCY', DEFAULT_CONCURRENCY),
+                            help='Количество одновременно выполняемых заданий')
+        parser.add_argument('--pool', choices=['thread', 'process'],
+                            default=getattr(settings, 'AI_WORKER_POOL', 'thread'),
+                            help='Пул потоков (запросы к провайдеру) или процессов (локальный разбор)')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Интервал опроса очереди, сек.')
+        parser.add_argument('--stale-minutes', type=int, default=30,
+                            help='Через сколько минут зависшее задание возвращается в очередь')
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать текущую очередь и завершиться')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        poll_interval = options['poll_interval']
+
+        requeued = requeue_stale_jobs(timedelta(minutes=options['stale_minutes']))
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь зависших заданий: {requeued}')
+
+        self.stdout.write(f'Обработчик ИИ-анализа запущен, {options["pool"]} x {concurrency}')
+
+        if options['pool'] == 'process':
+            pool = create_process_pool(concurrency)
+        else:
+            pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ai_worker')
+
+        running = {}
+        with pool:
+            try:
+                while True:
+                    free_slots = concurrency - len(running)
+                    if free_slots > 0:
+                        for job_id in claim_jobs(free_slots):
+                            running[pool.submit(run_job, job_id)] = job_id
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_id = running.pop(future)
+                        try:
+                            status = future.result()
+                            self.stdout.write(f'Задание {job_id}: {status}')
+                        except Exception as e:
+                            mark_failed(job_id, str(e))
+                            self.stderr.write(f'Задание {job_id}: ошибка обработчика - {e}')
+            except KeyboardInterrupt:
+                self.stdout.write('Остановка обработчика...')
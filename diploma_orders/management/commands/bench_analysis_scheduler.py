@@ -0,0 +1,121 @@
+import heapq
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from diploma_orders.analysis_scheduler import Candidate, schedule
+
+START = datetime(2026, 6, 1, 9, 0)
+
+# Длительность анализа, сек.
+SERVICE_SECONDS = {'format': 20, 'questions': 60, 'review': 90, 'full': 180}
+TYPE_WEIGHTS = {'format': 3, 'questions': 2, 'review': 2, 'full': 3}
+
+
+def build_burst(jobs, supervisors, burst_minutes, rng):
+    """Синтетический наплыв перед защитами.
+
+    Треть заданий - пакет одного руководителя, поставленный разом на пятой
+    минуте; остальные приходят равномерно от всех руководителей.
+    """
+    types = list(TYPE_WEIGHTS)
+    burst = []
+    for job_id in range(jobs):
+        if job_id < jobs // 3:
+            supervisor, submitted = 0, 300
+        else:
+            supervisor, submitted = rng.randrange(1, supervisors), rng.uniform(0, burst_minutes * 60)
+        deadline_days = 1 if rng.random() < 0.1 else rng.randint(2, 30)
+        analysis_type = rng.choices(types, weights=list(TYPE_WEIGHTS.values()))[0]
+        burst.append((
+            Candidate(job_id, supervisor, START.date() + timedelta(days=deadline_days), analysis_type,
+                      START + timedelta(seconds=submitted)),
+            SERVICE_SECONDS[analysis_type] * rng.uniform(0.8, 1.2),
+        ))
+    burst.sort(key=lambda item: item[0].created_at)
+    return burst
+
+
+def fifo(pending, limit, now, running):
+    return sorted(pending, key=lambda candidate: candidate.created_at)[:limit]
+
+
+def simulate(burst, workers, pick):
+    """Ожидание в очереди каждого задания, сек., и время выбора заданий"""
+    arrivals = list(burst)
+    arrivals.reverse()
+    service = {candidate.id: seconds for candidate, seconds in burst}
+    pending = []
+    finishing = []  # (время завершения, руководитель)
+    running = Counter()
+    waits = {}
+    pick_time = 0.0
+    now = START
+
+    while arrivals or pending or finishing:
+        while arrivals and arrivals[-1][0].created_at <= now:
+            pending.append(arrivals.pop()[0])
+        while finishing and finishing[0][0] <= now:
+            running[heapq.heappop(finishing)[1]] -= 1
+
+        free = workers - len(finishing)
+        if free and pending:
+            started = time.perf_counter()
+            chosen = pick(pending, free, now, running)
+            pick_time += time.perf_counter() - started
+            chosen_ids = {candidate.id for candidate in chosen}
+            pending = [candidate for candidate in pending if candidate.id not in chosen_ids]
+            for candidate in chosen:
+                waits[candidate.id] = (now - candidate.created_at).total_seconds()
+                running[candidate.supervisor_id] += 1
+                heapq.heappush(finishing, (now + timedelta(seconds=service[candidate.id]), candidate.supervisor_id))
+
+        events = [finishing[0][0]] if finishing else []
+        if arrivals:
+            events.append(arrivals[-1][0].created_at)
+        if not events:
+            break
+        now = min(events)
+    return waits, pick_time
+
+
+def percentiles(values):
+    """p50, p90, p99 в минутах"""
+    points = statistics.quantiles(values, n=100)
+    return points[49] / 60, points[89] / 60, points[98] / 60
+
+
+class Command(BaseCommand):
+    help = 'Симуляция наплыва заданий ИИ-анализа: ожидание при FIFO и с планировщиком'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=600)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--supervisors', type=int, default=20)
+        parser.add_argument('--burst-minutes', type=int, default=60)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        burst = build_burst(
+            options['jobs'], options['supervisors'], options['burst_minutes'], random.Random(options['seed'])
+        )
+        groups = {
+            'все': [candidate.id for candidate, _ in burst],
+            'срок завтра': [candidate.id for candidate, _ in burst if candidate.deadline == START.date() + timedelta(days=1)],
+            'другие рук.': [candidate.id for candidate, _ in burst if candidate.supervisor_id != 0],
+        }
+        self.stdout.write(
+            f'Заданий: {len(burst)}, воркеров: {options["workers"]}, '
+            f'срок завтра: {len(groups["срок завтра"])}, пакет одного руководителя: {len(burst) // 3}'
+        )
+        self.stdout.write(f'{"порядок":>12} {"группа":>12} {"p50, мин":>9} {"p90, мин":>9} {"p99, мин":>9}')
+        for name, pick in (('FIFO', fifo), ('планировщик', schedule)):
+            waits, pick_time = simulate(burst, options['workers'], pick)
+            for group, ids in groups.items():
+                p50, p90, p99 = percentiles([waits[job_id] for job_id in ids])
+                self.stdout.write(f'{name:>12} {group:>12} {p50:>9.1f} {p90:>9.1f} {p99:>9.1f}')
+            self.stdout.write(f'{name:>12} выбор заданий: {pick_time * 1000:.0f} мс всего')
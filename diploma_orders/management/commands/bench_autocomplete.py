@@ -0,0 +1,90 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from diploma_orders.autocomplete import INDEXES, autocomplete, reset_indexes
+from diploma_orders.models import Group, Student
+
+LAST_NAMES = ['Иванов', 'Петров', 'Сидоров', 'Кузнецов', 'Смирнов', 'Попов', 'Волков', 'Соколов',
+              'Лебедев', 'Козлов', 'Новиков', 'Морозов', 'Егоров', 'Павлов', 'Семенов', 'Голубев']
+FIRST_NAMES = ['Иван', 'Петр', 'Алексей', 'Дмитрий', 'Сергей', 'Андрей', 'Мария', 'Анна', 'Елена']
+
+
+def like_search(query, limit):
+    """Прежний поиск admin autocomplete: icontains по полям search_fields"""
+    return list(
+        Student.objects.filter(
+            Q(last_name__icontains=query) |
+            Q(first_name__icontains=query) |
+            Q(patronymic__icontains=query) |
+            Q(student_id__icontains=query)
+        ).order_by('last_name', 'first_name', 'id').values_list('id', 'last_name')[:limit]
+    )
+
+
+def percentile(values, p):
+    return statistics.quantiles(values, n=100)[p - 1] * 1000
+
+
+class Command(BaseCommand):
+    help = 'Задержка автодополнения студентов (индекс в памяти и LIKE) на синтетических данных; данные откатываются'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+        # Индекс построен по откаченным данным
+        reset_indexes()
+
+    def run(self, options):
+        rnd = random.Random(42)
+        limit = options['limit']
+
+        groups = Group.objects.bulk_create(
+            Group(name=f'БЕНЧ-{i}', faculty='ИИС', course=i % 5 + 1) for i in range(200)
+        )
+        Student.objects.bulk_create(
+            (Student(
+                last_name=rnd.choice(LAST_NAMES) + rnd.choice(['', 'а']),
+                first_name=rnd.choice(FIRST_NAMES),
+                patronymic='Иванович',
+                student_id=f'S{i:06d}',
+                email=f'student{i}@example.com',
+                group=groups[i % len(groups)],
+            ) for i in range(options['students'])),
+            batch_size=5000,
+        )
+
+        started = time.perf_counter()
+        INDEXES['student'].rebuild()
+        self.stdout.write(f'Построение индекса: {time.perf_counter() - started:.2f} с')
+
+        queries = []
+        for _ in range(options['queries']):
+            name = rnd.choice(LAST_NAMES)
+            queries.append(rnd.choice([
+                name[:2], name[:4], name, f'{name} {rnd.choice(FIRST_NAMES)[:2]}',
+                f'S{rnd.randrange(options["students"]):06d}'[:rnd.randrange(3, 8)],
+            ]))
+
+        self.stdout.write(f'{"поиск":>10} {"p50, мс":>9} {"p95, мс":>9}')
+        searches = (
+            ('индекс', lambda query: autocomplete('student', query, limit)),
+            ('like', lambda query: like_search(query, limit)),
+        )
+        for name, search in searches:
+            timings = []
+            for query in queries:
+                began = time.perf_counter()
+                search(query)
+                timings.append(time.perf_counter() - began)
+            self.stdout.write(f'{name:>10} {percentile(timings, 50):>9.3f} {percentile(timings, 95):>9.3f}')
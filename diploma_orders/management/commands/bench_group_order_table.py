@@ -0,0 +1,70 @@
+import io
+import timeit
+import zipfile
+
+from django.core.management.base import BaseCommand
+
+from diploma_orders.docx_blocks import GroupOrderDocument, append_table_rows
+
+
+def build_rows(count):
+    """Синтетические строки таблицы студентов"""
+    return [
+        (
+            str(i),
+            f'Студентов{i} Студент Студентович\nТема: Разработка информационной системы №{i}',
+            f'Руководителев{i % 20} Руководитель Руководителевич,\nк.т.н.,\nдоцент',
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def document_xml(docx_bytes):
+    """word/document.xml из .docx (время в архиве у запусков разное)"""
+    with zipfile.ZipFile(io.BytesIO(docx_bytes)) as archive:
+        return archive.read('word/document.xml')
+
+
+def fill_with_add_row(rows):
+    """Прежний способ: table.add_row().cells и cell.text"""
+    document = GroupOrderDocument()
+    table = document.students_table
+    for row in rows:
+        cells = table.add_row().cells
+        for cell, text in zip(cells, row):
+            cell.text = text
+    return document.save()
+
+
+def fill_with_bulk_writer(rows):
+    """Все строки одним фрагментом XML"""
+    document = GroupOrderDocument()
+    append_table_rows(document.students_table, rows)
+    return document.save()
+
+
+class Command(BaseCommand):
+    help = 'Сравнение заполнения таблицы студентов: add_row и пакетная запись XML'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='30,300,3000',
+                            help='Числа строк через запятую')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['rows'].split(',')]
+        repeat = options['repeat']
+
+        self.stdout.write(f'{"строк":>8} {"add_row, мс":>13} {"bulk, мс":>10} {"ускорение":>10}')
+        for size in sizes:
+            rows = build_rows(size)
+            assert document_xml(fill_with_add_row(rows)) == document_xml(fill_with_bulk_writer(rows))
+
+            add_row_time = timeit.timeit(lambda: fill_with_add_row(rows), number=repeat)
+            bulk_time = timeit.timeit(lambda: fill_with_bulk_writer(rows), number=repeat)
+
+            add_row_ms = add_row_time / repeat * 1000
+            bulk_ms = bulk_time / repeat * 1000
+            self.stdout.write(
+                f'{size:>8} {add_row_ms:>13.1f} {bulk_ms:>10.1f} {add_row_ms / bulk_ms:>9.1f}x'
+            )
@@ -0,0 +1,64 @@
+import io
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from diploma_orders.pdf_fonts import get_pdf_fonts
+from diploma_orders.renderers import render_document_pdf, write_document_pdf
+
+# Абзацев на страницу: ~3 строки в абзаце, ~40 строк на странице A4
+PARAGRAPHS_PER_PAGE = 7
+
+
+def build_document(pages):
+    """Синтетический документ примерно на заданное число страниц"""
+    paragraph = ('Студент выполняет выпускную квалификационную работу по утвержденной теме '
+                 'под руководством научного руководителя и представляет ее на кафедру '
+                 'в установленный срок. ')
+    content = '\n'.join(f'{i}. {paragraph * 2}' for i in range(1, pages * PARAGRAPHS_PER_PAGE + 1))
+    return SimpleNamespace(document_number='БЕНЧ-1', document_date=date.today(), content=content)
+
+
+def measure(func):
+    """(результат, секунды, пик памяти в МБ)"""
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+class Command(BaseCommand):
+    help = 'Рендер длинного документа в PDF: в файл и в память'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=200)
+
+    def handle(self, *args, **options):
+        document = build_document(options['pages'])
+        font, _ = get_pdf_fonts()
+        self.stdout.write(f'Шрифт: {font}')
+
+        with tempfile.TemporaryFile() as output:
+            def to_file():
+                output.seek(0)
+                output.truncate()
+                return write_document_pdf(document, output)
+
+            pages, file_time, file_peak = measure(to_file)
+            size = output.seek(0, io.SEEK_END)
+
+        data, memory_time, memory_peak = measure(lambda: render_document_pdf(document))
+
+        self.stdout.write(f'Страниц: {pages}, размер: {size / 1024:.0f} КБ')
+        self.stdout.write(f'{"режим":>8} {"время, с":>9} {"пик памяти, МБ":>15}')
+        self.stdout.write(f'{"файл":>8} {file_time:>9.2f} {file_peak:>15.1f}')
+        self.stdout.write(f'{"память":>8} {memory_time:>9.2f} {memory_peak:>15.1f}')
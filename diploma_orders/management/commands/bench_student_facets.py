@@ -0,0 +1,112 @@
+import random
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from diploma_orders.facets import FACETS, count_facets, facet_index, filter_by_facets, search_queryset, selected_facets
+from diploma_orders.models import DiplomaProject, Group, Student, Supervisor
+from diploma_orders.search import is_search_index_available, rebuild_search_index
+
+LAST_NAMES = ['Иванов', 'Петров', 'Сидоров', 'Кузнецов', 'Смирнов', 'Попов', 'Волков', 'Соколов',
+              'Лебедев', 'Козлов', 'Новиков', 'Морозов', 'Егоров', 'Павлов', 'Семенов', 'Голубев']
+FIRST_NAMES = ['Иван', 'Петр', 'Алексей', 'Дмитрий', 'Сергей', 'Андрей', 'Мария', 'Анна', 'Елена']
+STATUSES = [status for status, _ in DiplomaProject.STATUS_CHOICES]
+
+
+def facets_per_value(params):
+    """Наивный вариант: отдельный COUNT на каждое значение каждого фасета"""
+    selected = selected_facets(params)
+    base = search_queryset(params)
+    result = {}
+    for name, field, _ in FACETS:
+        others = {key: value for key, value in selected.items() if key != name}
+        queryset = filter_by_facets(base, others)
+        values = queryset.order_by().values_list(field, flat=True).distinct()
+        result[name] = {value: filter_by_facets(queryset, {name: value}).count() for value in values if value}
+    return result
+
+
+def percentile(values, p):
+    return statistics.quantiles(values, n=100)[p - 1] * 1000
+
+
+class Command(BaseCommand):
+    help = 'Задержка подсчета фасетов списка студентов на синтетических данных; данные откатываются'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--naive', action='store_true', help='Сравнить с COUNT на каждое значение')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+        # Карты построены по откаченным данным
+        facet_index.invalidate()
+
+    def run(self, options):
+        rnd = random.Random(42)
+
+        groups = Group.objects.bulk_create(
+            Group(name=f'БЕНЧ-{i}', faculty='ИИС', course=i % 5 + 1) for i in range(200)
+        )
+        supervisors = Supervisor.objects.bulk_create(
+            Supervisor(last_name=rnd.choice(LAST_NAMES), first_name=rnd.choice(FIRST_NAMES),
+                       patronymic='Петрович') for _ in range(300)
+        )
+        students = Student.objects.bulk_create(
+            (Student(
+                last_name=rnd.choice(LAST_NAMES) + rnd.choice(['', 'а']),
+                first_name=rnd.choice(FIRST_NAMES),
+                patronymic='Иванович',
+                student_id=f'S{i:06d}',
+                group=groups[i % len(groups)],
+            ) for i in range(options['students'])),
+            batch_size=5000,
+        )
+        DiplomaProject.objects.bulk_create(
+            (DiplomaProject(
+                topic='Тема',
+                student=student,
+                supervisor=rnd.choice(supervisors),
+                status=rnd.choice(STATUSES),
+                registration_date=date(2026, 1, 1),
+                deadline=date(2026, 6, 1),
+            ) for student in students if rnd.random() < 0.7),
+            batch_size=5000,
+        )
+        if is_search_index_available():
+            rebuild_search_index()
+
+        requests = []
+        for _ in range(options['queries']):
+            params = {}
+            if rnd.random() < 0.3:
+                params['query'] = rnd.choice(LAST_NAMES)
+            if rnd.random() < 0.5:
+                params['group'] = str(rnd.choice(groups).pk)
+            if rnd.random() < 0.3:
+                params['status'] = rnd.choice(STATUSES)
+            requests.append(params)
+
+        started = time.perf_counter()
+        facet_index.rebuild()
+        self.stdout.write(f'Построение битовых карт: {time.perf_counter() - started:.2f} с')
+        count_facets({})  # прогрев кэша подписей
+
+        variants = [('карты', count_facets)]
+        if options['naive']:
+            variants.append(('на значение', facets_per_value))
+
+        self.stdout.write(f'{"фасеты":>12} {"p50, мс":>9} {"p95, мс":>9}')
+        for name, compute in variants:
+            timings = []
+            for params in requests:
+                began = time.perf_counter()
+                compute(params)
+                timings.append(time.perf_counter() - began)
+            self.stdout.write(f'{name:>12} {percentile(timings, 50):>9.1f} {percentile(timings, 95):>9.1f}')
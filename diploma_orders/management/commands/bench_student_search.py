@@ -0,0 +1,111 @@
+import random
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from diploma_orders.models import DiplomaProject, Group, Student
+from diploma_orders.search import is_search_index_available, rebuild_search_index, search_students
+
+LAST_NAMES = ['Иванов', 'Петров', 'Сидоров', 'Кузнецов', 'Смирнов', 'Попов', 'Волков', 'Соколов',
+              'Лебедев', 'Козлов', 'Новиков', 'Морозов', 'Егоров', 'Павлов', 'Семенов', 'Голубев']
+FIRST_NAMES = ['Иван', 'Петр', 'Алексей', 'Дмитрий', 'Сергей', 'Андрей', 'Мария', 'Анна', 'Елена']
+TOPIC_WORDS = ['разработка', 'информационной', 'системы', 'анализ', 'данных', 'управления',
+               'предприятия', 'модели', 'сервиса', 'автоматизация', 'учета', 'проектирование']
+
+
+def icontains_search(queryset, query):
+    """Прежний поиск: OR по icontains"""
+    return queryset.filter(
+        Q(last_name__icontains=query) |
+        Q(first_name__icontains=query) |
+        Q(patronymic__icontains=query) |
+        Q(student_id__icontains=query) |
+        Q(email__icontains=query)
+    )
+
+
+def build_queries(rnd, count):
+    """Запросы: фамилии в разных падежах, префиксы, номера студбилетов, слова темы"""
+    queries = []
+    for _ in range(count):
+        kind = rnd.randrange(4)
+        if kind == 0:
+            queries.append(rnd.choice(LAST_NAMES) + rnd.choice(['', 'а', 'у', 'ым', 'ой']))
+        elif kind == 1:
+            queries.append(rnd.choice(LAST_NAMES)[:4])
+        elif kind == 2:
+            queries.append(f'S{rnd.randrange(100000):06d}')
+        else:
+            queries.append(f'{rnd.choice(LAST_NAMES)} {rnd.choice(FIRST_NAMES)}')
+    return queries
+
+
+def percentile(values, p):
+    return statistics.quantiles(values, n=100)[p - 1] * 1000
+
+
+class Command(BaseCommand):
+    help = 'Задержка поиска студентов (FTS5 и icontains) на синтетических данных; данные откатываются'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if not is_search_index_available():
+            raise CommandError('Индекс поиска недоступен (нужна SQLite с FTS5 и миграция 0010)')
+
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        rnd = random.Random(42)
+        page_size = options['page_size']
+
+        started = time.perf_counter()
+        groups = Group.objects.bulk_create(
+            Group(name=f'БЕНЧ-{i}', faculty='ИИС', course=i % 5 + 1) for i in range(200)
+        )
+        students = Student.objects.bulk_create(
+            (Student(
+                last_name=rnd.choice(LAST_NAMES) + rnd.choice(['', 'а']),
+                first_name=rnd.choice(FIRST_NAMES),
+                patronymic='Иванович',
+                student_id=f'S{i:06d}',
+                email=f'student{i}@example.com',
+                group=groups[i % len(groups)],
+            ) for i in range(options['students'])),
+            batch_size=5000,
+        )
+        DiplomaProject.objects.bulk_create(
+            (DiplomaProject(
+                topic=' '.join(rnd.sample(TOPIC_WORDS, 5)),
+                student=student,
+                registration_date=date(2026, 1, 1),
+                deadline=date(2026, 6, 1),
+            ) for student in students[::2]),
+            batch_size=5000,
+        )
+        rebuild_search_index()
+        self.stdout.write(f'Данные и индекс: {time.perf_counter() - started:.1f} с')
+
+        queries = build_queries(rnd, options['queries'])
+        queryset = Student.objects.select_related('diploma_project', 'group')
+
+        self.stdout.write(f'{"поиск":>10} {"p50, мс":>9} {"p95, мс":>9}')
+        for name, search in (('fts5', search_students), ('icontains', icontains_search)):
+            timings = []
+            for query in queries:
+                began = time.perf_counter()
+                # Как в списке студентов: число результатов и первая страница
+                results = search(queryset, query)
+                results.count()
+                list(results[:page_size])
+                timings.append(time.perf_counter() - began)
+            self.stdout.write(f'{name:>10} {percentile(timings, 50):>9.1f} {percentile(timings, 95):>9.1f}')
@@ -0,0 +1,58 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from diploma_orders.template_engine import compile_content
+
+
+def render_with_replace(content, data):
+    """Прежний способ: content.replace по каждому полю"""
+    for key, value in data.items():
+        placeholder = f'{{{{{key}}}}}'
+        content = content.replace(placeholder, str(value))
+    return content
+
+
+def build_template(placeholders, fields):
+    """Синтетический шаблон с заданным числом плейсхолдеров"""
+    rnd = random.Random(placeholders)
+    words = ['приказ', 'студент', 'тема', 'руководитель', 'кафедра', 'работа', 'срок']
+    parts = []
+    for _ in range(placeholders):
+        parts.append(' '.join(rnd.choice(words) for _ in range(12)))
+        parts.append(f'{{{{{rnd.choice(fields)}}}}}')
+    parts.append('\n')
+    return ' '.join(parts)
+
+
+class Command(BaseCommand):
+    help = 'Сравнение скомпилированных шаблонов с циклом content.replace'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,50,100,250,500',
+                            help='Числа плейсхолдеров через запятую')
+        parser.add_argument('--fields', type=int, default=30,
+                            help='Количество полей в данных')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        fields = [f'field_{i}' for i in range(options['fields'])]
+        data = {field: f'значение {field}' for field in fields}
+        repeat = options['repeat']
+
+        self.stdout.write(f'{"плейсх.":>8} {"replace, мкс":>14} {"compiled, мкс":>14} {"ускорение":>10}')
+        for size in sizes:
+            content = build_template(size, fields)
+            compiled = compile_content(content)
+            assert compiled.render(data) == render_with_replace(content, data)
+
+            replace_time = timeit.timeit(lambda: render_with_replace(content, data), number=repeat)
+            compiled_time = timeit.timeit(lambda: compiled.render(data), number=repeat)
+
+            replace_us = replace_time / repeat * 1e6
+            compiled_us = compiled_time / repeat * 1e6
+            self.stdout.write(
+                f'{size:>8} {replace_us:>14.1f} {compiled_us:>14.1f} {replace_us / compiled_us:>9.1f}x'
+            )
@@ -0,0 +1,92 @@
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from docx import Document
+from docx.shared import Cm, Pt
+
+from diploma_orders.text_extraction import extract
+
+PARAGRAPH = (
+    'Актуальность темы выпускной квалификационной работы обусловлена ростом объема данных, '
+    'которые обрабатывают информационные системы образовательных организаций. В работе '
+    'рассмотрены методы хранения, индексации и анализа этих данных, предложена архитектура '
+    'системы и приведены результаты экспериментальной проверки. '
+)
+
+
+def build_thesis(path, pages):
+    """Синтетическая ВКР: страницы абзацев с заголовками и таблицами"""
+    document = Document()
+    document.styles['Normal'].font.name = 'Times New Roman'
+    document.styles['Normal'].font.size = Pt(14)
+    section = document.sections[0]
+    section.left_margin, section.right_margin = Cm(3), Cm(1.5)
+    for page in range(1, pages + 1):
+        if page % 10 == 1:
+            document.add_heading(f'Глава {page // 10 + 1}', level=1)
+        for _ in range(5):
+            paragraph = document.add_paragraph(PARAGRAPH)
+            paragraph.add_run(' Выделенный термин.').bold = True
+        if page % 10 == 5:
+            table = document.add_table(rows=6, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = 'Значение'
+        document.add_page_break()
+    document.save(path)
+
+
+def python_docx_text(path):
+    """Прежний способ: полная объектная модель python-docx"""
+    document = Document(path)
+    parts = [paragraph.text for paragraph in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                parts.append(cell.text)
+    return '\n'.join(parts)
+
+
+def streaming_text(path):
+    return extract(path).text()
+
+
+def first_page(path):
+    """Задержка до первой страницы - движок отдает ее, не читая остальные"""
+    return next(iter(extract(path)))
+
+
+class Command(BaseCommand):
+    help = 'Скорость извлечения текста из DOCX: потоковый движок и python-docx'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'thesis.docx')
+            build_thesis(path, options['pages'])
+
+            extraction = extract(path)
+            words = sum(len(text.split()) for _, text in extraction)
+            self.stdout.write(
+                f'Страниц: {extraction.metadata["page_count"]}, слов: {words}, '
+                f'файл: {os.path.getsize(path) // 1024} КБ'
+            )
+
+            self.stdout.write(f'{"способ":>22} {"медиана, мс":>12}')
+            for name, run in (
+                ('python-docx', python_docx_text),
+                ('iterparse, весь текст', streaming_text),
+                ('iterparse, 1 страница', first_page),
+            ):
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    run(path)
+                    timings.append(time.perf_counter() - started)
+                self.stdout.write(f'{name:>22} {statistics.median(timings) * 1000:>12.1f}')
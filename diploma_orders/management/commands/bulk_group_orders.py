@@ -0,0 +1,46 @@
+import contextlib
+import os
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from diploma_orders.bulk_orders import select_group_orders, write_group_orders_zip
+from diploma_orders.workers import default_process_count
+
+
+class Command(BaseCommand):
+    help = 'Генерация приказов всех групп (с фильтром по курсу/факультету) в ZIP-архив'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, help='Номер курса')
+        parser.add_argument('--faculty', help='Название факультета')
+        parser.add_argument('--all-orders', action='store_true',
+                            help='Все приказы, а не только последний по каждой группе')
+        parser.add_argument('--processes', type=int, default=default_process_count(),
+                            help='Количество процессов')
+        parser.add_argument('--output', help='Путь к ZIP-файлу')
+
+    def handle(self, *args, **options):
+        orders = select_group_orders(
+            course=options['course'],
+            faculty=options['faculty'],
+            latest_only=not options['all_orders'],
+        )
+        if not orders:
+            self.stdout.write(self.style.WARNING('Нет приказов, подходящих под фильтр'))
+            return
+
+        output = options['output'] or f'prikazy_{date.today().strftime("%Y%m%d")}.zip'
+        # Архив пишется во временный файл и появляется под своим именем только
+        # целиком; неполный архив не оставляем
+        partial = f'{output}.part'
+        try:
+            with open(partial, 'wb') as archive:
+                write_group_orders_zip(orders, archive, options['processes'])
+            os.replace(partial, output)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(partial)
+            raise
+
+        self.stdout.write(self.style.SUCCESS(f'Приказов: {len(orders)}, архив: {output}'))
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from diploma_orders.chunked_upload import discard_upload
+from diploma_orders.models import UploadSession
+
+# Незавершенные загрузки старше этого срока удаляются вместе с временными файлами
+DEFAULT_UPLOAD_SESSION_TTL = timedelta(days=1)
+
+
+class Command(BaseCommand):
+    help = 'Удаление брошенных загрузок файлов по частям и их временных файлов'
+
+    def handle(self, *args, **options):
+        ttl = getattr(settings, 'UPLOAD_SESSION_TTL', DEFAULT_UPLOAD_SESSION_TTL)
+        stale = UploadSession.objects.filter(updated_at__lt=timezone.now() - ttl)
+
+        count = 0
+        for session in stale.iterator():
+            discard_upload(session)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Удалено загрузок: {count}'))
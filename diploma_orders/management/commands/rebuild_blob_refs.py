@@ -0,0 +1,100 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from diploma_orders.blobs import BLOB_PREFIX, blob_references, blob_storage, sha256_of_name
+from diploma_orders.models import DiplomaProject, FileBlob
+
+
+class Command(BaseCommand):
+    help = 'Пересчет ссылок на файлы хранилища по базе и удаление файлов без ссылок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--import-legacy', action='store_true',
+            help='Перенести в хранилище файлы, загруженные до него (diplomas/...)',
+        )
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help='Не удалять файлы без ссылок моложе стольких секунд (идущие загрузки)',
+        )
+
+    def handle(self, *args, **options):
+        if options['import_legacy']:
+            self.import_legacy()
+
+        counts = Counter()
+        for model, field in blob_references():
+            names = model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+            counts.update(name for name in names.values_list(field, flat=True) if sha256_of_name(name))
+
+        with transaction.atomic():
+            stale, _ = FileBlob.objects.exclude(name__in=list(counts)).delete()
+            for name, ref_count in counts.items():
+                try:
+                    size = blob_storage.size(name)
+                except OSError:
+                    self.stderr.write(f'Файл не найден в хранилище: {name}')
+                    size = 0
+                FileBlob.objects.update_or_create(
+                    name=name,
+                    # Незавершенные сохранения тоже сбрасываются: счетчики берутся из базы
+                    defaults={'sha256': sha256_of_name(name), 'size': size, 'ref_count': ref_count, 'pending_refs': 0},
+                )
+
+        removed = 0
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        for name in self.stored_names():
+            if name not in counts and blob_storage.get_modified_time(name) < cutoff:
+                blob_storage.delete(name)
+                removed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов со ссылками: {len(counts)}, ссылок: {sum(counts.values())}, '
+            f'удалено записей: {stale}, удалено файлов без ссылок: {removed}'
+        ))
+
+    def import_legacy(self):
+        """Переложить файлы со старыми именами в хранилище и обновить ссылки"""
+        moved = {}
+        for model, field in blob_references():
+            names = (
+                model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                .values_list(field, flat=True).distinct()
+            )
+            for name in names:
+                if sha256_of_name(name):
+                    continue
+                if name not in moved:
+                    if not default_storage.exists(name):
+                        self.stderr.write(f'Файл не найден: {name}')
+                        continue
+                    with default_storage.open(name, 'rb') as file:
+                        moved[name] = blob_storage.save(BLOB_PREFIX + os.path.basename(name), File(file))
+                # update() без сигналов - счетчики пересчитываются следом
+                model.objects.filter(**{field: name}).update(**{field: moved[name]})
+
+        # Исходное имя файла диплома сохраняется для скачивания
+        for old_name, new_name in moved.items():
+            DiplomaProject.objects.filter(file=new_name, file_original_name='').update(
+                file_original_name=os.path.basename(old_name)
+            )
+            default_storage.delete(old_name)
+        self.stdout.write(f'Перенесено в хранилище: {len(moved)}')
+
+    def stored_names(self):
+        """Имена всех файлов в каталоге хранилища"""
+        prefix = BLOB_PREFIX.rstrip('/')
+        if not blob_storage.exists(prefix):
+            return
+        for directory in blob_storage.listdir(prefix)[0]:
+            for filename in blob_storage.listdir(f'{prefix}/{directory}')[1]:
+                name = f'{prefix}/{directory}/{filename}'
+                if sha256_of_name(name):
+                    yield name
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from diploma_orders.search import is_search_index_available, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Перестройка полнотекстового индекса студентов (SQLite FTS5)'
+
+    def handle(self, *args, **options):
+        if not is_search_index_available():
+            raise CommandError('Индекс поиска недоступен (нужна SQLite с FTS5 и миграция 0010)')
+        count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано студентов: {count}'))
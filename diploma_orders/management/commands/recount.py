@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from diploma_orders.counters import recount_all
+from diploma_orders.dashboard import invalidate_dashboard
+
+
+class Command(BaseCommand):
+    help = 'Пересчет счетчиков студентов и дипломов у групп и руководителей'
+
+    def handle(self, *args, **options):
+        groups, supervisors = recount_all()
+        # Счетчики обновлены через update() без сигналов
+        invalidate_dashboard()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано: групп - {groups}, руководителей - {supervisors}'
+        ))
@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from diploma_orders.render_jobs import claim_jobs, mark_failed, process_render_job, requeue_stale_jobs
+from diploma_orders.workers import create_process_pool, default_process_count
+
+
+def run_job(job_id):
+    try:
+        return process_render_job(job_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Фоновая генерация документов из очереди RenderJob'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=default_process_count(),
+                            help='Количество процессов пула')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Интервал опроса очереди, сек.')
+        parser.add_argument('--stale-minutes', type=int, default=30,
+                            help='Через сколько минут зависшее задание возвращается в очередь')
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать текущую очередь и завершиться')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        poll_interval = options['poll_interval']
+
+        requeued = requeue_stale_jobs(timedelta(minutes=options['stale_minutes']))
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь зависших заданий: {requeued}')
+
+        self.stdout.write(f'Обработчик запущен, процессов: {processes}')
+
+        running = {}
+        with create_process_pool(processes) as pool:
+            try:
+                while True:
+                    free_slots = processes - len(running)
+                    if free_slots > 0:
+                        for job_id in claim_jobs(free_slots):
+                            running[pool.submit(run_job, job_id)] = job_id
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_id = running.pop(future)
+                        try:
+                            status = future.result()
+                            self.stdout.write(f'Задание {job_id}: {status}')
+                        except Exception as e:
+                            mark_failed(job_id, str(e))
+                            self.stderr.write(f'Задание {job_id}: ошибка процесса - {e}')
+            except KeyboardInterrupt:
+                self.stdout.write('Остановка обработчика...')
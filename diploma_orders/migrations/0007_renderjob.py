@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diploma_orders', '0006_add_file_to_diplomaproject'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('document', 'Сгенерированный документ'), ('group_order', 'Приказ по группе')], max_length=20, verbose_name='Тип задания')),
+                ('format_type', models.CharField(choices=[('html', 'HTML'), ('docx', 'DOCX'), ('pdf', 'PDF')], max_length=10, verbose_name='Формат')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('processing', 'В обработке'), ('completed', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('result_file', models.FileField(blank=True, null=True, upload_to='render_jobs/', verbose_name='Файл результата')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('source_updated_at', models.DateTimeField(blank=True, null=True, verbose_name='Версия источника')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начато')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Создатель')),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='render_jobs', to='diploma_orders.generateddocument', verbose_name='Документ')),
+                ('group_order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='render_jobs', to='diploma_orders.grouporder', verbose_name='Приказ по группе')),
+            ],
+            options={
+                'verbose_name': 'Задание генерации',
+                'verbose_name_plural': 'Задания генерации',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='diploma_ord_status_2d2e09_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diploma_orders', '0007_renderjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generateddocument',
+            name='artifact_keys',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Ключи файлов'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:19
+
+from django.db import migrations, models
+
+from diploma_orders.counters import recount_group_counters, recount_supervisor_counters
+
+
+def populate_counters(apps, schema_editor):
+    recount_group_counters(apps.get_model('diploma_orders', 'Group'), apps.get_model('diploma_orders', 'Student'))
+    recount_supervisor_counters(apps.get_model('diploma_orders', 'Supervisor'), apps.get_model('diploma_orders', 'DiplomaProject'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diploma_orders', '0008_generateddocument_artifact_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='diploma_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Дипломов'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='student_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Студентов'),
+        ),
+        migrations.AddField(
+            model_name='supervisor',
+            name='student_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во студентов'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+import logging
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+logger = logging.getLogger(__name__)
+
+# Копия схемы и перестройки из diploma_orders/search.py на момент миграции
+SEARCH_TABLE = 'diploma_orders_student_fts'
+SEARCH_COLUMNS = ('full_name', 'student_number', 'email', 'topic')
+
+INSERT_SQL = (
+    f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(SEARCH_COLUMNS)}) '
+    f'VALUES (%s, %s, %s, %s, %s)'
+)
+
+
+def normalize_text(text):
+    return (text or '').lower().replace('ё', 'е')
+
+
+def rebuild_search_index(student_model, connection, batch_size=2000):
+    rows = student_model.objects.order_by().values_list(
+        'id', 'last_name', 'first_name', 'patronymic', 'student_id', 'email', 'diploma_project__topic',
+    ).iterator(chunk_size=batch_size)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        batch = []
+        for student_id, last_name, first_name, patronymic, student_number, email, topic in rows:
+            full_name = ' '.join(part for part in (last_name, first_name, patronymic) if part)
+            batch.append((
+                student_id, normalize_text(full_name), normalize_text(student_number),
+                normalize_text(email), normalize_text(topic),
+            ))
+            if len(batch) >= batch_size:
+                cursor.executemany(INSERT_SQL, batch)
+                batch = []
+        if batch:
+            cursor.executemany(INSERT_SQL, batch)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+
+
+def create_search_index(apps, schema_editor):
+    # Индекс только для SQLite с FTS5, на других СУБД остается поиск через icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            f"{', '.join(SEARCH_COLUMNS)}, tokenize='unicode61', prefix='2 3 4')"
+        )
+    except OperationalError:
+        logger.warning('SQLite собран без FTS5, полнотекстовый поиск студентов отключен')
+        return
+    rebuild_search_index(apps.get_model('diploma_orders', 'Student'), schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diploma_orders', '0009_group_supervisor_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diploma_orders', '0010_student_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generateddocument',
+            index=models.Index(fields=['created_at', 'id'], name='diploma_ord_created_f8d406_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='grouporder',
+            index=models.Index(fields=['order_date', 'id'], name='diploma_ord_order_d_cd03e9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='diploma_ord_last_na_d1f4e3_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:42
+
+import diploma_orders.blobs
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diploma_orders', '0012_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Имя в хранилище')),
+                ('sha256', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Размер, байт')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+            ],
+            options={
+                'verbose_name': 'Файл хранилища',
+                'verbose_name_plural': 'Файлы хранилища',
+            },
+        ),
+        migrations.AddField(
+            model_name='diplomaaianalysis',
+            name='diploma_file',
+            field=models.FileField(blank=True, null=True, storage=diploma_orders.blobs.ContentAddressedStorage(), upload_to='blobs/', verbose_name='Анализируемый файл'),
+        ),
+        migrations.AddField(
+            model_name='diplomaproject',
+            name='file_original_name',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Исходное имя файла'),
+        ),
+        migrations.AlterField(
+            model_name='diplomaproject',
+            name='file',
+            field=models.FileField(blank=True, help_text='Загрузите файл дипломной работы (PDF, DOCX, DOC, TXT)', null=True, storage=diploma_orders.blobs.ContentAddressedStorage(), upload_to='blobs/', verbose_name='Файл диплома'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diploma_orders', '0013_file_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256 файла')),
+                ('text', models.BinaryField(verbose_name='Текст (zlib)')),
+                ('page_offsets', models.JSONField(default=list, verbose_name='Начала страниц в тексте')),
+                ('metadata', models.JSONField(default=dict, verbose_name='Метаданные файла')),
+                ('extractor_version', models.PositiveSmallIntegerField(default=1, verbose_name='Версия извлечения')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Извлечен')),
+            ],
+            options={
+                'verbose_name': 'Извлеченный текст',
+                'verbose_name_plural': 'Извлеченные тексты',
+            },
+        ),
+    ]
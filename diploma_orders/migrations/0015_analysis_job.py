@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diploma_orders', '0014_extracted_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('analysis_type', models.CharField(choices=[('full', 'Полный анализ'), ('format', 'Проверка формата'), ('review', 'Рецензия'), ('questions', 'Вопросы для защиты')], default='full', max_length=20, verbose_name='Тип анализа')),
+                ('ai_provider', models.CharField(default='openai', max_length=50, verbose_name='Провайдер ИИ')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('processing', 'В обработке'), ('completed', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начато')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Создатель')),
+                ('diploma_project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_jobs', to='diploma_orders.diplomaproject', verbose_name='Дипломный проект')),
+            ],
+            options={
+                'verbose_name': 'Задание ИИ-анализа',
+                'verbose_name_plural': 'Задания ИИ-анализа',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='diploma_ord_status_bd69fe_idx')],
+            },
+        ),
+    ]
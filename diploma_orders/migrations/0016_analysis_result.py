@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diploma_orders', '0015_analysis_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='force_refresh',
+            field=models.BooleanField(default=False, help_text='Запросить провайдера заново, даже если результат для файла уже есть', verbose_name='Без кэша'),
+        ),
+        migrations.CreateModel(
+            name='AnalysisResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256 файла')),
+                ('analysis_type', models.CharField(choices=[('full', 'Полный анализ'), ('format', 'Проверка формата'), ('review', 'Рецензия'), ('questions', 'Вопросы для защиты')], max_length=20, verbose_name='Тип анализа')),
+                ('ai_provider', models.CharField(max_length=50, verbose_name='Провайдер ИИ')),
+                ('model', models.CharField(max_length=100, verbose_name='Модель')),
+                ('prompt_version', models.PositiveSmallIntegerField(verbose_name='Версия промптов')),
+                ('result', models.JSONField(default=dict, verbose_name='Результат')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Использований')),
+                ('created_at', models.DateTimeField(verbose_name='Получен')),
+                ('last_used_at', models.DateTimeField(db_index=True, verbose_name='Последнее использование')),
+            ],
+            options={
+                'verbose_name': 'Результат ИИ-анализа',
+                'verbose_name_plural': 'Результаты ИИ-анализа',
+                'unique_together': {('sha256', 'analysis_type', 'ai_provider', 'model', 'prompt_version')},
+            },
+        ),
+    ]
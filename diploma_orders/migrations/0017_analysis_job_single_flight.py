@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    """Оставить по одному активному заданию каждого типа на диплом (самое раннее)"""
+    AnalysisJob = apps.get_model('diploma_orders', 'AnalysisJob')
+    kept = set()
+    duplicates = []
+    active = AnalysisJob.objects.filter(status__in=['pending', 'processing']).order_by('created_at', 'id')
+    for job_id, diploma_id, analysis_type in active.values_list('id', 'diploma_project_id', 'analysis_type'):
+        if (diploma_id, analysis_type) in kept:
+            duplicates.append(job_id)
+        kept.add((diploma_id, analysis_type))
+    AnalysisJob.objects.filter(id__in=duplicates).update(status='failed', error='Повторное задание')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diploma_orders', '0016_analysis_result'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Заголовок Idempotency-Key запроса: повтор с тем же ключом возвращает это задание', max_length=255, verbose_name='Ключ идемпотентности'),
+        ),
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='analysisjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'processing'])), fields=('diploma_project', 'analysis_type'), name='analysis_job_single_flight'),
+        ),
+        migrations.AddConstraint(
+            model_name='analysisjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('idempotency_key', ''), _negated=True), fields=('created_by', 'idempotency_key'), name='analysis_job_idempotency_key'),
+        ),
+    ]
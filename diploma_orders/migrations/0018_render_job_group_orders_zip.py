@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diploma_orders', '0017_analysis_job_single_flight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renderjob',
+            name='params',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Параметры'),
+        ),
+        migrations.AlterField(
+            model_name='renderjob',
+            name='format_type',
+            field=models.CharField(choices=[('html', 'HTML'), ('docx', 'DOCX'), ('pdf', 'PDF'), ('zip', 'ZIP')], max_length=10, verbose_name='Формат'),
+        ),
+        migrations.AlterField(
+            model_name='renderjob',
+            name='kind',
+            field=models.CharField(choices=[('document', 'Сгенерированный документ'), ('group_order', 'Приказ по группе'), ('group_orders_zip', 'Архив приказов по группам')], max_length=20, verbose_name='Тип задания'),
+        ),
+    ]
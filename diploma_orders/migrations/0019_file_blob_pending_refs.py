@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diploma_orders', '0018_render_job_group_orders_zip'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileblob',
+            name='pending_refs',
+            field=models.PositiveIntegerField(default=0, verbose_name='Сохранения, еще не ставшие ссылками'),
+        ),
+    ]
@@ -3,6 +3,10 @@ from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 import os
+import uuid
+import zlib
+
+from .blobs import BLOB_PREFIX, BlobReferencesMixin, blob_storage, sha256_of_name
 
 def student_photo_path(instance, filename):
     """Генерация пути для фотографий студентов"""
@@ -27,13 +31,32 @@ class Group(models.Model):
         verbose_name="Курс",
         help_text="Номер курса (1-6)"
     )
+    # Счетчики обновляются сигналами (diploma_orders/signals.py), пересчет: manage.py recount
+    student_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Студентов"
+    )
+    diploma_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Дипломов"
+    )
+
     @property
     def students_with_diploma_count(self):
-        return self.students.filter(diploma_project__isnull=False).count()
+        return self.diploma_count
     
     @property
     def students_without_diploma_count(self):
-        return self.students.filter(diploma_project__isnull=True).count()
+        return max(self.student_count - self.diploma_count, 0)
+
+    @property
+    def diploma_percentage(self):
+        """Процент студентов с дипломными проектами"""
+        if self.student_count > 0:
+            return int(self.diploma_count / self.student_count * 100)
+        return 0
     
     class Meta:
         verbose_name = "Учебная группа"
@@ -81,6 +104,12 @@ class Supervisor(models.Model):
         blank=True,
         null=True
     )
+    # Число дипломных проектов руководителя (обновляется сигналами)
+    student_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Кол-во студентов"
+    )
     
     class Meta:
         verbose_name = "Научный руководитель"
@@ -158,6 +187,10 @@ class Student(models.Model):
         verbose_name = "Студент"
         verbose_name_plural = "Студенты"
         ordering = ['last_name', 'first_name']
+        indexes = [
+            # Keyset-пагинация списка (diploma_orders/pagination.py)
+            models.Index(fields=['last_name', 'first_name', 'id']),
+        ]
     
     def __str__(self):
         if self.patronymic:
@@ -174,7 +207,7 @@ class Student(models.Model):
         """URL для детальной страницы студента"""
         return reverse('student_detail', args=[str(self.id)])
 
-class DiplomaProject(models.Model):
+class DiplomaProject(BlobReferencesMixin, models.Model):
     """Модель дипломного проекта"""
     topic = models.CharField(
         max_length=500,
@@ -204,11 +237,18 @@ class DiplomaProject(models.Model):
     )
     file = models.FileField(
         "Файл диплома",
-        upload_to='diplomas/%Y/%m/%d/',
+        upload_to=BLOB_PREFIX,
+        storage=blob_storage,
         null=True,
         blank=True,
         help_text="Загрузите файл дипломной работы (PDF, DOCX, DOC, TXT)"
     )
+    # Файл хранится под именем из хэша содержимого, исходное имя - для скачивания
+    file_original_name = models.CharField(
+        "Исходное имя файла",
+        max_length=255,
+        blank=True
+    )
 
     STATUS_CHOICES = [
         ('registered', 'Зарегистрирована'),
@@ -267,6 +307,17 @@ class DiplomaProject(models.Model):
         if self.file and hasattr(self.file, 'size'):
             return self.file.size
         return 0
+    
+    def get_file_name(self):
+        """Имя файла, под которым его загрузили"""
+        if self.file:
+            return self.file_original_name or os.path.basename(self.file.name)
+        return ''
+    
+    @property
+    def file_sha256(self):
+        """SHA-256 содержимого файла (None, если файла нет или он вне хранилища)"""
+        return sha256_of_name(self.file.name) if self.file else None
 
 class GroupOrder(models.Model):
     """Модель приказа по группе"""
@@ -312,6 +363,10 @@ class GroupOrder(models.Model):
         verbose_name = "Приказ по группе"
         verbose_name_plural = "Приказы по группам"
         ordering = ['-order_date']
+        indexes = [
+            # Keyset-пагинация списка (diploma_orders/pagination.py)
+            models.Index(fields=['order_date', 'id']),
+        ]
     
     def __str__(self):
         return f"Приказ №{self.order_number} от {self.order_date} - {self.group.name}"
@@ -470,6 +525,9 @@ class GeneratedDocument(models.Model):
     docx_file = models.FileField('DOCX файл', upload_to='documents/docx/', blank=True, null=True)
     pdf_file = models.FileField('PDF файл', upload_to='documents/pdf/', blank=True, null=True)
     
+    # Ключи готовых файлов по форматам (хэш исходных данных рендера)
+    artifact_keys = models.JSONField('Ключи файлов', default=dict, blank=True)
+    
     # Метаданные
     document_number = models.CharField('Номер документа', max_length=100, unique=True)
     document_date = models.DateField('Дата документа')
@@ -497,9 +555,20 @@ class GeneratedDocument(models.Model):
         verbose_name = 'Сгенерированный документ'
         verbose_name_plural = 'Сгенерированные документы'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset-пагинация списка (diploma_orders/pagination.py)
+            models.Index(fields=['created_at', 'id']),
+        ]
+    
+    # Подписанные и архивные документы не перегенерируются
+    FROZEN_STATUSES = ('signed', 'archived')
     
     def __str__(self):
         return f"{self.document_number} - {self.template.name if self.template else 'Без шаблона'}"
+    
+    def is_frozen(self):
+        """Документ зафиксирован и его файлы не перегенерируются"""
+        return self.status in self.FROZEN_STATUSES
 
 
 class DocumentCollaborator(models.Model):
@@ -585,7 +654,7 @@ class DocumentHistory(models.Model):
     def __str__(self):
         return f"{self.get_action_display()} - {self.document.document_number} ({self.timestamp})"
 
-class DiplomaAIAnalysis(models.Model):
+class DiplomaAIAnalysis(BlobReferencesMixin, models.Model):
     """Анализ диплома ИИ"""
     diploma_project = models.OneToOneField(
         DiplomaProject,
@@ -614,6 +683,13 @@ class DiplomaAIAnalysis(models.Model):
     ai_provider = models.CharField("Провайдер ИИ", max_length=50, default='openai')
     raw_response = models.JSONField("Сырой ответ ИИ", default=dict)
     file_metadata = models.JSONField("Метаданные файла", default=dict)
+    diploma_file = models.FileField(
+        "Анализируемый файл",
+        upload_to=BLOB_PREFIX,
+        storage=blob_storage,
+        null=True,
+        blank=True
+    )
     
     # Статус
     STATUS_CHOICES = [
@@ -647,6 +723,11 @@ class DiplomaAIAnalysis(models.Model):
     def get_questions_count(self):
         """Количество сгенерированных вопросов"""
         return len(self.questions) if isinstance(self.questions, list) else 0
+    
+    @property
+    def file_sha256(self):
+        """SHA-256 анализируемого файла"""
+        return sha256_of_name(self.diploma_file.name) if self.diploma_file else None
 
 
 class PageAIInteraction(models.Model):
@@ -749,4 +830,273 @@ class AIQuestionBank(models.Model):
             current_success = self.success_rate * (self.usage_count - 1)
             self.success_rate = (current_success + 1) / self.usage_count
         
-        self.save()
\ No newline at end of file
+        self.save()
+
+class RenderJob(models.Model):
+    """Задание фоновой генерации документа (HTML/DOCX/PDF)"""
+    KIND_CHOICES = [
+        ('document', 'Сгенерированный документ'),
+        ('group_order', 'Приказ по группе'),
+        ('group_orders_zip', 'Архив приказов по группам'),
+    ]
+    kind = models.CharField('Тип задания', max_length=20, choices=KIND_CHOICES)
+    # Фильтр архива приказов: course, faculty
+    params = models.JSONField('Параметры', default=dict, blank=True)
+    
+    document = models.ForeignKey(
+        GeneratedDocument,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='render_jobs',
+        verbose_name='Документ'
+    )
+    group_order = models.ForeignKey(
+        GroupOrder,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='render_jobs',
+        verbose_name='Приказ по группе'
+    )
+    
+    FORMAT_CHOICES = [
+        ('html', 'HTML'),
+        ('docx', 'DOCX'),
+        ('pdf', 'PDF'),
+        ('zip', 'ZIP'),
+    ]
+    format_type = models.CharField('Формат', max_length=10, choices=FORMAT_CHOICES)
+    
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('processing', 'В обработке'),
+        ('completed', 'Готово'),
+        ('failed', 'Ошибка'),
+    ]
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='pending')
+    
+    # Результат для приказов по группе (документы пишутся в свои поля файлов)
+    result_file = models.FileField('Файл результата', upload_to='render_jobs/', blank=True, null=True)
+    error = models.TextField('Ошибка', blank=True)
+    
+    # Версия документа, для которой поставлено задание
+    source_updated_at = models.DateTimeField('Версия источника', null=True, blank=True)
+    
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name='Создатель'
+    )
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    started_at = models.DateTimeField('Начато', null=True, blank=True)
+    finished_at = models.DateTimeField('Завершено', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Задание генерации'
+        verbose_name_plural = 'Задания генерации'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        target = self.document or self.group_order or self.get_kind_display()
+        return f"{self.get_format_type_display()} - {target} ({self.get_status_display()})"
+    
+    def get_result_file(self):
+        """Файл с результатом (для документов - соответствующее поле документа)"""
+        if self.kind == 'document' and self.document:
+            return getattr(self.document, f'{self.format_type}_file')
+        return self.result_file
+    
+    def get_download_filename(self):
+        """Имя файла для скачивания"""
+        if self.kind == 'document' and self.document:
+            return f'{self.document.document_number}.{self.format_type}'
+        if self.group_order:
+            return f'приказ_группа_{self.group_order.group.name}_{self.group_order.order_number}.{self.format_type}'
+        if self.kind == 'group_orders_zip':
+            return f'prikazy_{timezone.localdate(self.created_at).strftime("%Y%m%d")}.zip'
+        return os.path.basename(self.result_file.name)
+
+
+class UploadSession(models.Model):
+    """Загрузка файла диплома по частям (с докачкой)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    diploma_project = models.ForeignKey(
+        DiplomaProject,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name='Дипломный проект'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name='Пользователь'
+    )
+    filename = models.CharField('Имя файла', max_length=255)
+    size = models.PositiveBigIntegerField('Размер, байт')
+    offset = models.PositiveBigIntegerField('Получено, байт', default=0)
+    expected_sha256 = models.CharField('Ожидаемый SHA-256', max_length=64, blank=True)
+    
+    STATUS_CHOICES = [
+        ('active', 'Загружается'),
+        ('completed', 'Завершена'),
+    ]
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='active')
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    updated_at = models.DateTimeField('Обновлена', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Загрузка файла'
+        verbose_name_plural = 'Загрузки файлов'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
+class FileBlob(models.Model):
+    """Файл хранилища с адресацией по содержимому и счетчик ссылок на него"""
+    name = models.CharField('Имя в хранилище', max_length=255, unique=True)
+    sha256 = models.CharField('SHA-256', max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField('Размер, байт', default=0)
+    ref_count = models.PositiveIntegerField('Число ссылок', default=0)
+    pending_refs = models.PositiveIntegerField('Сохранения, еще не ставшие ссылками', default=0)
+    created_at = models.DateTimeField('Создан', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Файл хранилища'
+        verbose_name_plural = 'Файлы хранилища'
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+class ExtractedText(models.Model):
+    """Текст, извлеченный из файла диплома, по хэшу содержимого файла"""
+    sha256 = models.CharField('SHA-256 файла', max_length=64, unique=True)
+    text = models.BinaryField('Текст (zlib)')
+    page_offsets = models.JSONField('Начала страниц в тексте', default=list)
+    metadata = models.JSONField('Метаданные файла', default=dict)
+    extractor_version = models.PositiveSmallIntegerField('Версия извлечения', default=1)
+    created_at = models.DateTimeField('Извлечен', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Извлеченный текст'
+        verbose_name_plural = 'Извлеченные тексты'
+    
+    def __str__(self):
+        return self.sha256
+    
+    def get_text(self):
+        """Весь текст, страницы разделены символом \\f"""
+        if not hasattr(self, '_text'):
+            self._text = zlib.decompress(self.text).decode('utf-8')
+        return self._text
+    
+    def pages(self):
+        """(номер страницы, текст) по порядку"""
+        text = self.get_text()
+        ends = self.page_offsets[1:] + [len(text) + 1]
+        for number, (start, end) in enumerate(zip(self.page_offsets, ends), 1):
+            yield number, text[start:end - 1]
+
+
+class AnalysisJob(models.Model):
+    """Задание фонового ИИ-анализа диплома"""
+    diploma_project = models.ForeignKey(
+        DiplomaProject,
+        on_delete=models.CASCADE,
+        related_name='analysis_jobs',
+        verbose_name='Дипломный проект'
+    )
+    
+    ANALYSIS_TYPE_CHOICES = [
+        ('full', 'Полный анализ'),
+        ('format', 'Проверка формата'),
+        ('review', 'Рецензия'),
+        ('questions', 'Вопросы для защиты'),
+    ]
+    analysis_type = models.CharField('Тип анализа', max_length=20, choices=ANALYSIS_TYPE_CHOICES, default='full')
+    ai_provider = models.CharField('Провайдер ИИ', max_length=50, default='openai')
+    
+    # Статусы совпадают со статусами DiplomaAIAnalysis и переносятся в анализ
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('processing', 'В обработке'),
+        ('completed', 'Готово'),
+        ('failed', 'Ошибка'),
+    ]
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField('Ошибка', blank=True)
+    force_refresh = models.BooleanField(
+        'Без кэша', default=False,
+        help_text='Запросить провайдера заново, даже если результат для файла уже есть'
+    )
+    idempotency_key = models.CharField(
+        'Ключ идемпотентности', max_length=255, blank=True,
+        help_text='Заголовок Idempotency-Key запроса: повтор с тем же ключом возвращает это задание'
+    )
+    
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name='Создатель'
+    )
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    started_at = models.DateTimeField('Начато', null=True, blank=True)
+    finished_at = models.DateTimeField('Завершено', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Задание ИИ-анализа'
+        verbose_name_plural = 'Задания ИИ-анализа'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        constraints = [
+            # Не больше одного активного задания каждого типа на диплом:
+            # строка задания служит блокировкой и для нескольких процессов
+            models.UniqueConstraint(
+                fields=['diploma_project', 'analysis_type'],
+                condition=models.Q(status__in=['pending', 'processing']),
+                name='analysis_job_single_flight',
+            ),
+            models.UniqueConstraint(
+                fields=['created_by', 'idempotency_key'],
+                condition=~models.Q(idempotency_key=''),
+                name='analysis_job_idempotency_key',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_analysis_type_display()} #{self.diploma_project_id} ({self.get_status_display()})"
+
+
+class AnalysisResult(models.Model):
+    """Результат ИИ-анализа файла: значения полей DiplomaAIAnalysis по типу анализа"""
+    sha256 = models.CharField('SHA-256 файла', max_length=64)
+    analysis_type = models.CharField('Тип анализа', max_length=20, choices=AnalysisJob.ANALYSIS_TYPE_CHOICES)
+    ai_provider = models.CharField('Провайдер ИИ', max_length=50)
+    model = models.CharField('Модель', max_length=100)
+    prompt_version = models.PositiveSmallIntegerField('Версия промптов')
+    result = models.JSONField('Результат', default=dict)
+    hits = models.PositiveIntegerField('Использований', default=0)
+    created_at = models.DateTimeField('Получен')
+    last_used_at = models.DateTimeField('Последнее использование', db_index=True)
+    
+    class Meta:
+        verbose_name = 'Результат ИИ-анализа'
+        verbose_name_plural = 'Результаты ИИ-анализа'
+        unique_together = ['sha256', 'analysis_type', 'ai_provider', 'model', 'prompt_version']
+    
+    def __str__(self):
+        return f"{self.get_analysis_type_display()} {self.sha256[:12]} ({self.ai_provider}/{self.model})"
@@ -0,0 +1,212 @@
+# diploma_orders/pagination.py
+"""
+Keyset (seek) пагинация для больших списков.
+
+Вместо OFFSET страница выбирается условием «после/до значений сортировки
+граничной записи», поэтому глубокие страницы не медленнее первой. Позиция
+передается непрозрачным курсором (?cursor=...), общий COUNT(*) не
+выполняется: число записей считается приблизительно, с ограничением сверху.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.http import Http404
+
+CURSOR_PARAM = 'cursor'
+
+# Сколько записей максимум досчитывать для приблизительного итога
+DEFAULT_COUNT_LIMIT = 1000
+
+
+def encode_cursor(payload):
+    data = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Содержимое курсора; Http404 для поврежденного курсора"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise Http404('Неверный курсор страницы')
+    if not isinstance(payload, dict):
+        raise Http404('Неверный курсор страницы')
+    return payload
+
+
+class KeysetPage:
+    """Страница keyset-пагинации (совместима с has_next/has_previous у Page)"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, paginator):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.paginator = paginator
+        self.next_query = ''
+        self.previous_query = ''
+        self.first_query = ''
+        self.last_query = ''
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Пагинатор по полям сортировки ordering (например, ('-created_at', '-id')).
+
+    Последнее поле должно быть уникальным. Если ordering не задан (например,
+    сортировка по релевантности поиска), курсор хранит смещение.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None, count_limit=DEFAULT_COUNT_LIMIT):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering) if ordering else None
+        self.count_limit = count_limit
+        self._count = None
+
+    # --- поля сортировки ---
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _row_key(self, obj):
+        return [getattr(obj, name) for name, _ in self._fields()]
+
+    def _parse_key(self, values):
+        model = self.queryset.model
+        fields = self._fields()
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise Http404('Неверный курсор страницы')
+        try:
+            return [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(fields, values)
+            ]
+        except Exception:
+            raise Http404('Неверный курсор страницы')
+
+    def _seek_filter(self, key, forward):
+        """Записи строго после (forward) или до ключа в порядке ordering"""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self._fields(), key):
+            # Вперед по возрастанию -> gt, по убыванию -> lt; назад - наоборот
+            lookup = f'{name}__gt' if forward != descending else f'{name}__lt'
+            condition |= equal & Q(**{lookup: value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _order_by(self, forward):
+        if forward:
+            return self.ordering
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering)
+
+    # --- страницы ---
+
+    def page(self, cursor=None):
+        payload = decode_cursor(cursor) if cursor else {}
+        if self.ordering is None:
+            return self._offset_page(payload)
+
+        forward = payload.get('d', 'n') == 'n'
+        queryset = self.queryset.order_by(*self._order_by(forward))
+        if 'k' in payload:
+            queryset = queryset.filter(self._seek_filter(self._parse_key(payload['k']), forward))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        # С курсором в обратную сторону записи есть всегда; без курсора назад - это последняя страница
+        has_next = has_more if forward else 'k' in payload
+        has_previous = 'k' in payload if forward else has_more
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor({'d': 'n', 'k': self._row_key(rows[-1])})
+        if rows and has_previous:
+            previous_cursor = encode_cursor({'d': 'p', 'k': self._row_key(rows[0])})
+        return KeysetPage(rows, next_cursor, previous_cursor, self)
+
+    def _offset_page(self, payload):
+        offset = payload.get('o', 0)
+        if not isinstance(offset, int) or offset < 0:
+            raise Http404('Неверный курсор страницы')
+
+        rows = list(self.queryset[offset:offset + self.per_page + 1])
+        next_cursor = previous_cursor = None
+        if len(rows) > self.per_page:
+            next_cursor = encode_cursor({'o': offset + self.per_page})
+        if offset > 0:
+            previous_cursor = encode_cursor({'o': max(offset - self.per_page, 0)})
+        return KeysetPage(rows[:self.per_page], next_cursor, previous_cursor, self)
+
+    # --- приблизительный итог ---
+
+    @property
+    def count(self):
+        """Число записей, но не больше count_limit + 1"""
+        if self._count is None:
+            self._count = self.queryset.order_by()[:self.count_limit + 1].count()
+        return self._count
+
+    @property
+    def count_is_exact(self):
+        return self.count <= self.count_limit
+
+    @property
+    def count_display(self):
+        """Итог для шаблона: «125» или «более 1000»"""
+        if self.count_is_exact:
+            return str(self.count)
+        return f'более {self.count_limit}'
+
+
+class KeysetPaginationMixin:
+    """Keyset-пагинация для ListView: задайте paginate_by и keyset_ordering"""
+    keyset_ordering = None
+    count_limit = DEFAULT_COUNT_LIMIT
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(
+            queryset, page_size,
+            ordering=self.get_keyset_ordering(),
+            count_limit=self.count_limit,
+        )
+        page = paginator.page(self.request.GET.get(CURSOR_PARAM))
+
+        # Ссылки на соседние страницы с сохранением остальных параметров запроса
+        params = self.request.GET.copy()
+        params.pop(CURSOR_PARAM, None)
+        params.pop('page', None)
+        page.first_query = params.urlencode()
+        if paginator.ordering is not None:
+            params[CURSOR_PARAM] = encode_cursor({'d': 'p'})
+            page.last_query = params.urlencode()
+        if page.next_cursor:
+            params[CURSOR_PARAM] = page.next_cursor
+            page.next_query = params.urlencode()
+        if page.previous_cursor:
+            params[CURSOR_PARAM] = page.previous_cursor
+            page.previous_query = params.urlencode()
+
+        return paginator, page, page.object_list, page.has_other_pages()
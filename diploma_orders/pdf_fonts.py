@@ -0,0 +1,77 @@
+# diploma_orders/pdf_fonts.py
+"""
+Шрифты с кириллицей для PDF.
+
+TTF-шрифт ищется и регистрируется в reportlab один раз за процесс: сначала
+пути из настроек PDF_FONT_PATH / PDF_FONT_BOLD_PATH, затем распространенные
+системные шрифты. Если ничего не найдено, используется Helvetica (без
+кириллицы) с предупреждением в журнале.
+"""
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_FONT_NAME = 'DocumentFont'
+PDF_FONT_BOLD_NAME = 'DocumentFont-Bold'
+
+# Пары (обычный, полужирный) в порядке предпочтения
+PDF_FONT_CANDIDATES = [
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf',
+     '/usr/share/fonts/truetype/dejavu/DejaVuSerif-Bold.ttf'),
+    ('/usr/share/fonts/truetype/liberation/LiberationSerif-Regular.ttf',
+     '/usr/share/fonts/truetype/liberation/LiberationSerif-Bold.ttf'),
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+     '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/TTF/DejaVuSerif.ttf',
+     '/usr/share/fonts/TTF/DejaVuSerif-Bold.ttf'),
+    ('C:\\Windows\\Fonts\\times.ttf',
+     'C:\\Windows\\Fonts\\timesbd.ttf'),
+    ('/System/Library/Fonts/Supplemental/Times New Roman.ttf',
+     '/System/Library/Fonts/Supplemental/Times New Roman Bold.ttf'),
+]
+
+_fonts = None
+_fonts_lock = threading.Lock()
+
+
+def _font_paths():
+    """Пути к шрифтам: сначала из настроек, затем системные"""
+    configured = getattr(settings, 'PDF_FONT_PATH', None)
+    if configured:
+        yield configured, getattr(settings, 'PDF_FONT_BOLD_PATH', None) or configured
+    yield from PDF_FONT_CANDIDATES
+
+
+def _register_fonts():
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    for regular_path, bold_path in _font_paths():
+        if not os.path.exists(regular_path):
+            continue
+        if not bold_path or not os.path.exists(bold_path):
+            bold_path = regular_path
+        try:
+            pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, regular_path))
+            pdfmetrics.registerFont(TTFont(PDF_FONT_BOLD_NAME, bold_path))
+        except Exception:
+            logger.exception('Не удалось загрузить шрифт %s', regular_path)
+            continue
+        return PDF_FONT_NAME, PDF_FONT_BOLD_NAME
+
+    logger.warning('TTF-шрифт с кириллицей не найден, задайте PDF_FONT_PATH')
+    return 'Helvetica', 'Helvetica-Bold'
+
+
+def get_pdf_fonts():
+    """Имена зарегистрированных шрифтов (обычный, полужирный)"""
+    global _fonts
+    if _fonts is None:
+        with _fonts_lock:
+            if _fonts is None:
+                _fonts = _register_fonts()
+    return _fonts
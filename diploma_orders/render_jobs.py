@@ -0,0 +1,176 @@
+# diploma_orders/render_jobs.py
+"""
+Очередь фоновой генерации документов.
+
+View ставят задание (RenderJob) и сразу отвечают клиенту; задания
+выполняет команда `manage.py render_worker` в пуле процессов.
+"""
+import logging
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from .artifacts import artifact_key, get_document_artifact, store_document_artifact
+from .bulk_orders import select_group_orders, write_group_orders_zip
+from .models import RenderJob
+from .renderers import render_document_to_file, render_group_order_docx
+from .workers import default_process_count
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'processing')
+
+
+def bulk_orders_process_count():
+    """Процессов рендера на один архив приказов (настройка BULK_ORDERS_PROCESSES)"""
+    return getattr(settings, 'BULK_ORDERS_PROCESSES', None) or default_process_count()
+
+
+def enqueue_document_render(document, format_type, user=None):
+    """Поставить документ в очередь (повторно не ставит активное задание).
+
+    Задание доступно только автору, поэтому активное задание другого
+    пользователя не переиспользуется - повторный рендер отсекает кэш
+    файлов (diploma_orders/artifacts.py).
+    """
+    user = user if user and user.is_authenticated else None
+    with transaction.atomic():
+        job = RenderJob.objects.filter(
+            kind='document',
+            document=document,
+            format_type=format_type,
+            source_updated_at=document.updated_at,
+            status__in=ACTIVE_STATUSES,
+            created_by=user,
+        ).first()
+        if job:
+            return job
+
+        return RenderJob.objects.create(
+            kind='document',
+            document=document,
+            format_type=format_type,
+            source_updated_at=document.updated_at,
+            created_by=user,
+        )
+
+
+def enqueue_group_order_render(order, user=None):
+    """Поставить приказ по группе в очередь"""
+    user = user if user and user.is_authenticated else None
+    with transaction.atomic():
+        job = RenderJob.objects.filter(
+            kind='group_order',
+            group_order=order,
+            status__in=ACTIVE_STATUSES,
+            created_by=user,
+        ).first()
+        if job:
+            return job
+
+        return RenderJob.objects.create(
+            kind='group_order',
+            group_order=order,
+            format_type='docx',
+            created_by=user,
+        )
+
+
+def enqueue_group_orders_zip(course=None, faculty=None, user=None):
+    """Поставить в очередь архив приказов всех групп с фильтром"""
+    user = user if user and user.is_authenticated else None
+    params = {'course': course, 'faculty': faculty}
+    with transaction.atomic():
+        job = RenderJob.objects.filter(
+            kind='group_orders_zip',
+            params=params,
+            status__in=ACTIVE_STATUSES,
+            created_by=user,
+        ).first()
+        if job:
+            return job
+
+        return RenderJob.objects.create(
+            kind='group_orders_zip',
+            params=params,
+            format_type='zip',
+            created_by=user,
+        )
+
+
+def claim_jobs(limit):
+    """Захват до `limit` ожидающих заданий (безопасно для нескольких воркеров)"""
+    candidates = list(
+        RenderJob.objects.filter(status='pending')
+        .order_by('created_at')
+        .values_list('id', flat=True)[:limit]
+    )
+    claimed = []
+    for job_id in candidates:
+        updated = RenderJob.objects.filter(id=job_id, status='pending').update(
+            status='processing',
+            started_at=timezone.now(),
+        )
+        if updated:
+            claimed.append(job_id)
+    return claimed
+
+
+def requeue_stale_jobs(older_than):
+    """Вернуть в очередь задания, зависшие в обработке (например, после падения воркера)"""
+    return RenderJob.objects.filter(
+        status='processing',
+        started_at__lt=timezone.now() - older_than,
+    ).update(status='pending', started_at=None)
+
+
+def process_render_job(job_id):
+    """Выполнение одного задания (вызывается в процессе пула)"""
+    job = RenderJob.objects.select_related('document__template', 'group_order__group').get(id=job_id)
+
+    try:
+        if job.kind == 'document':
+            # Файл мог быть уже сгенерирован другим заданием
+            if not get_document_artifact(job.document, job.format_type):
+                key = artifact_key(job.document, job.format_type)
+                with tempfile.NamedTemporaryFile() as output:
+                    render_document_to_file(job.document, job.format_type, output)
+                    output.seek(0)
+                    store_document_artifact(job.document, job.format_type, File(output), key=key)
+        elif job.kind == 'group_orders_zip':
+            orders = select_group_orders(**job.params)
+            if not orders:
+                raise ValueError('Нет приказов, подходящих под фильтр')
+            # Архив собирается целиком до сохранения: скачать можно только полный.
+            # Приказы рендерятся параллельно, как в команде bulk_group_orders
+            with tempfile.TemporaryFile() as output:
+                write_group_orders_zip(orders, output, bulk_orders_process_count())
+                output.seek(0)
+                job.result_file.save(job.get_download_filename(), File(output), save=False)
+        else:
+            data = render_group_order_docx(job.group_order)
+            job.result_file.save(job.get_download_filename(), ContentFile(data), save=False)
+
+        job.status = 'completed'
+        job.error = ''
+    except Exception as e:
+        logger.exception('Ошибка генерации, задание %s', job_id)
+        job.status = 'failed'
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'result_file', 'finished_at'])
+    return job.status
+
+
+def mark_failed(job_id, error):
+    """Пометить задание как завершившееся ошибкой"""
+    RenderJob.objects.filter(id=job_id).update(
+        status='failed',
+        error=error,
+        finished_at=timezone.now(),
+    )
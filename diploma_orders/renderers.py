@@ -0,0 +1,206 @@
+# diploma_orders/renderers.py
+"""
+Рендеринг документов в HTML/DOCX/PDF.
+
+Функции возвращают готовые байты и не зависят от запроса, поэтому
+используются как во view, так и в фоновом обработчике (render_worker).
+"""
+import io
+
+from django.utils.formats import date_format
+from docx import Document
+
+from .docx_blocks import GroupOrderDocument, append_table_rows
+from .docx_template_engine import render_docx_template
+from .pdf_fonts import get_pdf_fonts
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+CONTENT_TYPES = {
+    'html': 'text/html',
+    'docx': DOCX_CONTENT_TYPE,
+    'pdf': 'application/pdf',
+}
+
+
+def render_document_html(document):
+    """HTML-версия сгенерированного документа"""
+    html_content = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <title>{document.document_number}</title>
+            <style>
+                body {{ font-family: 'Times New Roman', serif; font-size: 14pt; }}
+                .header {{ text-align: center; margin-bottom: 40px; }}
+                .content {{ line-height: 1.6; }}
+                .signatures {{ margin-top: 100px; }}
+            </style>
+        </head>
+        <body>
+            <div class="header">
+                <h1>Документ № {document.document_number}</h1>
+                <p>от {document.document_date.strftime('%d.%m.%Y')}</p>
+            </div>
+            <div class="content">
+                {document.content}
+            </div>
+        </body>
+        </html>
+        """
+    return html_content.encode('utf-8')
+
+
+def render_document_docx(document):
+    """DOCX-версия документа: из файла шаблона или простая"""
+    if document.template and document.template.docx_template:
+        # Подстановка в загруженный шаблон DOCX по закэшированному индексу
+        return render_docx_template(document.template, document.document_data)
+
+    # Генерируем простой DOCX
+    doc = Document()
+
+    # Заголовок
+    doc.add_heading(f'Документ № {document.document_number}', 0)
+
+    # Дата
+    doc.add_paragraph(f'от {document.document_date.strftime("%d.%m.%Y")}')
+
+    # Содержимое
+    for line in document.content.split('\n'):
+        if line.strip():
+            doc.add_paragraph(line)
+
+    file_stream = io.BytesIO()
+    doc.save(file_stream)
+    return file_stream.getvalue()
+
+
+def write_document_pdf(document, output):
+    """PDF-версия документа в файл output: перенос строк и разбиение на страницы.
+
+    Возвращает число страниц.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.lib.utils import simpleSplit
+    from reportlab.pdfgen import canvas
+
+    font, bold_font = get_pdf_fonts()
+    width, height = A4
+    left, right, top, bottom = 2.5 * cm, 1.5 * cm, 2 * cm, 2 * cm
+    text_width = width - left - right
+    font_size = 12
+    leading = font_size * 1.4
+
+    p = canvas.Canvas(output, pagesize=A4, pageCompression=1)
+    p.setTitle(f'Документ № {document.document_number}')
+
+    def finish_page():
+        p.setFont(font, 9)
+        p.drawCentredString(width / 2, bottom / 2, str(p.getPageNumber()))
+        p.showPage()
+
+    # Заголовок
+    y = height - top
+    p.setFont(bold_font, 16)
+    for line in simpleSplit(f'Документ № {document.document_number}', bold_font, 16, text_width):
+        y -= 20
+        p.drawCentredString(left + text_width / 2, y, line)
+
+    y -= 18
+    p.setFont(font, font_size)
+    p.drawCentredString(left + text_width / 2, y, f"от {document.document_date.strftime('%d.%m.%Y')}")
+    y -= leading
+
+    # Содержимое: каждый абзац переносится по ширине страницы
+    for paragraph in (document.content or '').split('\n'):
+        lines = simpleSplit(paragraph, font, font_size, text_width) or ['']
+        for line in lines:
+            if y - leading < bottom:
+                finish_page()
+                p.setFont(font, font_size)
+                y = height - top
+            y -= leading
+            p.drawString(left, y, line)
+
+    pages = p.getPageNumber()
+    finish_page()
+    p.save()
+    return pages
+
+
+def render_document_pdf(document):
+    """PDF-версия документа (требует reportlab)"""
+    buffer = io.BytesIO()
+    write_document_pdf(document, buffer)
+    return buffer.getvalue()
+
+
+DOCUMENT_RENDERERS = {
+    'html': render_document_html,
+    'docx': render_document_docx,
+    'pdf': render_document_pdf,
+}
+
+
+def render_document(document, format_type):
+    """Рендер документа в указанный формат"""
+    return DOCUMENT_RENDERERS[format_type](document)
+
+
+def render_document_to_file(document, format_type, output):
+    """Рендер документа сразу в файл (PDF пишется без промежуточного буфера)"""
+    if format_type == 'pdf':
+        write_document_pdf(document, output)
+    else:
+        output.write(render_document(document, format_type))
+
+
+def group_order_filename(order):
+    """Имя файла приказа по группе"""
+    return f'приказ_группа_{order.group.name}_{order.order_number}.docx'
+
+
+def _join_name(*parts):
+    """ФИО из частей без пустых"""
+    return ' '.join(part for part in parts if part)
+
+
+def group_order_student_rows(order):
+    """Строки таблицы студентов приказа (только нужные поля, без моделей)"""
+    students = order.group.students.values_list(
+        'last_name', 'first_name', 'patronymic',
+        'diploma_project__topic',
+        'diploma_project__supervisor__last_name',
+        'diploma_project__supervisor__first_name',
+        'diploma_project__supervisor__patronymic',
+        'diploma_project__supervisor__academic_degree',
+        'diploma_project__supervisor__position',
+    )
+    for i, (last_name, first_name, patronymic, topic,
+            sup_last_name, sup_first_name, sup_patronymic, degree, position) in enumerate(students, 1):
+        topic = topic if topic is not None else 'не назначена'
+        student_info = f'{_join_name(last_name, first_name, patronymic)}\nТема: {topic}'
+        if sup_last_name is not None:
+            supervisor_info = f'{sup_last_name} {sup_first_name} {sup_patronymic},\n{degree},\n{position}'
+        else:
+            supervisor_info = 'не назначен'
+        yield str(i), student_info, supervisor_info
+
+
+def render_group_order_docx(order):
+    """Приказ по группе в формате DOCX (на основе готового скелета)"""
+    document = GroupOrderDocument()
+
+    # Дата, город и номер приказа
+    document.fill_header(date_format(order.order_date, format='«d» E Y г.'), order.order_number)
+
+    # Текст приказа
+    document.fill_intro(f'1. Утвердить темы выпускных квалификационных работ и назначить научных руководителей для студентов группы {order.group.name} ({order.get_study_form_display()} форма обучения) направления подготовки {order.direction}:')
+
+    # Студенты - одним фрагментом XML
+    append_table_rows(document.students_table, group_order_student_rows(order))
+
+    return document.save()
@@ -0,0 +1,85 @@
+# diploma_orders/result_cache.py
+"""
+Кэш результатов ИИ-анализа.
+
+Повторный анализ неизмененного файла раньше снова обращался к провайдеру
+и перезаписывал те же результаты. Результат каждого типа анализа (format,
+review, questions, full) сохраняется в AnalysisResult в нормализованном
+виде - значения полей DiplomaAIAnalysis - под ключом (SHA-256 файла, тип
+анализа, провайдер, модель, версия промптов). Повторный запрос копирует
+его в DiplomaAIAnalysis сразу при постановке в очередь, без воркера.
+
+Смена модели или DiplomaAnalyzer.PROMPT_VERSION дает новый ключ. Записи
+старше AI_RESULT_CACHE_TTL секунд не используются и удаляются; при
+превышении AI_RESULT_CACHE_MAX_ENTRIES удаляются давно не использованные.
+Флаг force_refresh задания заставляет запросить провайдера заново.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, 'AI_RESULT_CACHE_TTL', DEFAULT_TTL))
+
+
+def _key(sha256, analysis_type, analyzer):
+    return {
+        'sha256': sha256,
+        'analysis_type': analysis_type,
+        'ai_provider': analyzer.provider,
+        'model': analyzer.model,
+        'prompt_version': analyzer.PROMPT_VERSION,
+    }
+
+
+def lookup(sha256, analysis_type, analyzer):
+    """Сохраненный результат анализа или None"""
+    from .models import AnalysisResult
+
+    now = timezone.now()
+    cached = AnalysisResult.objects.filter(
+        created_at__gte=now - _ttl(), **_key(sha256, analysis_type, analyzer)
+    ).values_list('id', 'result').first()
+    if cached is None:
+        return None
+    AnalysisResult.objects.filter(id=cached[0]).update(last_used_at=now, hits=F('hits') + 1)
+    return cached[1]
+
+
+def store(sha256, analysis_type, analyzer, result):
+    """Сохранить результат анализа (заменяет прежний с тем же ключом)"""
+    from .models import AnalysisResult
+
+    now = timezone.now()
+    key = _key(sha256, analysis_type, analyzer)
+    # Отдельные UPDATE и INSERT - как в diploma_orders/text_cache.py
+    if not AnalysisResult.objects.filter(**key).update(result=result, created_at=now, last_used_at=now, hits=0):
+        try:
+            AnalysisResult.objects.create(result=result, created_at=now, last_used_at=now, **key)
+        except IntegrityError:
+            # Тот же результат параллельно сохранил другой воркер
+            pass
+    evict()
+
+
+def evict():
+    """Удалить устаревшие записи и давно не использованные сверх лимита"""
+    from .models import AnalysisResult
+
+    AnalysisResult.objects.filter(created_at__lt=timezone.now() - _ttl()).delete()
+    max_entries = getattr(settings, 'AI_RESULT_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+    boundary = AnalysisResult.objects.order_by('-last_used_at', '-id').values_list(
+        'last_used_at', 'id'
+    )[max_entries:max_entries + 1].first()
+    if boundary:
+        last_used_at, entry_id = boundary
+        AnalysisResult.objects.filter(last_used_at__lte=last_used_at).exclude(
+            last_used_at=last_used_at, id__gt=entry_id
+        ).delete()
@@ -0,0 +1,169 @@
+# diploma_orders/search.py
+"""
+Полнотекстовый поиск студентов (SQLite FTS5).
+
+Индекс diploma_orders_student_fts хранит нормализованные ФИО, номер
+студбилета, email и тему ВКР; rowid записи равен id студента. Индекс
+обновляется сигналами (diploma_orders/signals.py), полная перестройка:
+`manage.py rebuild_search_index`.
+
+Запрос разбивается на слова, у русских слов отбрасывается окончание,
+и каждое слово ищется как префикс: «Иванову» находит «Иванов», «Иванова»,
+«Ивановым». Результаты сортируются по bm25. На других СУБД (или без FTS5)
+используется прежний поиск через icontains.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+SEARCH_TABLE = 'diploma_orders_student_fts'
+SEARCH_COLUMNS = ('full_name', 'student_number', 'email', 'topic')
+
+# Вес колонок в bm25 (в порядке SEARCH_COLUMNS)
+SEARCH_WEIGHTS = (10.0, 8.0, 4.0, 1.0)
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-я]')
+
+# Окончания, отбрасываемые у слов запроса (самые длинные - первыми).
+# Суффиксы фамилий -ов/-ев/-ин не отбрасываются, чтобы «Иванов» не превращался в «Иван».
+RUSSIAN_ENDINGS = sorted([
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ых', 'их',
+    'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ом', 'ем', 'ам', 'ям',
+    'ах', 'ях', 'ую', 'юю', 'ию', 'ия', 'ие', 'ии', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+], key=len, reverse=True)
+
+# Минимальная длина основы после отбрасывания окончания
+MIN_STEM_LENGTH = 3
+
+_available = None
+
+
+def normalize_text(text):
+    """Текст для индекса: нижний регистр, ё -> е"""
+    return (text or '').lower().replace('ё', 'е')
+
+
+def stem_word(word):
+    """Основа русского слова (упрощенно: без окончания)"""
+    if not CYRILLIC_RE.search(word):
+        return word
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def build_match_query(query):
+    """Выражение FTS5 MATCH: все слова запроса как префиксы основ"""
+    terms = [stem_word(word) for word in WORD_RE.findall(normalize_text(query))]
+    return ' '.join(f'"{term}"*' for term in terms if term)
+
+
+def is_search_index_available():
+    """Есть ли в базе FTS5-индекс студентов"""
+    global _available
+    if _available is None:
+        _available = (
+            connection.vendor == 'sqlite'
+            and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _available
+
+
+def search_students(queryset, query):
+    """Фильтр студентов по строке поиска с сортировкой по релевантности"""
+    if not is_search_index_available():
+        return queryset.filter(
+            Q(last_name__icontains=query) |
+            Q(first_name__icontains=query) |
+            Q(patronymic__icontains=query) |
+            Q(student_id__icontains=query) |
+            Q(email__icontains=query)
+        )
+
+    match = build_match_query(query)
+    if not match:
+        return queryset.none()
+
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    student_table = queryset.model._meta.db_table
+    return queryset.extra(
+        tables=[SEARCH_TABLE],
+        where=[f'{SEARCH_TABLE}.rowid = {student_table}.id', f'{SEARCH_TABLE} MATCH %s'],
+        params=[match],
+        select={'search_rank': f'bm25({SEARCH_TABLE}, {weights})'},
+        order_by=['search_rank', 'last_name', 'first_name'],
+    )
+
+
+def _index_row(student_id, last_name, first_name, patronymic, student_number, email, topic):
+    full_name = ' '.join(part for part in (last_name, first_name, patronymic) if part)
+    return (
+        student_id,
+        normalize_text(full_name),
+        normalize_text(student_number),
+        normalize_text(email),
+        normalize_text(topic),
+    )
+
+
+INSERT_SQL = (
+    f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(SEARCH_COLUMNS)}) '
+    f'VALUES (%s, %s, %s, %s, %s)'
+)
+
+STUDENT_INDEX_FIELDS = (
+    'id', 'last_name', 'first_name', 'patronymic', 'student_id', 'email', 'diploma_project__topic',
+)
+
+
+def index_student(student_id):
+    """Обновить запись студента в индексе (или удалить, если студента нет)"""
+    if not is_search_index_available():
+        return
+    from .models import Student
+
+    row = Student.objects.filter(pk=student_id).values_list(*STUDENT_INDEX_FIELDS).first()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [student_id])
+        if row:
+            cursor.execute(INSERT_SQL, _index_row(*row))
+
+
+def remove_student(student_id):
+    """Удалить студента из индекса"""
+    if not is_search_index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [student_id])
+
+
+def rebuild_search_index(student_model=None, batch_size=2000):
+    """Полная перестройка индекса, возвращает число записей"""
+    if student_model is None:
+        from .models import Student as student_model
+
+    rows = (
+        student_model.objects.order_by()
+        .values_list(*STUDENT_INDEX_FIELDS)
+        .iterator(chunk_size=batch_size)
+    )
+
+    count = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        batch = []
+        for row in rows:
+            batch.append(_index_row(*row))
+            if len(batch) >= batch_size:
+                cursor.executemany(INSERT_SQL, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(INSERT_SQL, batch)
+            count += len(batch)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+    return count
@@ -0,0 +1,250 @@
+# diploma_orders/signals.py
+"""
+Обновление счетчиков групп и руководителей (diploma_orders/counters.py),
+поискового индекса (diploma_orders/search.py), индекса автодополнения
+(diploma_orders/autocomplete.py), кэша списков выбора (diploma_orders/choices.py)
+снимка главной страницы (diploma_orders/dashboard.py) и битовых карт фасетов
+(diploma_orders/facets.py) при изменении студентов, руководителей, групп и
+дипломных проектов, а также счетчиков ссылок на файлы хранилища
+(diploma_orders/blobs.py) и извлеченного текста (diploma_orders/text_cache.py)
+при изменении файлов дипломов и анализов ИИ.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, blobs, text_cache
+from .choices import invalidate_choices
+from .counters import bump
+from .dashboard import invalidate_dashboard
+from .facets import facet_index
+from .models import DiplomaAIAnalysis, DiplomaProject, FileBlob, Group, Student, Supervisor
+from .search import index_student, remove_student
+
+
+def _student_group_id(student_id):
+    return Student.objects.filter(pk=student_id).values_list('group_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Student)
+def remember_student_group(sender, instance, raw=False, **kwargs):
+    """Запомнить прежнюю группу студента до сохранения"""
+    if raw or instance.pk is None or instance._state.adding:
+        instance._counter_old_group_id = None
+        return
+    instance._counter_old_group_id = _student_group_id(instance.pk)
+
+
+@receiver(post_save, sender=Student)
+def update_counters_on_student_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        bump(Group, instance.group_id, student_count=1)
+        return
+
+    old_group_id = getattr(instance, '_counter_old_group_id', None)
+    if old_group_id == instance.group_id:
+        return
+
+    # Студент перешел в другую группу - вместе с ним переходит и его диплом
+    has_diploma = DiplomaProject.objects.filter(student_id=instance.pk).exists()
+    bump(Group, old_group_id, student_count=-1, diploma_count=-int(has_diploma))
+    bump(Group, instance.group_id, student_count=1, diploma_count=int(has_diploma))
+
+
+@receiver(post_delete, sender=Student)
+def update_counters_on_student_delete(sender, instance, **kwargs):
+    # Дипломный проект удаляется каскадно раньше студента и учитывается отдельно
+    bump(Group, instance.group_id, student_count=-1)
+
+
+@receiver(pre_save, sender=DiplomaProject)
+def remember_diploma_links(sender, instance, raw=False, **kwargs):
+    """Запомнить прежних студента и руководителя до сохранения"""
+    instance._counter_old_links = None
+    if raw or instance.pk is None or instance._state.adding:
+        return
+    instance._counter_old_links = (
+        DiplomaProject.objects.filter(pk=instance.pk)
+        .values_list('student_id', 'supervisor_id')
+        .first()
+    )
+
+
+@receiver(post_save, sender=DiplomaProject)
+def update_counters_on_diploma_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_links = getattr(instance, '_counter_old_links', None)
+    if created or old_links is None:
+        bump(Group, _student_group_id(instance.student_id), diploma_count=1)
+        bump(Supervisor, instance.supervisor_id, student_count=1)
+        return
+
+    old_student_id, old_supervisor_id = old_links
+    if old_student_id != instance.student_id:
+        bump(Group, _student_group_id(old_student_id), diploma_count=-1)
+        bump(Group, _student_group_id(instance.student_id), diploma_count=1)
+    if old_supervisor_id != instance.supervisor_id:
+        bump(Supervisor, old_supervisor_id, student_count=-1)
+        bump(Supervisor, instance.supervisor_id, student_count=1)
+
+
+@receiver(post_delete, sender=DiplomaProject)
+def update_counters_on_diploma_delete(sender, instance, **kwargs):
+    bump(Group, _student_group_id(instance.student_id), diploma_count=-1)
+    bump(Supervisor, instance.supervisor_id, student_count=-1)
+
+
+@receiver(post_save, sender=Student)
+def update_search_index_on_student_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_student(instance.pk)
+
+
+@receiver(post_delete, sender=Student)
+def update_search_index_on_student_delete(sender, instance, **kwargs):
+    remove_student(instance.pk)
+
+
+@receiver(post_save, sender=DiplomaProject)
+@receiver(post_delete, sender=DiplomaProject)
+def update_search_index_on_diploma_change(sender, instance, raw=False, **kwargs):
+    # Тема ВКР входит в запись студента
+    if not raw:
+        index_student(instance.student_id)
+
+
+
+# Индекс автодополнения живет в памяти процесса и не откатывается вместе с
+# транзакцией, поэтому обновляется только после фиксации
+
+@receiver(post_save, sender=Student)
+def update_autocomplete_on_student_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: autocomplete.update_student(instance))
+
+
+@receiver(post_save, sender=Supervisor)
+def update_autocomplete_on_supervisor_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: autocomplete.update_supervisor(instance))
+
+
+@receiver(post_save, sender=Group)
+def update_autocomplete_on_group_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: autocomplete.update_group(instance))
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Supervisor)
+@receiver(post_delete, sender=Group)
+def update_autocomplete_on_delete(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.remove(sender, pk))
+
+
+@receiver(post_save, sender=Supervisor)
+@receiver(post_delete, sender=Supervisor)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_choices_on_change(sender, instance, raw=False, **kwargs):
+    kind = sender._meta.model_name
+    transaction.on_commit(lambda: invalidate_choices(kind))
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Supervisor)
+@receiver(post_delete, sender=Supervisor)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=DiplomaProject)
+@receiver(post_delete, sender=DiplomaProject)
+def invalidate_dashboard_on_change(sender, instance, raw=False, **kwargs):
+    transaction.on_commit(invalidate_dashboard)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def update_facets_on_student_change(sender, instance, raw=False, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: facet_index.refresh_student(pk))
+
+
+@receiver(post_save, sender=DiplomaProject)
+@receiver(post_delete, sender=DiplomaProject)
+def update_facets_on_diploma_change(sender, instance, raw=False, **kwargs):
+    student_ids = {instance.student_id}
+    old_links = getattr(instance, '_counter_old_links', None)
+    if old_links:
+        student_ids.add(old_links[0])
+
+    def refresh():
+        for student_id in student_ids:
+            facet_index.refresh_student(student_id)
+    transaction.on_commit(refresh)
+
+
+@receiver(post_delete, sender=Supervisor)
+@receiver(post_delete, sender=Group)
+def invalidate_facets_on_delete(sender, instance, **kwargs):
+    # Ссылки студентов и дипломов обнуляются через UPDATE без сигналов
+    transaction.on_commit(facet_index.invalidate)
+
+
+# {модель: поле со ссылкой на файл хранилища}
+BLOB_FIELDS = dict(blobs.blob_references())
+
+
+@receiver(pre_save, sender=DiplomaProject)
+@receiver(pre_save, sender=DiplomaAIAnalysis)
+def remember_blob_name(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Запомнить прежний файл до сохранения"""
+    field = BLOB_FIELDS[sender]
+    instance._blob_old_name = ''
+    if update_fields is not None and field not in update_fields:
+        # Файл не сохраняется - ссылки не меняются
+        instance._blob_old_name = getattr(instance, field).name or ''
+        return
+    if raw or instance.pk is None or instance._state.adding:
+        return
+    instance._blob_old_name = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first() or ''
+
+
+@receiver(post_save, sender=DiplomaProject)
+@receiver(post_save, sender=DiplomaAIAnalysis)
+def update_blob_refs_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old_name = getattr(instance, '_blob_old_name', '')
+    new_name = getattr(instance, BLOB_FIELDS[sender]).name or ''
+    if old_name == new_name:
+        if new_name:
+            blobs.settle(new_name)
+        return
+    if new_name:
+        blobs.acquire(new_name)
+    if old_name:
+        blobs.release(old_name)
+
+
+@receiver(post_delete, sender=DiplomaProject)
+@receiver(post_delete, sender=DiplomaAIAnalysis)
+def update_blob_refs_on_delete(sender, instance, **kwargs):
+    name = getattr(instance, BLOB_FIELDS[sender]).name
+    if name:
+        blobs.release(name)
+
+
+@receiver(post_delete, sender=FileBlob)
+def evict_extracted_text(sender, instance, **kwargs):
+    sha256 = instance.sha256
+
+    def evict():
+        # Тот же хэш может быть у файла с другим расширением
+        if not FileBlob.objects.filter(sha256=sha256).exists():
+            text_cache.evict(sha256)
+    transaction.on_commit(evict)
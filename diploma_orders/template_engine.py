@@ -0,0 +1,94 @@
+# diploma_orders/template_engine.py
+"""
+Компилятор шаблонов с подстановкой {{field_name}}.
+
+Текст шаблона разбирается один раз в список сегментов (литералы и слоты),
+результат кэшируется в процессе. Рендер выполняется за один линейный проход.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+PLACEHOLDER_RE = re.compile(r'\{\{([^{}]+?)\}\}')
+
+# Максимальное число скомпилированных шаблонов в кэше процесса
+CACHE_MAX_SIZE = 512
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class CompiledTemplate:
+    """Скомпилированный шаблон: чередование литералов и слотов"""
+    __slots__ = ('literals', 'slots', 'placeholders')
+
+    def __init__(self, content):
+        self.literals = []
+        self.slots = []
+        self.placeholders = []
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(content):
+            self.literals.append(content[position:match.start()])
+            self.slots.append(match.group(1))
+            self.placeholders.append(match.group(0))
+            position = match.end()
+        self.literals.append(content[position:])
+
+    @property
+    def fields(self):
+        """Имена полей, встречающихся в шаблоне (в порядке появления)"""
+        return list(dict.fromkeys(self.slots))
+
+    def render(self, data):
+        """Подстановка значений; неизвестные поля остаются как есть"""
+        literals = self.literals
+        parts = [literals[0]]
+        for index, key in enumerate(self.slots):
+            if key in data:
+                parts.append(str(data[key]))
+            else:
+                parts.append(self.placeholders[index])
+            parts.append(literals[index + 1])
+        return ''.join(parts)
+
+
+def compile_content(content):
+    """Компиляция произвольного текста без кэширования"""
+    return CompiledTemplate(content or '')
+
+
+def get_cached(key, version, build):
+    """Объект из кэша процесса; build() вызывается при отсутствии или смене версии"""
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == version:
+            _cache.move_to_end(key)
+            return cached[1]
+
+    compiled = build()
+
+    with _cache_lock:
+        _cache[key] = (version, compiled)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def compile_template(template):
+    """Скомпилированный OrderTemplate.content (ключ: id + updated_at)"""
+    if template.pk is None:
+        return compile_content(template.content)
+    return get_cached(('template', template.pk), template.updated_at,
+                      lambda: compile_content(template.content))
+
+
+def render_template(template, data):
+    """Рендер содержимого шаблона"""
+    return compile_template(template).render(data)
+
+
+def clear_cache():
+    """Очистка кэша скомпилированных шаблонов"""
+    with _cache_lock:
+        _cache.clear()
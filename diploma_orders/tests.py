@@ -1,3 +1,1603 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from docx import Document
+
+from . import analysis_jobs, blobs, chunked_upload, render_jobs, result_cache, text_cache
+from .ai_services import DiplomaAnalyzer
+from .analysis_scheduler import Candidate, schedule
+from .artifacts import artifact_key, get_document_artifact, store_document_artifact
+from .autocomplete import PrefixIndex, reset_indexes
+from .bulk_orders import unique_name, write_zip
+from .blobs import blob_storage
+from .choices import get_choice_label, get_choices
+from .docx_blocks import DocxSkeleton, append_table_rows, get_group_order_skeleton
+from .docx_template_engine import CompiledDocxTemplate, compile_docx_template, render_docx_template
+from .facets import FacetIndex, facet_index
+from .forms import StudentSearchForm
+from .models import (
+    AnalysisJob, AnalysisResult, DiplomaAIAnalysis, DiplomaProject, ExtractedText, FileBlob, Group, GroupOrder,
+    GeneratedDocument, OrderTemplate, RenderJob, Student, Supervisor, UploadSession,
+)
+from .pdf_fonts import get_pdf_fonts
+from .renderers import render_group_order_docx, write_document_pdf
+from .template_engine import clear_cache, compile_content, render_template
+from .text_extraction import ExtractionError, extract, extract_text
+
+# Тесты кэша не трогают рабочий файловый кэш (BASE_DIR/cache) и не видят
+# записи, оставшиеся от прошлых запусков
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_group(name, students=3, with_diploma=2, supervisor=None):
+    """Группа с заданным числом студентов и дипломных проектов"""
+    group = Group.objects.create(name=name, faculty='ИИС', course=4)
+    for i in range(students):
+        student = Student.objects.create(
+            last_name=f'Студент{i}', first_name='Иван', student_id=f'{name}-{i}', group=group
+        )
+        if i < with_diploma:
+            DiplomaProject.objects.create(
+                topic=f'Тема {i}', student=student, supervisor=supervisor,
+                registration_date=date(2026, 1, 1), deadline=date(2026, 6, 1),
+            )
+    return group
+
+
+class TemplateEngineTests(TestCase):
+    """Подстановка {{поле}} в шаблоны приказов"""
+
+    def setUp(self):
+        clear_cache()
+        self.addCleanup(clear_cache)
+
+    def test_slots(self):
+        compiled = compile_content('Приказ №{{number}} о {{ student }}: {{number}}, {{unknown}}')
+        self.assertEqual(compiled.fields, ['number', ' student ', 'unknown'])
+        self.assertEqual(
+            compiled.render({'number': 12, ' student ': 'Иванове'}),
+            'Приказ №12 о Иванове: 12, {{unknown}}',
+        )
+        self.assertEqual(compile_content('').render({}), '')
+        self.assertEqual(compile_content('{{a}}{{b}}').render({'a': 1, 'b': 2}), '12')
+
+    def test_values_are_not_reparsed(self):
+        # Значение подставляется как есть, без повторного разбора и спецсимволов regex
+        compiled = compile_content('{{a}} и {{b}}')
+        self.assertEqual(compiled.render({'a': '{{b}}', 'b': r'\1 $& {x}'}), r'{{b}} и \1 $& {x}')
+
+    def test_cache_follows_updated_at(self):
+        template = OrderTemplate.objects.create(name='Приказ', content='О {{name}}')
+        self.assertEqual(render_template(template, {'name': 'допуске'}), 'О допуске')
+        template.content = 'Об {{name}}'
+        template.save()
+        self.assertEqual(render_template(template, {'name': 'отчислении'}), 'Об отчислении')
+
+    def test_preview_escapes_values(self):
+        template = OrderTemplate.objects.create(name='Приказ', content='Студент: {{name}}', available_fields=['name'])
+        response = self.client.post(
+            reverse('diploma_orders:api_template_preview', args=[template.pk]), {'name': '<b>Иванов</b>'}
+        )
+        self.assertIn('Студент: &lt;b&gt;Иванов&lt;/b&gt;', response.json()['preview'])
+
+
+def build_docx_template():
+    """DOCX-шаблон с плейсхолдерами, разбитыми на фрагменты, в таблице и колонтитуле"""
+    document = Document()
+    paragraph = document.add_paragraph('Приказ о ')
+    paragraph.add_run('{{stu').bold = True
+    paragraph.add_run('dent}} ')
+    paragraph.add_run('{{unknown}}')
+    table = document.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = 'Группа'
+    table.cell(0, 1).paragraphs[0].add_run('{gro')
+    table.cell(0, 1).paragraphs[0].add_run('up}')
+    document.sections[0].header.paragraphs[0].text = '№ {{number}}'
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+class DocxTemplateTests(TestCase):
+    """Подстановка значений в загруженные DOCX-шаблоны"""
+
+    def setUp(self):
+        clear_cache()
+        self.addCleanup(clear_cache)
+
+    def test_split_runs_tables_and_headers(self):
+        compiled = CompiledDocxTemplate(build_docx_template())
+        self.assertEqual(compiled.fields, ['student', 'unknown', 'group', 'number'])
+
+        document = Document(io.BytesIO(compiled.render(
+            {'student': 'Иванове & <Ко>', 'group': 'ИС-41\nочная', 'number': 7}
+        )))
+        paragraph = document.paragraphs[0]
+        self.assertEqual(paragraph.text, 'Приказ о Иванове & <Ко> {{unknown}}')
+        # Значение наследует форматирование первого фрагмента плейсхолдера
+        self.assertTrue(paragraph.runs[1].bold)
+        self.assertEqual(paragraph.runs[1].text, 'Иванове & <Ко>')
+        self.assertEqual(document.tables[0].cell(0, 1).text, 'ИС-41\nочная')
+        self.assertEqual(document.sections[0].header.paragraphs[0].text, '№ 7')
+
+    def test_cache_follows_template_file(self):
+        template = OrderTemplate.objects.create(name='Приказ', content='')
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        with override_settings(MEDIA_ROOT=media.name):
+            template.docx_template.save('template.docx', ContentFile(build_docx_template()))
+            first = compile_docx_template(template)
+            self.assertIs(compile_docx_template(template), first)
+
+            document = Document()
+            document.add_paragraph('Новый шаблон {{number}}')
+            output = io.BytesIO()
+            document.save(output)
+            template.docx_template.save('template.docx', ContentFile(output.getvalue()))
+            result = Document(io.BytesIO(render_docx_template(template, {'number': 8})))
+        self.assertEqual(result.paragraphs[0].text, 'Новый шаблон 8')
+
+
+def create_document(number='DOC-1', content='Приказ о допуске к защите', **kwargs):
+    template = OrderTemplate.objects.create(name='Приказ', content='{{text}}')
+    return GeneratedDocument.objects.create(
+        template=template, content=content, document_number=number,
+        document_date=date(2026, 6, 1), **kwargs
+    )
+
+
+class DocumentPdfTests(TestCase):
+    """PDF документа: перенос длинных абзацев и разбиение на страницы"""
+
+    def test_wraps_and_paginates(self):
+        from pypdf import PdfReader
+
+        words = [f'слово{i}' for i in range(400)]
+        document = create_document(content=' '.join(words) + '\n' + '\n'.join(f'Пункт {i}' for i in range(100)))
+        output = io.BytesIO()
+        pages = write_document_pdf(document, output)
+
+        reader = PdfReader(io.BytesIO(output.getvalue()))
+        self.assertGreater(pages, 1)
+        self.assertEqual(len(reader.pages), pages)
+        text = '\n'.join(page.extract_text() for page in reader.pages)
+        if get_pdf_fonts()[0] == 'Helvetica':
+            self.skipTest('TTF-шрифт с кириллицей не найден')
+        self.assertIn('Документ № DOC-1', text)
+        # Длинный абзац перенесен, все слова на месте и в исходном порядке
+        self.assertGreater(text.count('\n'), 100)
+        self.assertEqual([word for word in text.split() if word.startswith('слово')], words)
+        self.assertIn('Пункт 99', text)
+
+
+class DocumentArtifactTests(TestCase):
+    """Кэш готовых файлов документа по хэшу исходных данных"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('author', password='pass')
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.document = create_document(created_by=self.user)
+
+    def test_key(self):
+        key = artifact_key(self.document, 'pdf')
+        self.assertEqual(artifact_key(GeneratedDocument.objects.get(), 'pdf'), key)
+        self.assertNotEqual(artifact_key(self.document, 'docx'), key)
+
+        self.document.document_data = {'text': 'другое'}
+        self.assertNotEqual(artifact_key(self.document, 'pdf'), key)
+        self.document.document_data = {}
+
+        # Изменение шаблона тоже сбрасывает файл
+        self.document.template.save()
+        self.assertNotEqual(artifact_key(self.document, 'pdf'), key)
+
+    def test_store_and_get(self):
+        self.assertIsNone(get_document_artifact(self.document, 'html'))
+        stored = store_document_artifact(self.document, 'html', b'<p>1</p>')
+        self.assertEqual(stored.name, f'documents/html/{artifact_key(self.document, "html")}.html')
+
+        document = GeneratedDocument.objects.get()
+        self.assertEqual(get_document_artifact(document, 'html').read(), b'<p>1</p>')
+
+        # Содержимое изменилось в обход редактора - файл устарел
+        document.content = 'Новый текст'
+        self.assertIsNone(get_document_artifact(document, 'html'))
+        # Подписанный документ отдается как есть
+        document.status = 'signed'
+        self.assertIsNotNone(get_document_artifact(document, 'html'))
+
+    def test_edit_invalidates_files(self):
+        store_document_artifact(self.document, 'html', b'<p>1</p>')
+        name = GeneratedDocument.objects.get().html_file.name
+        self.client.force_login(self.user)
+        url = reverse('diploma_orders:document_edit', args=[self.document.pk])
+
+        # Смена только статуса файлы не трогает
+        self.client.post(url, {'content': self.document.content, 'status': 'generated'})
+        document = GeneratedDocument.objects.get()
+        self.assertEqual(document.html_file.name, name)
+
+        self.client.post(url, {'content': 'Новый текст', 'status': 'generated'})
+        document = GeneratedDocument.objects.get()
+        self.assertFalse(document.html_file)
+        self.assertEqual(document.artifact_keys, {})
+        self.assertFalse(default_storage.exists(name))
+
+
+class RenderJobTests(TestCase):
+    """Экспорт документов через очередь RenderJob"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('author', password='pass')
+        cls.other = User.objects.create_user('other', password='pass')
+        cls.document = create_document(created_by=cls.user)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.export_url = reverse('diploma_orders:export_document', args=[self.document.pk, 'html'])
+
+    def test_enqueue_process_download(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.export_url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 202)
+        job = RenderJob.objects.get(id=response.json()['job_id'])
+        self.assertEqual(job.created_by, self.user)
+
+        # Повторный запрос - то же активное задание
+        response = self.client.get(self.export_url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json()['job_id'], job.id)
+
+        status_url = reverse('diploma_orders:render_job_status', args=[job.id])
+        self.assertEqual(self.client.get(status_url).json()['status'], 'pending')
+
+        self.assertEqual(render_jobs.claim_jobs(5), [job.id])
+        self.assertEqual(render_jobs.process_render_job(job.id), 'completed')
+
+        data = self.client.get(status_url).json()
+        self.assertEqual(data['status'], 'completed')
+        response = self.client.get(data['download_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Приказ о допуске к защите', b''.join(response.streaming_content).decode())
+
+        # Готовый файл отдается сразу, без нового задания
+        self.assertEqual(self.client.get(self.export_url).status_code, 200)
+        self.assertEqual(RenderJob.objects.count(), 1)
+
+    def test_access(self):
+        job = render_jobs.enqueue_document_render(self.document, 'html', self.user)
+        urls = [
+            reverse('diploma_orders:render_job_status', args=[job.id]),
+            reverse('diploma_orders:render_job_download', args=[job.id]),
+        ]
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.other)
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class BulkGroupOrdersTests(TestCase):
+    """Архив приказов всех групп через очередь RenderJob"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='pass', is_staff=True)
+        for name, course in (('ИС-41', 4), ('ИС-42', 4), ('ИС-31', 3)):
+            group = create_group(name, students=2, with_diploma=1)
+            group.course = course
+            group.save()
+            GroupOrder.objects.create(group=group, order_number=name, direction='09.03.03', order_date=date(2026, 5, 1))
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        # Пул процессов не видит тестовую БД, поэтому в тестах рендер в этом процессе
+        self.enterContext(override_settings(BULK_ORDERS_PROCESSES=1))
+        self.url = reverse('diploma_orders:group_order_bulk_download')
+
+    def test_unique_names(self):
+        used, counters = set(), {}
+        names = [unique_name(name, used, counters) for name in ('a.docx', 'a.docx', 'a_2.docx', 'a.docx', 'b')]
+        self.assertEqual(names, ['a.docx', 'a_2.docx', 'a_2_2.docx', 'a_3.docx', 'b'])
+
+        output = io.BytesIO()
+        write_zip([('a.docx', b'1'), ('a.docx', b'2')], output)
+        self.assertEqual(zipfile.ZipFile(output).namelist(), ['a.docx', 'a_2.docx'])
+
+    def test_archive_job(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {'course': '4'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 202)
+        job = RenderJob.objects.get(id=response.json()['job_id'])
+        self.assertEqual(job.params, {'course': 4, 'faculty': None})
+
+        render_jobs.claim_jobs(5)
+        self.assertEqual(render_jobs.process_render_job(job.id), 'completed')
+        response = self.client.get(reverse('diploma_orders:render_job_download', args=[job.id]))
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(
+            archive.namelist(), ['приказ_группа_ИС-41_ИС-41.docx', 'приказ_группа_ИС-42_ИС-42.docx']
+        )
+
+    def test_render_error_fails_job(self):
+        job = render_jobs.enqueue_group_orders_zip(user=self.user)
+        with mock.patch.object(render_jobs, 'write_group_orders_zip', side_effect=RuntimeError('шрифт')):
+            self.assertEqual(render_jobs.process_render_job(job.id), 'failed')
+        job.refresh_from_db()
+        self.assertEqual(job.error, 'шрифт')
+        self.assertFalse(job.result_file)
+
+    def test_job_renders_in_parallel(self):
+        job = render_jobs.enqueue_group_orders_zip(user=self.user)
+        with override_settings(BULK_ORDERS_PROCESSES=3), \
+                mock.patch.object(render_jobs, 'write_group_orders_zip') as write_mock:
+            self.assertEqual(render_jobs.process_render_job(job.id), 'completed')
+        self.assertEqual(write_mock.call_args.args[2], 3)
+
+    def test_command_leaves_no_partial_archive(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        output = f'{directory.name}/prikazy.zip'
+        with mock.patch(
+            'diploma_orders.management.commands.bulk_group_orders.write_group_orders_zip',
+            side_effect=RuntimeError('шрифт'),
+        ):
+            with self.assertRaisesMessage(RuntimeError, 'шрифт'):
+                call_command('bulk_group_orders', output=output, processes=1, stdout=io.StringIO())
+        self.assertEqual(os.listdir(directory.name), [])
+
+        call_command('bulk_group_orders', output=output, processes=1, stdout=io.StringIO())
+        self.assertEqual(os.listdir(directory.name), ['prikazy.zip'])
+        self.assertEqual(len(zipfile.ZipFile(output).namelist()), 3)
+
+
+class GroupOrderDocxTests(TestCase):
+    """Приказ по группе из скелета открывается python-docx с заполненными частями"""
+
+    @classmethod
+    def setUpTestData(cls):
+        supervisor = Supervisor.objects.create(
+            last_name='Петров', first_name='Петр', patronymic='Петрович',
+            academic_degree='к.т.н.', position='доцент',
+        )
+        group = create_group('ИС-41', students=2, with_diploma=1, supervisor=supervisor)
+        cls.order = GroupOrder.objects.create(
+            group=group, order_number='15-с', direction='09.03.03', order_date=date(2026, 5, 1)
+        )
+
+    def render(self):
+        return Document(io.BytesIO(render_group_order_docx(self.order)))
+
+    def test_header_and_intro(self):
+        document = self.render()
+        date_cells = document.tables[0].rows[0].cells
+        self.assertIn('2026', date_cells[0].text)
+        self.assertEqual(date_cells[2].text.strip(), '№ 15-с')
+        intro = [paragraph.text for paragraph in document.paragraphs if paragraph.text.startswith('1. ')]
+        self.assertEqual(len(intro), 1)
+        self.assertIn('группы ИС-41', intro[0])
+
+    def test_student_rows(self):
+        rows = [[cell.text for cell in row.cells] for row in self.render().tables[1].rows[1:]]
+        self.assertEqual(rows, [
+            ['1', 'Студент0 Иван\nТема: Тема 0', 'Петров Петр Петрович,\nк.т.н.,\nдоцент'],
+            ['2', 'Студент1 Иван\nТема: не назначена', 'не назначен'],
+        ])
+
+    def test_rows_match_add_row(self):
+        rows = [('1', ' отступ & <тег>\nвторая строка', 'x')]
+        expected = Document(io.BytesIO(get_group_order_skeleton())).tables[1]
+        for row in rows:
+            cells = expected.add_row().cells
+            for cell, text in zip(cells, row):
+                cell.text = text
+        table = Document(io.BytesIO(get_group_order_skeleton())).tables[1]
+        append_table_rows(table, rows)
+
+        self.assertEqual(len(table.rows), len(expected.rows))
+        for row, expected_row in zip(table.rows, expected.rows):
+            self.assertEqual([cell.text for cell in row.cells], [cell.text for cell in expected_row.cells])
+            self.assertEqual([cell.width for cell in row.cells], [cell.width for cell in expected_row.cells])
+
+    def test_static_parts_copied(self):
+        skeleton = zipfile.ZipFile(io.BytesIO(get_group_order_skeleton()))
+        first = render_group_order_docx(self.order)
+        second = render_group_order_docx(self.order)
+        self.assertEqual(first, second)
+
+        archive = zipfile.ZipFile(io.BytesIO(first))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(sorted(archive.namelist()), sorted(skeleton.namelist()))
+        for name in skeleton.namelist():
+            if name != DocxSkeleton.DOCUMENT_PART:
+                self.assertEqual(archive.read(name), skeleton.read(name), name)
+        self.assertTrue(self.render().styles)
+
+
+class GroupStatsQueryTests(TestCase):
+    """Статистика групп считается фиксированным числом запросов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.supervisor = Supervisor.objects.create(
+            last_name='Петров', first_name='Петр', patronymic='Петрович',
+            academic_degree='к.т.н.', position='доцент',
+        )
+        cls.group = create_group('ИС-41', students=4, with_diploma=3, supervisor=cls.supervisor)
+        create_group('ИС-42', students=0, with_diploma=0)
+
+    def test_group_list_counts(self):
+        response = self.client.get(reverse('diploma_orders:group_list'))
+        groups = {group.name: group for group in response.context['groups']}
+
+        self.assertEqual(groups['ИС-41'].student_count, 4)
+        self.assertEqual(groups['ИС-41'].diploma_count, 3)
+        self.assertEqual(groups['ИС-41'].students_without_diploma_count, 1)
+        self.assertEqual(groups['ИС-41'].diploma_percentage, 75)
+        self.assertEqual(groups['ИС-42'].student_count, 0)
+        self.assertEqual(groups['ИС-42'].diploma_percentage, 0)
+
+    def test_group_list_query_count_is_constant(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('diploma_orders:group_list'))
+
+        for i in range(10):
+            create_group(f'ПИ-{i}', students=3, with_diploma=1, supervisor=self.supervisor)
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse('diploma_orders:group_list'))
+
+    def test_group_detail_counts(self):
+        response = self.client.get(reverse('diploma_orders:group_detail', args=[self.group.pk]))
+
+        self.assertEqual(response.context['with_diploma'], 3)
+        self.assertEqual(response.context['without_diploma'], 1)
+        self.assertEqual(response.context['diploma_percentage'], 75)
+        self.assertEqual(response.context['group'].student_count, 4)
+
+    def test_group_detail_query_count_is_constant(self):
+        url = reverse('diploma_orders:group_detail', args=[self.group.pk])
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+        for i in range(10):
+            Student.objects.create(last_name=f'Новый{i}', first_name='Иван', student_id=f'new-{i}', group=self.group)
+
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+
+class CounterTests(TestCase):
+    """Счетчики групп и руководителей обновляются сигналами"""
+
+    def setUp(self):
+        self.supervisor = Supervisor.objects.create(
+            last_name='Петров', first_name='Петр', patronymic='Петрович',
+            academic_degree='к.т.н.', position='доцент',
+        )
+        self.other_supervisor = Supervisor.objects.create(
+            last_name='Сидоров', first_name='Сидор', patronymic='Сидорович',
+            academic_degree='д.т.н.', position='профессор',
+        )
+        self.group = create_group('ИС-41', students=3, with_diploma=2, supervisor=self.supervisor)
+        self.other_group = create_group('ИС-42', students=1, with_diploma=0)
+
+    def assertCounters(self, group, students, diplomas):
+        group.refresh_from_db()
+        self.assertEqual((group.student_count, group.diploma_count), (students, diplomas))
+
+    def assertSupervisorCount(self, supervisor, count):
+        supervisor.refresh_from_db()
+        self.assertEqual(supervisor.student_count, count)
+
+    def test_counters_after_create(self):
+        self.assertCounters(self.group, 3, 2)
+        self.assertCounters(self.other_group, 1, 0)
+        self.assertSupervisorCount(self.supervisor, 2)
+
+    def test_student_moves_with_diploma(self):
+        student = self.group.students.filter(diploma_project__isnull=False).first()
+        student.group = self.other_group
+        student.save()
+
+        self.assertCounters(self.group, 2, 1)
+        self.assertCounters(self.other_group, 2, 1)
+
+    def test_student_delete_cascades_diploma(self):
+        self.group.students.filter(diploma_project__isnull=False).first().delete()
+
+        self.assertCounters(self.group, 2, 1)
+        self.assertSupervisorCount(self.supervisor, 1)
+
+    def test_diploma_supervisor_change_and_delete(self):
+        diploma = DiplomaProject.objects.filter(student__group=self.group).first()
+        diploma.supervisor = self.other_supervisor
+        diploma.save()
+
+        self.assertSupervisorCount(self.supervisor, 1)
+        self.assertSupervisorCount(self.other_supervisor, 1)
+
+        diploma.delete()
+        self.assertCounters(self.group, 3, 1)
+        self.assertSupervisorCount(self.other_supervisor, 0)
+
+    def test_recount_fixes_bulk_changes(self):
+        # Массовое обновление в обход сигналов
+        Student.objects.filter(group=self.other_group).update(group=self.group)
+        Group.objects.update(student_count=0, diploma_count=0)
+
+        call_command('recount', stdout=io.StringIO())
+
+        self.assertCounters(self.group, 4, 2)
+        self.assertCounters(self.other_group, 0, 0)
+        self.assertSupervisorCount(self.supervisor, 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StudentSearchTests(TestCase):
+    """Полнотекстовый поиск студентов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='ИС-41', faculty='ИИС', course=4)
+        cls.other_group = Group.objects.create(name='ИС-42', faculty='ИИС', course=4)
+        cls.ivanova = Student.objects.create(
+            last_name='Иванова', first_name='Алёна', student_id='2021-ИС-001', group=cls.group,
+            email='alena@example.com',
+        )
+        cls.ivanov = Student.objects.create(
+            last_name='Иванов', first_name='Пётр', student_id='2021-ИС-002', group=cls.other_group,
+        )
+        cls.petrov = Student.objects.create(
+            last_name='Петров', first_name='Иван', student_id='2021-ИС-003', group=cls.group,
+        )
+        DiplomaProject.objects.create(
+            topic='Разработка информационной системы учета', student=cls.petrov,
+            registration_date=date(2026, 1, 1), deadline=date(2026, 6, 1),
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('diploma_orders:student_list'), {'query': query, **params})
+        return list(response.context['students'])
+
+    def test_inflected_surname_matches_all_forms(self):
+        self.assertCountEqual(self.search('Ивановой'), [self.ivanova, self.ivanov])
+
+    def test_yo_and_prefix(self):
+        self.assertEqual(self.search('Алена'), [self.ivanova])
+        self.assertEqual(self.search('але'), [self.ivanova])
+
+    def test_topic_and_student_id(self):
+        self.assertEqual(self.search('информационных систем'), [self.petrov])
+        self.assertEqual(self.search('2021-ИС-003'), [self.petrov])
+
+    def test_name_ranks_above_topic(self):
+        DiplomaProject.objects.create(
+            topic='Петров и его вклад', student=self.ivanov,
+            registration_date=date(2026, 1, 1), deadline=date(2026, 6, 1),
+        )
+        self.assertEqual(self.search('Петров'), [self.petrov, self.ivanov])
+
+    def test_filters_still_apply(self):
+        self.assertEqual(self.search('Иванов', group=self.group.pk), [self.ivanova])
+
+    def test_index_follows_changes(self):
+        self.ivanov.last_name = 'Сидоров'
+        self.ivanov.save()
+        self.assertEqual(self.search('Сидоров'), [self.ivanov])
+
+        self.ivanov.delete()
+        self.assertEqual(self.search('Сидоров'), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class KeysetPaginationTests(TestCase):
+    """Постраничный просмотр списков по курсорам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='ИС-41', faculty='ИИС', course=4)
+        # Одинаковые фамилии, чтобы порядок решали имя и id
+        for i in range(45):
+            Student.objects.create(
+                last_name=f'Фамилия{i % 7}', first_name=f'Имя{i % 3}', student_id=f'{i:03d}', group=cls.group,
+            )
+        for i in range(25):
+            GroupOrder.objects.create(
+                group=cls.group, order_number=f'П-{i}', direction='09.03.03',
+                order_date=date(2026, 1, 1 + i % 5),
+            )
+
+    def walk(self, url, params=None, backward_from_last=False):
+        """Все записи, пройденные по ссылкам «вперед» (или «назад» с последней страницы)"""
+        response = self.client.get(url, params or {})
+        page = response.context['page_obj']
+        if backward_from_last:
+            response = self.client.get(f'{url}?{page.last_query}')
+        pages = []
+        while True:
+            page = response.context['page_obj']
+            pages.append([obj.pk for obj in page.object_list])
+            query = page.previous_query if backward_from_last else page.next_query
+            if not query:
+                break
+            response = self.client.get(f'{url}?{query}')
+        if backward_from_last:
+            pages.reverse()
+        return [pk for rows in pages for pk in rows], [len(rows) for rows in pages]
+
+    def test_students_follow_model_ordering(self):
+        url = reverse('diploma_orders:student_list')
+        expected = list(Student.objects.order_by('last_name', 'first_name', 'id').values_list('pk', flat=True))
+
+        forward, sizes = self.walk(url)
+        self.assertEqual(forward, expected)
+        self.assertEqual(sizes, [20, 20, 5])
+
+        backward, sizes = self.walk(url, backward_from_last=True)
+        self.assertEqual(backward, expected)
+        self.assertEqual(sizes, [5, 20, 20])
+
+    def test_group_orders_newest_first(self):
+        url = reverse('diploma_orders:group_order_list')
+        expected = list(GroupOrder.objects.order_by('-order_date', '-id').values_list('pk', flat=True))
+        self.assertEqual(self.walk(url)[0], expected)
+
+    def test_filters_kept_in_links(self):
+        url = reverse('diploma_orders:student_list')
+        pks, _ = self.walk(url, {'group': self.group.pk})
+        self.assertEqual(len(pks), 45)
+
+        response = self.client.get(url, {'group': self.group.pk})
+        self.assertIn(f'group={self.group.pk}', response.context['page_obj'].next_query)
+
+    def test_approximate_total(self):
+        response = self.client.get(reverse('diploma_orders:student_list'))
+        self.assertEqual(response.context['paginator'].count_display, '45')
+
+    def test_bad_cursor(self):
+        response = self.client.get(reverse('diploma_orders:student_list'), {'cursor': 'не-курсор'})
+        self.assertEqual(response.status_code, 404)
+
+
+class AutocompleteTests(TestCase):
+    """Подсказки по началу ФИО, номера студбилета и названия группы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='ИС-41', faculty='ИИС', course=4)
+        cls.ivanova = Student.objects.create(
+            last_name='Иванова', first_name='Алёна', student_id='2021-001', group=cls.group,
+        )
+        cls.petrov = Student.objects.create(
+            last_name='Петров', first_name='Иван', student_id='2021-002', group=cls.group,
+        )
+        cls.supervisor = Supervisor.objects.create(
+            last_name='Смирнов', first_name='Олег', patronymic='Петрович',
+        )
+
+    def setUp(self):
+        reset_indexes()
+        self.enterContext(override_settings(AUTOCOMPLETE_BACKGROUND_BUILD=False))
+
+    def suggest(self, kind, query, **params):
+        response = self.client.get(
+            reverse('diploma_orders:api_autocomplete', args=[kind]), {'q': query, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['ready'])
+        return [item['id'] for item in response.json()['results']]
+
+    def test_first_build_off_request_path(self):
+        url = reverse('diploma_orders:api_autocomplete', args=['student'])
+        with override_settings(AUTOCOMPLETE_BACKGROUND_BUILD=True), \
+                mock.patch.object(PrefixIndex, '_refresh_in_background') as refresh, \
+                self.assertNumQueries(0):
+            response = self.client.get(url, {'q': 'ива'})
+        refresh.assert_called_once()
+        self.assertEqual(response.json(), {'results': [], 'ready': False})
+
+    def test_changes_during_rebuild_are_replayed(self):
+        def loader():
+            yield 1, 'Иванов', ('Иванов',)
+            # Сигналы, пришедшие, пока загрузка идет
+            index.update(2, 'Петров', ('Петров',))
+            index.remove(1)
+            yield 3, 'Сидоров', ('Сидоров',)
+
+        index = PrefixIndex(loader)
+        index.rebuild()
+        self.assertEqual(index.search('петр'), [(2, 'Петров')])
+        self.assertEqual(index.search('ива'), [])
+        self.assertEqual(index.search('сид'), [(3, 'Сидоров')])
+        self.assertIsNone(index._journal)
+
+    def test_prefix_matches(self):
+        self.assertEqual(self.suggest('student', 'ива'), [self.ivanova.pk])
+        self.assertEqual(self.suggest('student', 'Иванова Але'), [self.ivanova.pk])
+        self.assertEqual(self.suggest('student', '2021'), [self.ivanova.pk, self.petrov.pk])
+        self.assertEqual(self.suggest('student', '2021', limit=1), [self.ivanova.pk])
+        self.assertEqual(self.suggest('supervisor', 'смир'), [self.supervisor.pk])
+        self.assertEqual(self.suggest('group', 'ис-4'), [self.group.pk])
+        self.assertEqual(self.suggest('student', 'Иван'), [self.ivanova.pk])
+
+    def test_queries_hit_memory_only(self):
+        self.suggest('student', 'ива')
+        with self.assertNumQueries(0):
+            self.suggest('student', 'пет')
+
+    def test_unknown_kind(self):
+        response = self.client.get(reverse('diploma_orders:api_autocomplete', args=['user']), {'q': 'a'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_index_follows_changes(self):
+        self.suggest('student', 'ива')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.petrov.last_name = 'Сидоров'
+            self.petrov.save()
+        self.assertEqual(self.suggest('student', 'сид'), [self.petrov.pk])
+        self.assertEqual(self.suggest('student', 'пет'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ivanova.delete()
+        self.assertEqual(self.suggest('student', 'ива'), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ChoiceCacheTests(TestCase):
+    """Списки выбора руководителей, групп и статусов берутся из кэша"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='ИС-41', faculty='ИИС', course=4)
+        cls.supervisor = Supervisor.objects.create(
+            last_name='Смирнов', first_name='Олег', patronymic='Петрович',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_cache_runs_no_queries(self):
+        StudentSearchForm({'group': self.group.pk, 'supervisor': self.supervisor.pk}).is_valid()
+        with self.assertNumQueries(0):
+            form = StudentSearchForm({'group': self.group.pk, 'supervisor': self.supervisor.pk})
+            self.assertTrue(form.is_valid())
+            self.assertEqual(form.cleaned_data['group'], self.group.pk)
+            self.assertEqual(get_choice_label('supervisor', self.supervisor.pk), 'Смирнов Олег Петрович')
+            self.assertIn(('defended', 'Защищена'), get_choices('status'))
+
+    def test_unknown_value_is_rejected(self):
+        self.assertFalse(StudentSearchForm({'group': self.group.pk + 100}).is_valid())
+
+    def test_change_invalidates_list(self):
+        get_choices('group')
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Group.objects.create(name='ИС-42', faculty='ИИС', course=4)
+        self.assertIn(other.pk, [pk for pk, _ in get_choices('group')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual([pk for pk, _ in get_choices('group')], [self.group.pk])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DashboardTests(TestCase):
+    """Главная страница строится из снимка в кэше"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = create_group('ИС-41', students=3, with_diploma=2)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_hit_runs_no_queries(self):
+        response = self.client.get(reverse('diploma_orders:home'))
+        self.assertTrue(response['Server-Timing'].startswith('dashboard;desc="miss"'))
+        self.assertEqual(response.context['total_students'], 3)
+        self.assertEqual(response.context['groups'][0]['statuses'][0], 2)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('diploma_orders:home'))
+        self.assertTrue(response['Server-Timing'].startswith('dashboard;desc="hit"'))
+
+    def test_change_invalidates_snapshot(self):
+        self.client.get(reverse('diploma_orders:home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.create(last_name='Новый', first_name='Иван', student_id='N-1', group=self.group)
+
+        response = self.client.get(reverse('diploma_orders:home'))
+        self.assertEqual(response.context['total_students'], 4)
+        self.assertEqual(response.context['recent_students'][0]['student_id'], 'N-1')
+
+    def test_totals_include_students_without_group(self):
+        student = Student.objects.create(last_name='Без', first_name='Группы', student_id='N-2')
+        DiplomaProject.objects.create(
+            topic='Тема', student=student, registration_date=date(2026, 1, 1), deadline=date(2026, 6, 1),
+        )
+        response = self.client.get(reverse('diploma_orders:home'))
+        self.assertEqual(response.context['total_groups'], 1)
+        self.assertEqual(response.context['total_diplomas'], 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FacetTests(TestCase):
+    """Счетчики студентов по группам, руководителям и статусам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.supervisor = Supervisor.objects.create(
+            last_name='Смирнов', first_name='Олег', patronymic='Петрович',
+        )
+        cls.group = create_group('ИС-41', students=3, with_diploma=2, supervisor=cls.supervisor)
+        cls.other_group = create_group('ИС-42', students=2, with_diploma=1)
+
+    def setUp(self):
+        cache.clear()
+        facet_index.invalidate()
+        self.enterContext(override_settings(FACET_INDEX_BACKGROUND_BUILD=False))
+
+    def facets(self, **params):
+        response = self.client.get(reverse('diploma_orders:api_student_facets'), params)
+        data = response.json()
+        return data['total'], {
+            name: {item['value']: item['count'] for item in items}
+            for name, items in data['facets'].items()
+        }
+
+    def test_first_build_off_request_path(self):
+        with override_settings(FACET_INDEX_BACKGROUND_BUILD=True), \
+                mock.patch.object(FacetIndex, '_refresh_in_background') as refresh:
+            # Пока карты строятся, счетчики считает база
+            self.test_counts()
+            self.test_facet_ignores_own_filter()
+            self.test_query_narrows_counts()
+        refresh.assert_called()
+        self.assertFalse(facet_index.ready)
+
+    def test_changes_during_rebuild_are_replayed(self):
+        moved = Student.objects.get(student_id='ИС-41-2')
+        deleted = Student.objects.get(student_id='ИС-42-1')
+        load_rows = FacetIndex._load_rows
+
+        def rows():
+            yield from load_rows()
+            # Сигналы, пришедшие, пока загрузка идет
+            Student.objects.filter(pk=moved.pk).update(group=self.other_group)
+            index.refresh_student(moved.pk)
+            Student.objects.filter(pk=deleted.pk).delete()
+            index.refresh_student(deleted.pk)
+
+        index = FacetIndex()
+        with mock.patch.object(index, '_load_rows', rows):
+            index.rebuild()
+        total, counts = index.count(None, {})
+        self.assertEqual(total, 4)
+        self.assertEqual(counts[0], {str(self.group.pk): 2, str(self.other_group.pk): 2})
+        self.assertIsNone(index._journal)
+
+        # Карты, загруженные до invalidate(), готовыми не считаются
+        with mock.patch.object(index, '_load_rows', lambda: (index.invalidate(), *load_rows())[1:]):
+            index.rebuild()
+        self.assertFalse(index.ready)
+
+    def test_counts(self):
+        total, facets = self.facets()
+        self.assertEqual(total, 5)
+        self.assertEqual(facets['group'], {str(self.group.pk): 3, str(self.other_group.pk): 2})
+        self.assertEqual(facets['supervisor'], {str(self.supervisor.pk): 2, '': 3})
+        self.assertEqual(facets['status'], {'registered': 3, '': 2})
+
+    def test_facet_ignores_own_filter(self):
+        total, facets = self.facets(group=self.group.pk)
+        self.assertEqual(total, 3)
+        self.assertEqual(facets['group'], {str(self.group.pk): 3, str(self.other_group.pk): 2})
+        self.assertEqual(facets['status'], {'registered': 2, '': 1})
+
+    def test_query_narrows_counts(self):
+        total, facets = self.facets(query='ИС-42-0')
+        self.assertEqual(total, 1)
+        self.assertEqual(facets['group'], {str(self.other_group.pk): 1})
+
+    def test_changes_update_counts(self):
+        self.facets()
+        student = Student.objects.get(student_id='ИС-41-2')
+        with self.captureOnCommitCallbacks(execute=True):
+            student.group = self.other_group
+            student.save()
+        _, facets = self.facets()
+        self.assertEqual(facets['group'], {str(self.group.pk): 2, str(self.other_group.pk): 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            student.delete()
+        total, facets = self.facets()
+        self.assertEqual(total, 4)
+
+    def test_list_context(self):
+        response = self.client.get(reverse('diploma_orders:student_list'), {'status': 'registered'})
+        self.assertEqual(response.context['facets_total'], 3)
+        self.assertEqual(len(response.context['students']), 3)
+
+
+class FileServingTests(TestCase):
+    """Скачивание файла диплома: Range, ETag и отдача через веб-сервер"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='pass', is_staff=True)
+        group = create_group('ИС-41', students=1, with_diploma=1)
+        cls.diploma = DiplomaProject.objects.get(student__group=group)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.diploma.file.save('thesis.pdf', ContentFile(b'0123456789' * 100), save=True)
+        self.client.force_login(self.user)
+        self.url = reverse('diploma_orders:download_diploma', args=[self.diploma.pk])
+
+    def test_full_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789' * 100)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], '1000')
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5-14')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 5-14/1000')
+        self.assertEqual(b''.join(response.streaming_content), b'5678901234')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_conditional_requests(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # If-Range с другой версией - весь файл
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(FILE_SERVE_OFFLOAD='nginx')
+    def test_offload(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.diploma.file.name)
+        self.assertEqual(response.content, b'')
+
+
+class ChunkedUploadTests(TestCase):
+    """Загрузка файла диплома по частям с докачкой"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='pass', is_staff=True)
+        group = create_group('ИС-41', students=1, with_diploma=1)
+        cls.diploma = DiplomaProject.objects.get(student__group=group)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        uploads = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.addCleanup(uploads.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name, CHUNKED_UPLOAD_DIR=uploads.name))
+        self.client.force_login(self.user)
+        self.data = bytes(range(256)) * 40
+
+    def init(self, **payload):
+        payload = {'filename': 'thesis.pdf', 'size': len(self.data), **payload}
+        return self.client.post(
+            reverse('diploma_orders:chunked_upload_init', args=[self.diploma.pk]),
+            json.dumps(payload), content_type='application/json',
+        )
+
+    def put(self, upload, offset, chunk):
+        return self.client.put(
+            upload['upload_url'], chunk, content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_resumable_upload(self):
+        upload = self.init(sha256=hashlib.sha256(self.data).hexdigest()).json()
+        self.assertEqual(self.put(upload, 0, self.data[:4000]).json()['offset'], 4000)
+
+        # Повтор уже принятой части - 409 с текущим смещением для продолжения
+        response = self.put(upload, 0, self.data[:4000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '4000')
+        self.assertEqual(self.client.get(upload['upload_url']).json()['offset'], 4000)
+
+        self.put(upload, 4000, self.data[4000:])
+        response = self.client.post(upload['finalize_url'])
+        self.assertEqual(response.json()['sha256'], hashlib.sha256(self.data).hexdigest())
+
+        self.diploma.refresh_from_db()
+        with self.diploma.file.open('rb') as file:
+            self.assertEqual(file.read(), self.data)
+
+    def test_duplicate_chunk_does_not_touch_file(self):
+        upload = self.init().json()
+        # Два запроса с одним смещением прочитали сессию до записи любого из них
+        first = UploadSession.objects.get(pk=upload['upload_id'])
+        second = UploadSession.objects.get(pk=upload['upload_id'])
+        chunked_upload.write_chunk(first, 0, io.BytesIO(self.data[:1000]))
+        with self.assertRaises(chunked_upload.UploadError) as error:
+            chunked_upload.write_chunk(second, 0, io.BytesIO(b'x' * 1000))
+        self.assertEqual((error.exception.status, error.exception.offset), (409, 1000))
+
+        self.put(upload, 1000, self.data[1000:])
+        response = self.client.post(upload['finalize_url'])
+        self.assertEqual(response.json()['sha256'], hashlib.sha256(self.data).hexdigest())
+        self.diploma.refresh_from_db()
+        with self.diploma.file.open('rb') as file:
+            self.assertEqual(file.read(), self.data)
+
+    def test_concurrent_chunk_is_rejected(self):
+        upload = self.init().json()
+        session = UploadSession.objects.get(pk=upload['upload_id'])
+        # Файл заблокирован запросом, который еще пишет часть
+        with open(chunked_upload.temp_path(session), 'r+b') as writing:
+            self.assertTrue(chunked_upload._lock_file(writing))
+            response = self.put(upload, 0, self.data[:1000])
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response['Upload-Offset'], '0')
+        self.assertEqual(self.put(upload, 0, self.data[:1000]).json()['offset'], 1000)
+
+    def test_limits(self):
+        with override_settings(MAX_UPLOAD_SIZE=1000):
+            self.assertEqual(self.init().status_code, 413)
+        self.assertEqual(self.init(filename='thesis.exe').status_code, 400)
+
+        upload = self.init(size=100).json()
+        self.assertEqual(self.put(upload, 0, self.data[:200]).status_code, 413)
+        self.assertEqual(self.client.get(upload['upload_url']).json()['offset'], 0)
+
+    def test_incomplete_or_corrupted_upload_is_not_attached(self):
+        upload = self.init(sha256='0' * 64).json()
+        self.put(upload, 0, self.data[:100])
+        self.assertEqual(self.client.post(upload['finalize_url']).status_code, 409)
+
+        self.put(upload, 100, self.data[100:])
+        self.assertEqual(self.client.post(upload['finalize_url']).status_code, 422)
+        self.diploma.refresh_from_db()
+        self.assertFalse(self.diploma.file)
+
+
+class BlobStorageTests(TestCase):
+    """Хранилище с адресацией по содержимому и счетчики ссылок"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_group('ИС-41', students=2, with_diploma=2)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.first, self.second = DiplomaProject.objects.order_by('pk')
+        self.data = b'%PDF-1.4 thesis'
+        self.sha256 = hashlib.sha256(self.data).hexdigest()
+
+    def refs(self, name):
+        return FileBlob.objects.filter(name=name).values_list('ref_count', flat=True).first()
+
+    def test_same_content_is_stored_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.file.save('thesis.pdf', ContentFile(self.data))
+            self.second.file.save('copy.pdf', ContentFile(self.data))
+        name = self.first.file.name
+        self.assertEqual(self.second.file.name, name)
+        self.assertEqual(self.first.file_sha256, self.sha256)
+        self.assertEqual(self.refs(name), 2)
+
+        # Файл удаляется только вместе с последней ссылкой
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.file = None
+            self.first.save()
+        self.assertEqual(self.refs(name), 1)
+        self.assertTrue(blob_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        self.assertIsNone(self.refs(name))
+        self.assertFalse(blob_storage.exists(name))
+
+    def test_only_storage_names_carry_hash(self):
+        sha256 = self.sha256
+        self.assertEqual(blobs.sha256_of_name(f'blobs/{sha256[:2]}/{sha256}.pdf'), sha256)
+        for name in (f'diplomas/{sha256}.pdf', f'blobs/{sha256}.pdf', f'blobs/00/{sha256}.pdf',
+                     f'media/blobs/{sha256[:2]}/{sha256}.pdf'):
+            self.assertIsNone(blobs.sha256_of_name(name), name)
+
+        # Файл вне хранилища с «хэшем» в имени - хэш считается по содержимому
+        other = default_storage.save(f'diplomas/{"0" * 64}.pdf', ContentFile(self.data))
+        self.assertEqual(text_cache.file_sha256(default_storage.path(other)), sha256)
+
+    def pending(self, name):
+        return FileBlob.objects.filter(name=name).values_list('pending_refs', flat=True).first()
+
+    def test_release_during_save_keeps_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.file.save('thesis.pdf', ContentFile(self.data))
+        # Второй запрос сохранил то же содержимое (файл уже есть), но ссылку еще не записал
+        name = blob_storage.save('blobs/copy.pdf', ContentFile(self.data))
+        self.assertEqual(name, self.first.file.name)
+        self.assertEqual((self.refs(name), self.pending(name)), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.delete()
+        self.assertTrue(blob_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.file = name
+            self.second.save()
+        self.assertEqual((self.refs(name), self.pending(name)), (1, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        self.assertIsNone(self.refs(name))
+        self.assertFalse(blob_storage.exists(name))
+
+    def test_same_file_saved_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.file.save('thesis.pdf', ContentFile(self.data))
+            self.first.file.save('again.pdf', ContentFile(self.data))
+        self.assertEqual((self.refs(self.first.file.name), self.pending(self.first.file.name)), (1, 0))
+
+    def test_failed_save_drops_pin(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.file.save('thesis.pdf', ContentFile(self.data))
+        name = self.first.file.name
+
+        # Файл уже в хранилище, запись модели падает (тема NOT NULL)
+        self.second.topic = None
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(IntegrityError):
+            self.second.file.save('copy.pdf', ContentFile(self.data))
+        self.assertEqual((self.refs(name), self.pending(name)), (1, 0))
+        self.assertTrue(blob_storage.exists(name))
+
+        # Новый файл, сохраненный в pre_save упавшей записи, не остается в хранилище
+        self.second.file = ContentFile(b'other', name='other.pdf')
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(IntegrityError):
+            self.second.save()
+        other = blobs.blob_name('blobs', hashlib.sha256(b'other').hexdigest(), '.pdf')
+        self.assertIsNone(self.pending(other))
+        self.assertFalse(blob_storage.exists(other))
+        self.assertEqual(blobs._pending_names(), {})
+
+        # Сохранение, так и не ставшее ссылкой, снимается следующим сохранением модели
+        blob_storage.save('blobs/copy.pdf', ContentFile(self.data))
+        self.assertEqual(self.pending(name), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.save()
+        self.assertEqual((self.refs(name), self.pending(name)), (1, 0))
+
+    def test_delete_skips_file_being_saved(self):
+        name = blob_storage.save('blobs/thesis.pdf', ContentFile(self.data))
+        blobs.delete_if_unreferenced(name)
+        self.assertTrue(blob_storage.exists(name))
+
+        FileBlob.objects.filter(name=name).delete()
+        blobs.delete_if_unreferenced(name)
+        self.assertFalse(blob_storage.exists(name))
+        self.assertFalse(FileBlob.objects.filter(name=name).exists())
+
+    def test_analysis_references_diploma_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.file.save('thesis.pdf', ContentFile(self.data))
+            analysis = DiplomaAIAnalysis.objects.create(
+                diploma_project=self.first, diploma_file=self.first.file.name
+            )
+        name = self.first.file.name
+        self.assertEqual(analysis.file_sha256, self.sha256)
+        self.assertEqual(self.refs(name), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.delete()
+        self.assertFalse(blob_storage.exists(name))
+
+    def test_rebuild_refs_imports_legacy_files(self):
+        legacy = default_storage.save('diplomas/2026/01/01/old.pdf', ContentFile(self.data))
+        DiplomaProject.objects.filter(pk=self.first.pk).update(file=legacy)
+        orphan = blob_storage.save('blobs/orphan.pdf', ContentFile(b'orphan'))
+
+        call_command('rebuild_blob_refs', import_legacy=True, grace=0, stdout=io.StringIO())
+
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.file_sha256, self.sha256)
+        self.assertEqual(self.first.get_file_name(), 'old.pdf')
+        self.assertEqual(self.refs(self.first.file.name), 1)
+        self.assertFalse(default_storage.exists(legacy))
+        self.assertFalse(blob_storage.exists(orphan))
+
+
+class TextExtractionTests(TestCase):
+    """Потоковое извлечение текста и метаданных из файлов дипломов"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def path(self, name):
+        return f'{self.directory}/{name}'
+
+    def test_docx_pages_fonts_and_margins(self):
+        from docx import Document
+        from docx.shared import Cm, Pt
+
+        document = Document()
+        document.styles['Normal'].font.name = 'Times New Roman'
+        document.styles['Normal'].font.size = Pt(14)
+        document.sections[0].left_margin = Cm(3)
+        document.add_paragraph('Введение в тему работы')
+        document.add_page_break()
+        document.add_paragraph('Вторая страница').add_run(' и термин').font.name = 'Arial'
+        document.add_table(rows=1, cols=1).cell(0, 0).text = 'ячейка'
+        document.save(self.path('thesis.docx'))
+
+        extraction = extract(self.path('thesis.docx'))
+        self.assertEqual(list(extraction), [
+            (1, 'Введение в тему работы'),
+            (2, 'Вторая страница и термин\nячейка'),
+        ])
+        metadata = extraction.metadata
+        self.assertEqual(metadata['page_count'], 2)
+        self.assertEqual(metadata['word_count'], 9)
+        self.assertEqual(metadata['main_font'], 'Times New Roman')
+        self.assertEqual(metadata['main_font_size'], 14)
+        self.assertIn('Arial', [font['name'] for font in metadata['fonts']])
+        self.assertEqual(metadata['margins_cm']['left'], 3)
+
+    def test_pdf_pages(self):
+        from reportlab.pdfgen import canvas
+
+        pdf = canvas.Canvas(self.path('thesis.pdf'))
+        for number in (1, 2):
+            pdf.setFont('Times-Roman', 14)
+            pdf.drawString(72, 700, f'Page {number} text')
+            pdf.showPage()
+        pdf.save()
+
+        text, metadata = extract_text(self.path('thesis.pdf'))
+        self.assertEqual(text, 'Page 1 text\fPage 2 text')
+        self.assertEqual(metadata['page_count'], 2)
+        self.assertIn('Times-Roman', [font['name'] for font in metadata['fonts']])
+
+    def test_txt_encoding_and_pages(self):
+        with open(self.path('thesis.txt'), 'wb') as file:
+            file.write('Введение\fЗаключение работы'.encode('cp1251'))
+
+        extraction = extract(self.path('thesis.txt'))
+        self.assertEqual(list(extraction), [(1, 'Введение'), (2, 'Заключение работы')])
+        self.assertEqual(extraction.metadata['encoding'], 'cp1251')
+
+    def test_unsupported_and_corrupted_files(self):
+        with open(self.path('thesis.doc'), 'wb') as file:
+            file.write(b'binary')
+        with self.assertRaises(ExtractionError):
+            extract(self.path('thesis.doc'))
+
+        with open(self.path('broken.docx'), 'wb') as file:
+            file.write(b'not a zip')
+        with self.assertRaises(ExtractionError):
+            extract(self.path('broken.docx'))
+
+
+class TextCacheTests(TestCase):
+    """Извлеченный текст хранится по хэшу файла и разбирается один раз"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_group('ИС-41', students=1, with_diploma=1)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.diploma = DiplomaProject.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.diploma.file.save('thesis.txt', ContentFile('Введение\fГлава 1\fЗаключение'.encode()))
+
+    def test_text_is_extracted_once(self):
+        analyzer = DiplomaAnalyzer()
+        with mock.patch.object(text_cache, 'extract', wraps=text_cache.extract) as extract_mock:
+            text, metadata = analyzer.extract_text_from_file(self.diploma.file.path)
+            with self.assertNumQueries(1):
+                self.assertEqual(analyzer.extract_text_from_file(self.diploma.file.path)[0], text)
+        self.assertEqual(extract_mock.call_count, 1)
+        self.assertEqual(text, 'Введение\fГлава 1\fЗаключение')
+        self.assertEqual(metadata['page_count'], 3)
+
+        cached = ExtractedText.objects.get(sha256=self.diploma.file_sha256)
+        self.assertEqual(list(cached.pages()), [(1, 'Введение'), (2, 'Глава 1'), (3, 'Заключение')])
+
+    def test_text_is_evicted_with_file(self):
+        DiplomaAnalyzer().extract_text_from_file(self.diploma.file.path)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.diploma.file = None
+            self.diploma.save()
+        self.assertFalse(ExtractedText.objects.exists())
+
+
+class AnalysisJobTests(TestCase):
+    """ИИ-анализ ставится в очередь и выполняется обработчиком ai_worker"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='pass', is_staff=True)
+        create_group('ИС-41', students=1, with_diploma=1)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.diploma = DiplomaProject.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.diploma.file.save('thesis.txt', ContentFile('Введение\fГлава 1\fЗаключение'.encode()))
+        self.client.force_login(self.user)
+        self.url = reverse('diploma_orders:run_ai_analysis', args=[self.diploma.pk])
+
+    def test_request_is_queued(self):
+        with mock.patch.object(DiplomaAnalyzer, 'analyze_diploma') as analyze_mock:
+            response = self.client.post(self.url, {'analysis_type': 'full', 'ai_provider': 'openai'})
+        analyze_mock.assert_not_called()
+        self.assertEqual(response.status_code, 202)
+        job = AnalysisJob.objects.get(id=response.json()['job_id'])
+        self.assertEqual(response['Location'], reverse('diploma_orders:analysis_job_status', args=[job.id]))
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(DiplomaAIAnalysis.objects.get().status, 'pending')
+
+        # Повторный запрос не ставит второе задание
+        response = self.client.post(self.url, {'analysis_type': 'full', 'ai_provider': 'openai'})
+        self.assertEqual(response.json()['job_id'], job.id)
+        self.assertEqual(AnalysisJob.objects.count(), 1)
+
+        response = self.client.post(self.url, {'analysis_type': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_worker_completes_jobs(self):
+        for analysis_type in ('format', 'questions'):
+            self.client.post(self.url, {'analysis_type': analysis_type})
+
+        # Так выполняет задания ai_worker (пул потоков в тестах SQLite недоступен)
+        for job_id in analysis_jobs.claim_jobs(5):
+            analysis_jobs.process_analysis_job(job_id)
+
+        self.assertEqual(
+            set(AnalysisJob.objects.values_list('status', flat=True)), {'completed'}
+        )
+        analysis = DiplomaAIAnalysis.objects.get()
+        self.assertEqual(analysis.status, 'completed')
+        self.assertEqual(analysis.file_metadata['page_count'], 3)
+        self.assertTrue(analysis.format_issues)
+        self.assertTrue(analysis.questions)
+
+        job = AnalysisJob.objects.first()
+        response = self.client.get(reverse('diploma_orders:analysis_job_status', args=[job.id]))
+        self.assertEqual(response.json()['status'], 'completed')
+        self.assertEqual(response.json()['analysis_id'], analysis.id)
+
+    def test_claim_order_follows_deadline(self):
+        urgent = create_group('ИС-42', students=1, with_diploma=1)
+        urgent_diploma = DiplomaProject.objects.get(student__group=urgent)
+        urgent_diploma.deadline = date.today() + timedelta(days=1)
+        urgent_diploma.save()
+        DiplomaProject.objects.filter(pk=self.diploma.pk).update(deadline=date.today() + timedelta(days=30))
+
+        later = analysis_jobs.enqueue_analysis(self.diploma, 'full')
+        first = analysis_jobs.enqueue_analysis(urgent_diploma, 'full')
+        self.assertEqual(analysis_jobs.claim_jobs(1), [first.id])
+        self.assertEqual(analysis_jobs.claim_jobs(1), [later.id])
+        self.assertEqual(analysis_jobs.claim_jobs(1), [])
+
+    def test_repeat_analysis_is_served_from_cache(self):
+        self.client.post(self.url, {'analysis_type': 'format'})
+        for job_id in analysis_jobs.claim_jobs(5):
+            analysis_jobs.process_analysis_job(job_id)
+        DiplomaAIAnalysis.objects.update(format_score=0)
+
+        with mock.patch.object(DiplomaAnalyzer, 'check_format_compliance') as check_mock:
+            response = self.client.post(self.url, {'analysis_type': 'format'})
+        check_mock.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'completed')
+        analysis = DiplomaAIAnalysis.objects.get()
+        self.assertEqual((analysis.status, analysis.format_score), ('completed', 85))
+        self.assertEqual(AnalysisResult.objects.get().hits, 1)
+
+        # Другой провайдер или force_refresh - новый запрос к провайдеру
+        with mock.patch.object(
+            DiplomaAnalyzer, 'check_format_compliance', return_value={'score': 70, 'issues': [], 'metadata': {}}
+        ) as check_mock:
+            for data in ({'ai_provider': 'yandex'}, {'force_refresh': 'on'}):
+                response = self.client.post(self.url, {'analysis_type': 'format', **data})
+                self.assertEqual(response.status_code, 202)
+                for job_id in analysis_jobs.claim_jobs(5):
+                    analysis_jobs.process_analysis_job(job_id)
+        self.assertEqual(check_mock.call_count, 2)
+        self.assertEqual(AnalysisResult.objects.get(ai_provider='openai').result['format_score'], 70)
+
+    @override_settings(AI_RESULT_CACHE_MAX_ENTRIES=2, AI_RESULT_CACHE_TTL=3600)
+    def test_cache_eviction(self):
+        analyzer = DiplomaAnalyzer()
+        for sha256 in ('a', 'b'):
+            result_cache.store(sha256, 'format', analyzer, {'format_score': 1})
+        self.assertIsNotNone(result_cache.lookup('a', 'format', analyzer))
+
+        # Вытесняется давно не использованный
+        result_cache.store('c', 'format', analyzer, {'format_score': 1})
+        self.assertEqual(set(AnalysisResult.objects.values_list('sha256', flat=True)), {'a', 'c'})
+
+        AnalysisResult.objects.filter(sha256='a').update(created_at=timezone.now() - timedelta(hours=2))
+        self.assertIsNone(result_cache.lookup('a', 'format', analyzer))
+
+    def test_concurrent_requests_share_one_job(self):
+        job = analysis_jobs.enqueue_analysis(self.diploma, 'review')
+        # Другой провайдер - то же задание: на диплом одно активное задание типа
+        self.assertEqual(analysis_jobs.enqueue_analysis(self.diploma, 'review', 'yandex'), job)
+
+        # Параллельный запрос не увидел задание и упирается в уникальный индекс
+        with mock.patch.object(analysis_jobs, '_find_job', side_effect=[None, job]):
+            self.assertEqual(analysis_jobs.enqueue_analysis(self.diploma, 'review'), job)
+        self.assertEqual(AnalysisJob.objects.count(), 1)
+
+    def test_idempotency_key(self):
+        response = self.client.post(self.url, {'analysis_type': 'questions'}, HTTP_IDEMPOTENCY_KEY='k-1')
+        job_id = response.json()['job_id']
+        for claimed in analysis_jobs.claim_jobs(5):
+            analysis_jobs.process_analysis_job(claimed)
+
+        # Повтор с тем же ключом после завершения - то же задание, а не новый анализ
+        response = self.client.post(self.url, {'analysis_type': 'questions'}, HTTP_IDEMPOTENCY_KEY='k-1')
+        self.assertEqual((response.json()['job_id'], response.json()['status']), (job_id, 'completed'))
+        self.assertEqual(AnalysisJob.objects.count(), 1)
+
+        response = self.client.post(self.url, {'analysis_type': 'format'}, HTTP_IDEMPOTENCY_KEY='k-1')
+        self.assertEqual(response.status_code, 422)
+
+    def test_idempotency_key_mismatch_changes_nothing(self):
+        job = analysis_jobs.enqueue_analysis(self.diploma, 'review', user=self.user, idempotency_key='k-2')
+        analysis = DiplomaAIAnalysis.objects.get()
+        other = create_group('ИС-42', students=1, with_diploma=1)
+        other_diploma = DiplomaProject.objects.get(student__group=other)
+
+        for diploma, analysis_type in ((self.diploma, 'format'), (other_diploma, 'review')):
+            returned = analysis_jobs.enqueue_analysis(
+                diploma, analysis_type, user=self.user, diploma_file='blobs/other.pdf',
+                force_refresh=True, idempotency_key='k-2',
+            )
+            self.assertEqual(returned, job)
+        job.refresh_from_db()
+        self.assertFalse(job.force_refresh)
+        self.assertEqual(DiplomaAIAnalysis.objects.get(pk=analysis.pk).diploma_file, analysis.diploma_file)
+        self.assertFalse(DiplomaAIAnalysis.objects.filter(diploma_project=other_diploma).exists())
+
+    def test_status_is_kept_per_job(self):
+        full = analysis_jobs.enqueue_analysis(self.diploma, 'full')
+        fmt = analysis_jobs.enqueue_analysis(self.diploma, 'format')
+        AnalysisJob.objects.filter(id=full.id).update(status='processing')
+        AnalysisJob.objects.filter(id=fmt.id).update(status='processing')
+
+        # Завершение одного типа не объявляет завершенным весь анализ
+        self.assertEqual(analysis_jobs.process_analysis_job(fmt.id), 'completed')
+        self.assertEqual(DiplomaAIAnalysis.objects.get().status, 'processing')
+        response = self.client.get(reverse('diploma_orders:analysis_job_status', args=[full.id]))
+        self.assertEqual((response.json()['status'], response.json()['analysis_id']), ('processing', None))
+
+        with mock.patch.object(DiplomaAnalyzer, 'analyze_diploma', side_effect=RuntimeError('нет ответа')):
+            self.assertEqual(analysis_jobs.process_analysis_job(full.id), 'failed')
+        self.assertEqual(DiplomaAIAnalysis.objects.get().status, 'failed')
+        response = self.client.get(reverse('diploma_orders:analysis_job_status', args=[fmt.id]))
+        self.assertEqual(response.json()['status'], 'completed')
+        self.assertEqual(response.json()['analysis_id'], DiplomaAIAnalysis.objects.get().id)
+
+    def test_file_uploaded_while_processing_is_analyzed(self):
+        job = analysis_jobs.enqueue_analysis(self.diploma, 'format')
+        self.assertEqual(analysis_jobs.claim_jobs(5), [job.id])
+        run_analysis = analysis_jobs.run_analysis
+        analyzed = []
+
+        def upload_during_analysis(analysis_type, analyzer, file_path, diploma):
+            analyzed.append(file_path)
+            if len(analyzed) == 1:
+                # Так загружает файл upload_diploma_for_analysis
+                upload = SimpleUploadedFile('new.txt', 'Введение\fЗаключение'.encode())
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.assertEqual(analysis_jobs.enqueue_analysis(diploma, 'format', diploma_file=upload), job)
+            return run_analysis(analysis_type, analyzer, file_path, diploma)
+
+        with mock.patch.object(analysis_jobs, 'run_analysis', side_effect=upload_during_analysis):
+            # Результат по старому файлу не записывается, задание снова в очереди
+            self.assertEqual(analysis_jobs.process_analysis_job(job.id), 'pending')
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'pending')
+            self.assertEqual(DiplomaAIAnalysis.objects.get().file_metadata, {})
+
+            self.assertEqual(analysis_jobs.claim_jobs(5), [job.id])
+            self.assertEqual(analysis_jobs.process_analysis_job(job.id), 'completed')
+
+        analysis = DiplomaAIAnalysis.objects.get()
+        self.assertEqual(analyzed[1], analysis.diploma_file.path)
+        self.assertNotEqual(analyzed[0], analyzed[1])
+        self.assertEqual(analysis.file_metadata['page_count'], 2)
+        self.assertEqual(analysis.status, 'completed')
+
+    def test_failed_job(self):
+        job = analysis_jobs.enqueue_analysis(self.diploma, 'review')
+        self.assertEqual(analysis_jobs.claim_jobs(5), [job.id])
+        self.assertEqual(DiplomaAIAnalysis.objects.get().status, 'processing')
+
+        with mock.patch.object(DiplomaAnalyzer, 'generate_review', side_effect=RuntimeError('нет ответа')):
+            self.assertEqual(analysis_jobs.process_analysis_job(job.id), 'failed')
+        job.refresh_from_db()
+        self.assertEqual(job.error, 'нет ответа')
+        self.assertEqual(DiplomaAIAnalysis.objects.get().status, 'failed')
+
+
+class AnalysisSchedulerTests(TestCase):
+    """Порядок заданий ИИ-анализа: срок сдачи, стоимость, справедливость"""
+
+    now = datetime(2026, 6, 1, 9, 0)
+
+    def candidate(self, job_id, supervisor_id=1, days=10, analysis_type='full', waited_minutes=0):
+        return Candidate(
+            job_id, supervisor_id, self.now.date() + timedelta(days=days), analysis_type,
+            self.now - timedelta(minutes=waited_minutes),
+        )
+
+    def order(self, candidates, limit=10, running=None):
+        return [candidate.id for candidate in schedule(candidates, limit, self.now, running)]
+
+    def test_deadline_and_cost(self):
+        candidates = [
+            self.candidate(1, days=20, waited_minutes=30),
+            self.candidate(2, days=1),
+            self.candidate(3, days=20, analysis_type='format', waited_minutes=30),
+        ]
+        self.assertEqual(self.order(candidates), [2, 3, 1])
+        self.assertEqual(self.order(candidates, limit=1), [2])
+
+    def test_supervisor_fairness(self):
+        batch = [self.candidate(job_id, supervisor_id=1, days=1) for job_id in range(1, 5)]
+        other = self.candidate(10, supervisor_id=2, days=2, analysis_type='review')
+        self.assertEqual(self.order(batch + [other]), [1, 10, 2, 3, 4])
+        # Руководитель, чьи задания уже выполняются, уступает очередь
+        self.assertEqual(self.order(batch + [other], limit=1, running={1: 2}), [10])
+
+    def test_waiting_jobs_age(self):
+        candidates = [self.candidate(1, days=5), self.candidate(2, days=10, waited_minutes=24 * 60)]
+        self.assertEqual(self.order(candidates), [2, 1])
@@ -0,0 +1,89 @@
+# diploma_orders/text_cache.py
+"""
+Хранилище извлеченного текста дипломов по хэшу содержимого файла.
+
+Каждый тип анализа (формат, рецензия, вопросы, полный) начинается с
+извлечения текста; без хранилища файл разбирался бы заново на каждой
+вкладке. Текст (сжатый zlib), начала страниц и метаданные сохраняются в
+ExtractedText под SHA-256 файла один раз - при первом обращении, то есть в
+воркере очереди анализа (diploma_orders/analysis_jobs.py), а не в запросе
+загрузки - и используются всеми методами DiplomaAnalyzer. Одинаковые файлы
+разных дипломов разбираются один раз.
+
+Хэш берется из имени файла в хранилище (diploma_orders/blobs.py), для
+файлов вне хранилища - считается по содержимому. Запись удаляется вместе с
+последним файлом с таким хэшем, а также при смене EXTRACTOR_VERSION.
+"""
+import os
+import zlib
+
+from django.core.files import File
+from django.db import IntegrityError
+
+from .blobs import blob_storage, content_sha256, sha256_of_name
+from .text_extraction import EXTRACTOR_VERSION, PAGE_SEPARATOR, extract
+
+COMPRESSION_LEVEL = 6
+
+
+def file_sha256(file_path):
+    """Хэш содержимого: из имени файла хранилища или по самому файлу"""
+    location = os.path.abspath(blob_storage.location)
+    path = os.path.abspath(file_path)
+    if path.startswith(location + os.sep):
+        sha256 = sha256_of_name(os.path.relpath(path, location).replace(os.sep, '/'))
+        if sha256:
+            return sha256
+    with open(file_path, 'rb') as file:
+        return content_sha256(File(file))
+
+
+def get_extracted_text(file_path, sha256=None):
+    """ExtractedText файла file_path; при первом обращении текст извлекается"""
+    from .models import ExtractedText
+
+    sha256 = sha256 or file_sha256(file_path)
+    cached = ExtractedText.objects.filter(sha256=sha256, extractor_version=EXTRACTOR_VERSION).first()
+    if cached is not None:
+        return cached
+    return store(sha256, file_path)
+
+
+def store(sha256, file_path):
+    """Извлечь текст из файла и сохранить под хэшем sha256"""
+    from .models import ExtractedText
+
+    extraction = extract(file_path)
+    offsets = []
+    pages = []
+    position = 0
+    for _, text in extraction:
+        offsets.append(position)
+        pages.append(text)
+        position += len(text) + len(PAGE_SEPARATOR)
+    text = PAGE_SEPARATOR.join(pages)
+
+    defaults = {
+        'text': zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL),
+        'page_offsets': offsets,
+        'metadata': extraction.metadata,
+        'extractor_version': EXTRACTOR_VERSION,
+    }
+    # Отдельные UPDATE и INSERT вместо update_or_create: его блокирующее
+    # чтение в транзакции SQLite не может дождаться записи параллельных воркеров
+    if ExtractedText.objects.filter(sha256=sha256).update(**defaults):
+        cached = ExtractedText.objects.get(sha256=sha256)
+    else:
+        try:
+            cached = ExtractedText.objects.create(sha256=sha256, **defaults)
+        except IntegrityError:
+            # Тот же файл параллельно извлек другой запрос
+            cached = ExtractedText.objects.get(sha256=sha256)
+    cached._text = text
+    return cached
+
+
+def evict(sha256):
+    from .models import ExtractedText
+
+    ExtractedText.objects.filter(sha256=sha256).delete()
@@ -0,0 +1,453 @@
+# diploma_orders/text_extraction.py
+"""
+Извлечение текста из файлов дипломов (DOCX, PDF, TXT) для анализа ИИ.
+
+extract(path) возвращает Extraction: итерация по нему дает пары
+(номер страницы, текст) по мере чтения файла, metadata - сведения о файле.
+
+- DOCX: word/document.xml читается из архива потоком через lxml iterparse,
+  без объектной модели python-docx; прочитанные абзацы сразу удаляются из
+  дерева. Страницы - по разрывам страниц, которые Word сохраняет при
+  последней отрисовке (w:lastRenderedPageBreak), и явным разрывам. Шрифт и
+  кегль каждого фрагмента определяются с учетом стилей и темы документа,
+  поля и размер листа - по параметрам раздела.
+- PDF: текст по страницам через pypdf, шрифты - из ресурсов страниц.
+- TXT: кодировка по BOM, затем UTF-8, затем charset_normalizer (если
+  установлен) или cp1251; страницы - по символу \\f или по 1800 знаков.
+
+Часть метаданных (число слов, шрифты, поля DOCX) известна только после
+чтения всего файла и появляется в metadata после окончания итерации.
+"""
+import codecs
+import os
+import zipfile
+from collections import Counter
+
+from lxml import etree
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+EP_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/extended-properties'
+
+
+def _w(tag):
+    return f'{{{W_NS}}}{tag}'
+
+
+W_P = _w('p')
+W_R = _w('r')
+W_T = _w('t')
+W_TAB = _w('tab')
+W_BR = _w('br')
+W_CR = _w('cr')
+W_PPR = _w('pPr')
+W_RPR = _w('rPr')
+W_SECTPR = _w('sectPr')
+W_RENDERED_BREAK = _w('lastRenderedPageBreak')
+W_VAL = _w('val')
+
+# Версия извлечения: при изменении формата результата сохраненные тексты
+# (diploma_orders/text_cache.py) извлекаются заново
+EXTRACTOR_VERSION = 1
+
+# Разделитель страниц в тексте из Extraction.text()
+PAGE_SEPARATOR = '\f'
+
+# «Условная страница» для TXT без разрывов страниц, знаков
+TXT_PAGE_CHARS = 1800
+
+READ_BLOCK_SIZE = 64 * 1024
+
+# Единиц DOCX (двадцатых долей пункта) в сантиметре
+TWIPS_PER_CM = 1440 / 2.54
+
+POINTS_PER_MM = 72 / 25.4
+
+# Кандидаты для charset_normalizer: кириллические кодировки и западная
+TEXT_ENCODINGS = ['cp1251', 'koi8_r', 'cp866', 'mac_cyrillic', 'cp1252']
+
+TEXT_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+class ExtractionError(Exception):
+    """Файл не удалось прочитать или формат не поддерживается"""
+
+
+class Extraction:
+    """Страницы файла (генератор) и метаданные"""
+
+    def __init__(self, sections, metadata):
+        self.metadata = metadata
+        self._sections = sections
+
+    def __iter__(self):
+        words = chars = count = 0
+        for number, text in self._sections:
+            words += len(text.split())
+            chars += len(text)
+            count += 1
+            yield number, text
+        self.metadata.update(word_count=words, char_count=chars, section_count=count)
+        self.metadata.setdefault('page_count', count)
+
+    def text(self):
+        """Весь текст, страницы разделены PAGE_SEPARATOR"""
+        return PAGE_SEPARATOR.join(text for _, text in self)
+
+
+def extract(file_path):
+    """Extraction для файла file_path; формат - по расширению"""
+    extension = os.path.splitext(file_path)[1].lower()
+    metadata = {'format': extension.lstrip('.'), 'file_size': os.path.getsize(file_path)}
+    if extension == '.docx':
+        sections = _docx_pages(file_path, metadata)
+    elif extension == '.pdf':
+        sections = _pdf_pages(file_path, metadata)
+    elif extension == '.txt':
+        sections = _txt_pages(file_path, metadata)
+    else:
+        raise ExtractionError(
+            f'Извлечение текста из {extension or "файлов без расширения"} не поддерживается, '
+            f'сохраните работу в DOCX, PDF или TXT'
+        )
+    return Extraction(sections, metadata)
+
+
+def extract_text(file_path):
+    """(текст, метаданные) файла целиком"""
+    extraction = extract(file_path)
+    return extraction.text(), extraction.metadata
+
+
+def _top(counter, limit=5):
+    total = sum(counter.values())
+    return [
+        {'name': name, 'share': round(amount / total, 3)}
+        for name, amount in counter.most_common(limit)
+    ] if total else []
+
+
+# DOCX
+
+class _DocxStyles:
+    """Шрифт и кегль по умолчанию и по стилям (styles.xml, тема)"""
+
+    def __init__(self, archive):
+        self.styles = {}
+        self.default_paragraph_style = None
+        self.default_font = None
+        self.default_size = None
+        self.theme_fonts = self._theme_fonts(archive)
+        self._resolved = {}
+
+        try:
+            root = etree.fromstring(archive.read('word/styles.xml'))
+        except KeyError:
+            return
+        defaults = root.find(f'{_w("docDefaults")}/{_w("rPrDefault")}/{W_RPR}')
+        if defaults is not None:
+            self.default_font, self.default_size = self.run_props(defaults)
+        for style in root.iter(_w('style')):
+            style_id = style.get(_w('styleId'))
+            based_on = style.find(_w('basedOn'))
+            rpr = style.find(W_RPR)
+            font, size = self.run_props(rpr) if rpr is not None else (None, None)
+            self.styles[style_id] = (font, size, based_on.get(W_VAL) if based_on is not None else None)
+            if style.get(_w('type')) == 'paragraph' and style.get(_w('default')) in ('1', 'true'):
+                self.default_paragraph_style = style_id
+
+    @staticmethod
+    def _theme_fonts(archive):
+        try:
+            root = etree.fromstring(archive.read('word/theme/theme1.xml'))
+        except KeyError:
+            return {}
+        fonts = {}
+        for kind in ('major', 'minor'):
+            latin = root.find(f'.//{{{A_NS}}}{kind}Font/{{{A_NS}}}latin')
+            if latin is not None:
+                fonts[kind] = latin.get('typeface')
+        return fonts
+
+    def run_props(self, rpr):
+        """(шрифт, кегль в пунктах) из w:rPr; None - не задано"""
+        font = size = None
+        fonts = rpr.find(_w('rFonts'))
+        if fonts is not None:
+            font = fonts.get(_w('ascii')) or fonts.get(_w('hAnsi'))
+            theme = fonts.get(_w('asciiTheme')) or fonts.get(_w('hAnsiTheme'))
+            if not font and theme:
+                font = self.theme_fonts.get('major' if theme.startswith('major') else 'minor')
+        sz = rpr.find(_w('sz'))
+        if sz is not None and sz.get(W_VAL, '').isdigit():
+            size = int(sz.get(W_VAL)) / 2
+        return font, size
+
+    def resolve(self, style_id):
+        """(шрифт, кегль) стиля с учетом basedOn"""
+        if style_id not in self._resolved:
+            font = size = None
+            current = style_id
+            seen = set()
+            while current in self.styles and current not in seen and (font is None or size is None):
+                seen.add(current)
+                style_font, style_size, current = self.styles[current]
+                font = font or style_font
+                size = size or style_size
+            self._resolved[style_id] = (font, size)
+        return self._resolved[style_id]
+
+
+def _docx_app_pages(archive):
+    """Число страниц, сохраненное Word в docProps/app.xml"""
+    try:
+        root = etree.fromstring(archive.read('docProps/app.xml'))
+    except KeyError:
+        return None
+    pages = root.find(f'{{{EP_NS}}}Pages')
+    if pages is not None and (pages.text or '').isdigit() and int(pages.text) > 0:
+        return int(pages.text)
+    return None
+
+
+def _section_geometry(sect_pr):
+    """Поля (см) и размер листа (мм) раздела"""
+    geometry = {}
+    margins = sect_pr.find(_w('pgMar'))
+    if margins is not None:
+        geometry['margins_cm'] = {
+            side: round(int(margins.get(_w(side), 0)) / TWIPS_PER_CM, 2)
+            for side in ('top', 'bottom', 'left', 'right')
+        }
+    size = sect_pr.find(_w('pgSz'))
+    if size is not None and size.get(_w('w')) and size.get(_w('h')):
+        geometry['page_size_mm'] = [
+            round(int(size.get(_w(side))) / TWIPS_PER_CM * 10) for side in ('w', 'h')
+        ]
+    return geometry
+
+
+def _docx_pages(file_path, metadata):
+    try:
+        archive = zipfile.ZipFile(file_path)
+        archive.getinfo('word/document.xml')
+        styles = _DocxStyles(archive)
+        app_pages = _docx_app_pages(archive)
+    except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError) as error:
+        raise ExtractionError(f'Файл DOCX поврежден: {error}') from error
+    if app_pages:
+        metadata['page_count'] = app_pages
+    return _iter_docx_pages(archive, styles, metadata)
+
+
+def _iter_docx_pages(archive, styles, metadata):
+    fonts = Counter()
+    sizes = Counter()
+    page = []
+    number = 1
+    paragraph_style = styles.default_paragraph_style
+    geometry = {}
+    has_breaks = False
+
+    def flush():
+        text = ''.join(page).strip()
+        page.clear()
+        return text
+
+    def run_font(run):
+        """(шрифт, кегль) фрагмента: свойства фрагмента, его стиль, стиль абзаца"""
+        rpr = run.find(W_RPR)
+        font = size = None
+        if rpr is not None:
+            font, size = styles.run_props(rpr)
+            run_style = rpr.find(_w('rStyle'))
+            if run_style is not None and (font is None or size is None):
+                style_font, style_size = styles.resolve(run_style.get(W_VAL))
+                font, size = font or style_font, size or style_size
+        if font is None or size is None:
+            style_font, style_size = styles.resolve(paragraph_style)
+            font, size = font or style_font, size or style_size
+        return font, size
+
+    try:
+        with archive, archive.open('word/document.xml') as stream:
+            for _, element in etree.iterparse(stream, events=('end',)):
+                tag = element.tag
+                if tag == W_R:
+                    run_chars = 0
+                    for child in element:
+                        child_tag = child.tag
+                        if child_tag == W_T:
+                            text = child.text or ''
+                            page.append(text)
+                            run_chars += len(text.strip())
+                        elif child_tag == W_TAB:
+                            page.append('\t')
+                        elif child_tag == W_RENDERED_BREAK or (
+                            child_tag == W_BR and child.get(_w('type')) == 'page'
+                        ):
+                            has_breaks = True
+                            text = flush()
+                            if text:
+                                yield number, text
+                                number += 1
+                        elif child_tag in (W_BR, W_CR):
+                            page.append('\n')
+                    if run_chars:
+                        font, size = run_font(element)
+                        fonts[font or styles.default_font or 'по умолчанию'] += run_chars
+                        sizes[size or styles.default_size or 10] += run_chars
+                elif tag == W_PPR:
+                    style = element.find(_w('pStyle'))
+                    paragraph_style = style.get(W_VAL) if style is not None else styles.default_paragraph_style
+                    if element.find(_w('pageBreakBefore')) is not None:
+                        has_breaks = True
+                        text = flush()
+                        if text:
+                            yield number, text
+                            number += 1
+                elif tag == W_P:
+                    page.append('\n')
+                    paragraph_style = styles.default_paragraph_style
+                    # Прочитанный абзац больше не нужен
+                    element.clear(keep_tail=False)
+                    parent = element.getparent()
+                    if parent is not None:
+                        while element.getprevious() is not None:
+                            del parent[0]
+                elif tag == W_SECTPR:
+                    geometry = _section_geometry(element)
+    except (zipfile.BadZipFile, etree.XMLSyntaxError) as error:
+        raise ExtractionError(f'Файл DOCX поврежден: {error}') from error
+
+    text = flush()
+    if text:
+        yield number, text
+    else:
+        number -= 1
+
+    if has_breaks:
+        # Разрывы точнее, чем число страниц в docProps/app.xml, которое
+        # могло остаться от шаблона
+        metadata['page_count'] = number
+    metadata.update(geometry)
+    metadata['fonts'] = _top(fonts)
+    metadata['font_sizes'] = _top(sizes)
+    if fonts:
+        metadata['main_font'] = fonts.most_common(1)[0][0]
+        metadata['main_font_size'] = sizes.most_common(1)[0][0]
+
+
+# PDF
+
+def _pdf_font_names(page):
+    resources = page.get('/Resources')
+    resources = resources.get_object() if resources is not None else {}
+    page_fonts = resources.get('/Font')
+    if page_fonts is None:
+        return []
+    names = []
+    for font in page_fonts.get_object().values():
+        base = str(font.get_object().get('/BaseFont', '')).lstrip('/')
+        # Подмножество шрифта: ABCDEF+TimesNewRoman
+        if len(base) > 7 and base[6] == '+':
+            base = base[7:]
+        if base:
+            names.append(base)
+    return names
+
+
+def _pdf_pages(file_path, metadata):
+    from pypdf import PdfReader
+    from pypdf.errors import PdfReadError
+
+    try:
+        reader = PdfReader(file_path)
+        pages = reader.pages
+        metadata['page_count'] = len(pages)
+        if len(pages):
+            box = pages[0].mediabox
+            metadata['page_size_mm'] = [
+                round(float(box.width) / POINTS_PER_MM), round(float(box.height) / POINTS_PER_MM)
+            ]
+    except PdfReadError as error:
+        raise ExtractionError(f'Файл PDF поврежден: {error}') from error
+    return _iter_pdf_pages(pages, metadata, PdfReadError)
+
+
+def _iter_pdf_pages(pages, metadata, read_error):
+    fonts = Counter()
+    try:
+        for number, page in enumerate(pages, 1):
+            fonts.update(_pdf_font_names(page))
+            yield number, (page.extract_text() or '').strip()
+    except read_error as error:
+        raise ExtractionError(f'Файл PDF поврежден: {error}') from error
+    # Для PDF - доля страниц, на которых встречается шрифт
+    metadata['fonts'] = _top(fonts)
+    if fonts:
+        metadata['main_font'] = fonts.most_common(1)[0][0]
+
+
+# TXT
+
+def detect_encoding(sample):
+    """Кодировка текста по начальному фрагменту"""
+    for bom, encoding in TEXT_BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # final=False: фрагмент мог оборваться посреди многобайтного символа
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return 'cp1251'
+    best = from_bytes(sample, cp_isolation=TEXT_ENCODINGS).best()
+    return best.encoding if best else 'cp1251'
+
+
+def _txt_pages(file_path, metadata):
+    with open(file_path, 'rb') as file:
+        metadata['encoding'] = detect_encoding(file.read(READ_BLOCK_SIZE))
+    return _iter_txt_pages(file_path, metadata['encoding'])
+
+
+def _iter_txt_pages(file_path, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    buffer = ''
+    number = 1
+    with open(file_path, 'rb') as file:
+        while True:
+            block = file.read(READ_BLOCK_SIZE)
+            buffer += decoder.decode(block, final=not block)
+            while True:
+                cut = buffer.find(PAGE_SEPARATOR)
+                if cut == -1 and len(buffer) > TXT_PAGE_CHARS:
+                    # Без разрывов страниц режем по концу строки после TXT_PAGE_CHARS знаков
+                    cut = buffer.find('\n', TXT_PAGE_CHARS)
+                    if cut == -1 and block:
+                        break
+                    if cut == -1:
+                        cut = len(buffer)
+                if cut == -1:
+                    break
+                text = buffer[:cut].strip()
+                buffer = buffer[cut + 1:]
+                if text:
+                    yield number, text
+                    number += 1
+            if not block:
+                break
+    text = buffer.strip()
+    if text:
+        yield number, text
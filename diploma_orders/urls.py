@@ -15,6 +15,7 @@ urlpatterns = [
     path('groups/', views.GroupListView.as_view(), name='group_list'),
     path('groups/<int:pk>/', views.GroupDetailView.as_view(), name='group_detail'),
     path('group-orders/', views.GroupOrderListView.as_view(), name='group_order_list'),
+    path('group-orders/bulk-download/', views.bulk_group_orders_download, name='group_order_bulk_download'),
     path('groups/<int:group_id>/create-order/', views.create_group_order, name='create_group_order'),
     path('group-orders/<int:order_id>/', views.group_order_detail, name='group_order_detail'),
     path('group-orders/<int:order_id>/preview/', views.generate_group_order_preview, name='group_order_preview'),
@@ -38,12 +39,16 @@ urlpatterns = [
     path('documents/<int:document_id>/history/', views.document_history, name='document_history'),
     path('documents/<int:document_id>/export/<str:format_type>/', 
          views.export_document, name='export_document'),
+    path('render-jobs/<int:job_id>/', views.render_job_status, name='render_job_status'),
+    path('render-jobs/<int:job_id>/download/', views.render_job_download, name='render_job_download'),
     path('documents/<int:document_id>/add-collaborator/', 
          views.add_collaborator, name='add_collaborator'),
     path('documents/<int:document_id>/remove-collaborator/<int:collaborator_id>/', 
          views.remove_collaborator, name='remove_collaborator'),
     
     # API
+    path('api/autocomplete/<str:kind>/', views.api_autocomplete, name='api_autocomplete'),
+    path('api/students/facets/', views.api_student_facets, name='api_student_facets'),
     path('api/sections/<int:section_id>/', views.api_section_detail, name='api_section_detail'),
     path('api/sections/<int:section_id>/edit-form/', 
          views.api_section_edit_form, name='api_section_edit_form'),
@@ -54,8 +59,12 @@ urlpatterns = [
     path('api/templates/<int:template_id>/preview/', views.api_template_preview, name='api_template_preview'),
 
      path('diploma/<int:diploma_id>/upload/', views_upload.upload_diploma_file, name='upload_diploma'),
+    path('diploma/<int:diploma_id>/upload/chunked/', views_upload.chunked_upload_init, name='chunked_upload_init'),
+    path('uploads/<uuid:upload_id>/', views_upload.chunked_upload, name='chunked_upload'),
+    path('uploads/<uuid:upload_id>/finalize/', views_upload.chunked_upload_finalize, name='chunked_upload_finalize'),
     path('diploma/<int:diploma_id>/analysis/', views_upload.diploma_analysis_dashboard, name='diploma_analysis'),
     path('diploma/<int:diploma_id>/analyze/run/', views_upload.run_ai_analysis, name='run_ai_analysis'),
+    path('api/analysis-jobs/<int:job_id>/', views_upload.analysis_job_status, name='analysis_job_status'),
     path('diploma/<int:diploma_id>/file/delete/', views_upload.delete_diploma_file, name='delete_diploma_file'),
     path('diploma/<int:diploma_id>/file/download/', views_upload.download_diploma_file, name='download_diploma'),
     
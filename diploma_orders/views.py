@@ -1,28 +1,34 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse, Http404, JsonResponse, HttpResponseRedirect, FileResponse
-from django.views.generic import ListView, DetailView, TemplateView, CreateView, DeleteView, UpdateView
-from django.db.models import Q
-from datetime import datetime, date
+from django.http import HttpResponse, Http404, JsonResponse, HttpResponseRedirect, HttpResponseForbidden
+from django.views.generic import ListView, DetailView, TemplateView, CreateView, DeleteView
+from datetime import datetime
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.utils.decorators import method_decorator
+from django.utils.html import escape
 from django.urls import reverse, reverse_lazy
-from docx import Document
-from docx.shared import Inches, Pt, Cm
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-import io
 import json
-import markdown
+import time
 import os
 
-from .models import Student, Supervisor, DiplomaProject, Group, GroupOrder
+from .models import Student, Group, GroupOrder
 from .models import OrderTemplate, TemplateSection, GeneratedDocument, DocumentCollaborator, DocumentHistory
+from .models import RenderJob
 from .forms import StudentSearchForm, OrderGenerationForm, GroupOrderForm
 from .forms import OrderTemplateForm, TemplateSectionForm, DocumentGeneratorForm, DocumentCollaboratorForm, DocumentEditForm
+from .template_engine import render_template
+from .renderers import CONTENT_TYPES
+from .artifacts import get_document_artifact, invalidate_document_artifacts
+from .file_serving import serve_file
+from .render_jobs import enqueue_document_render, enqueue_group_order_render, enqueue_group_orders_zip
+from .bulk_orders import ZIP_CONTENT_TYPE, select_group_orders
+from .pagination import CURSOR_PARAM, KeysetPaginationMixin
+from .facets import count_facets, filter_by_facets, search_queryset, selected_facets
+from .choices import get_choice_label
+from .dashboard import get_dashboard
+from .autocomplete import (
+    INDEXES as AUTOCOMPLETE_INDEXES, DEFAULT_LIMIT as AUTOCOMPLETE_LIMIT, autocomplete, is_index_ready,
+)
 
 class HomeView(TemplateView):
     """Главная страница"""
@@ -30,50 +36,41 @@ class HomeView(TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['total_students'] = Student.objects.count()
-        context['total_supervisors'] = Supervisor.objects.count()
-        context['total_groups'] = Group.objects.count()
-        context['recent_students'] = Student.objects.all().order_by('-id')[:5]
-        context['groups'] = Group.objects.all().order_by('course', 'name')
+        # Итоги, последние студенты и группы - одним снимком из кэша
+        started = time.perf_counter()
+        dashboard, self.dashboard_cached = get_dashboard()
+        self.dashboard_time = time.perf_counter() - started
+        context.update(dashboard)
         return context
+    
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        # Попадание в кэш снимка видно в заголовке, например: dashboard;desc="hit";dur=0.08
+        response['Server-Timing'] = 'dashboard;desc="{}";dur={:.2f}'.format(
+            'hit' if self.dashboard_cached else 'miss', self.dashboard_time * 1000
+        )
+        return response
 
-class StudentListView(ListView):
+class StudentListView(KeysetPaginationMixin, ListView):
     """Список студентов с фильтрацией"""
     model = Student
     template_name = 'diploma_orders/student_list.html'
     context_object_name = 'students'
     paginate_by = 20
+    keyset_ordering = ('last_name', 'first_name', 'id')
+    facet_titles = (('group', 'Группа'), ('supervisor', 'Руководитель'), ('status', 'Статус ВКР'))
+    
+    def get_keyset_ordering(self):
+        # Результаты поиска упорядочены по релевантности - листаются по смещению
+        if self.request.GET.get('query'):
+            return None
+        return self.keyset_ordering
     
     def get_queryset(self):
-        queryset = Student.objects.all()
-        
-        # Поиск по ФИО или номеру студбилета
-        query = self.request.GET.get('query')
-        if query:
-            queryset = queryset.filter(
-                Q(last_name__icontains=query) |
-                Q(first_name__icontains=query) |
-                Q(patronymic__icontains=query) |
-                Q(student_id__icontains=query) |
-                Q(email__icontains=query)
-            )
-        
-        # Фильтрация по руководителю
-        supervisor_id = self.request.GET.get('supervisor')
-        if supervisor_id:
-            queryset = queryset.filter(
-                diploma_project__supervisor_id=supervisor_id
-            )
-        
-        # Фильтрация по группе
-        group_id = self.request.GET.get('group')
-        if group_id:
-            queryset = queryset.filter(group_id=group_id)
-        
-        # Фильтрация по статусу
-        status = self.request.GET.get('status')
-        if status:
-            queryset = queryset.filter(diploma_project__status=status)
+        # Поиск по ФИО или номеру студбилета, затем фильтры по группе,
+        # руководителю и статусу (те же, что у фасетов)
+        params = self.request.GET
+        queryset = filter_by_facets(search_queryset(params), selected_facets(params))
         
         return queryset.select_related(
             'diploma_project', 
@@ -102,8 +99,23 @@ class StudentListView(ListView):
         }
         
         context['search_form'] = StudentSearchForm(initial=initial_data)
-        context['supervisors'] = Supervisor.objects.all()
-        context['groups'] = Group.objects.all()
+        # Поля фильтров подсказывают варианты через api_autocomplete;
+        # подписи выбранных значений - из кэша списков выбора
+        supervisor_id = self.request.GET.get('supervisor')
+        group_id = self.request.GET.get('group')
+        if supervisor_id:
+            context['selected_supervisor'] = get_choice_label('supervisor', supervisor_id)
+        if group_id:
+            context['selected_group'] = get_choice_label('group', group_id)
+        
+        # Счетчики по группам, руководителям и статусам - одним запросом
+        context['facets_total'], context['facets'] = count_facets(self.request.GET)
+        for name, items in context['facets'].items():
+            for item in items:
+                item['query'] = facet_toggle_query(self.request.GET, name, item)
+        context['facet_columns'] = [
+            (title, context['facets'][name]) for name, title in self.facet_titles
+        ]
         return context
 
 class StudentDetailView(DetailView):
@@ -119,28 +131,10 @@ class StudentDetailView(DetailView):
         return context
 
 class GroupListView(ListView):
-    """Список групп"""
+    """Список групп (количество студентов и дипломов - из счетчиков группы)"""
     model = Group
     template_name = 'diploma_orders/group_list.html'
     context_object_name = 'groups'
-    
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        # Добавляем количество студентов в каждой группе
-        groups = context['groups']
-        for group in groups:
-            students = group.students.all()
-            group.student_count = students.count()
-            group.with_diploma = students.filter(diploma_project__isnull=False).count()
-            group.without_diploma = students.filter(diploma_project__isnull=True).count()
-            
-            # Вычисляем процент
-            if group.student_count > 0:
-                group.diploma_percentage = int((group.with_diploma / group.student_count) * 100)
-            else:
-                group.diploma_percentage = 0
-                
-        return context
 
 class GroupDetailView(DetailView):
     """Детальная страница группы"""
@@ -150,18 +144,10 @@ class GroupDetailView(DetailView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        students = self.object.students.all().select_related('diploma_project', 'diploma_project__supervisor')
-        context['students'] = students
-        context['with_diploma'] = students.filter(diploma_project__isnull=False).count()
-        context['without_diploma'] = students.filter(diploma_project__isnull=True).count()
-        
-        # Вычисляем процент для прогресс бара
-        student_count = students.count()
-        if student_count > 0:
-            context['diploma_percentage'] = int((context['with_diploma'] / student_count) * 100)
-        else:
-            context['diploma_percentage'] = 0
-            
+        context['students'] = self.object.students.all().select_related('diploma_project', 'diploma_project__supervisor')
+        context['with_diploma'] = self.object.students_with_diploma_count
+        context['without_diploma'] = self.object.students_without_diploma_count
+        context['diploma_percentage'] = self.object.diploma_percentage
         return context
 
 def generate_order(request, student_id):
@@ -327,14 +313,14 @@ ___________________ /                    /
         'order_form': OrderGenerationForm(),
         'today': datetime.now().date(),
     })
-    from .models import GroupOrder
 
-class GroupOrderListView(ListView):
+class GroupOrderListView(KeysetPaginationMixin, ListView):
     """Список приказов по группам"""
     model = GroupOrder
     template_name = 'diploma_orders/group_order_list.html'
     context_object_name = 'orders'
     paginate_by = 20
+    keyset_ordering = ('-order_date', '-id')
     
     def get_queryset(self):
         return GroupOrder.objects.all().select_related('group').order_by('-order_date')
@@ -381,278 +367,26 @@ def group_order_detail(request, order_id):
         'students': students,
     })
 
+@login_required
 def generate_group_order_docx(request, order_id):
-    """Генерация приказа по группе в формате DOCX"""
-    from docx import Document
-    from docx.shared import Pt, Inches, Cm
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    from docx.enum.table import WD_TABLE_ALIGNMENT
-    from docx.oxml.ns import qn
-    from docx.oxml import OxmlElement
-    import io
-    from datetime import datetime
-    
+    """Генерация приказа по группе в формате DOCX (через очередь)"""
     order = get_object_or_404(GroupOrder, id=order_id)
-    students = order.group.students.all().select_related('diploma_project', 'diploma_project__supervisor')
-    
-    # Создаем документ
-    document = Document()
-    
-    # Настройка страницы
-    section = document.sections[0]
-    section.page_height = Cm(29.7)
-    section.page_width = Cm(21.0)
-    section.left_margin = Cm(2.5)
-    section.right_margin = Cm(1.5)
-    section.top_margin = Cm(2.0)
-    section.bottom_margin = Cm(2.0)
-    section.header_distance = Cm(1.25)
-    section.footer_distance = Cm(1.25)
-    
-    # Шрифт Times New Roman
-    style = document.styles['Normal']
-    font = style.font
-    font.name = 'Times New Roman'
-    font.size = Pt(14)
-    
-    # 1. Заголовок - Министерство науки и высшего образования РФ
-    p = document.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.add_run('Министерство науки и высшего образования Российской Федерации')
-    run.bold = True
-    run.font.size = Pt(14)
-    
-    # Интервал 1 см
-    document.add_paragraph().paragraph_format.space_after = Pt(28)
-    
-    # 2. Учреждение
-    p = document.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.add_run('Федеральное государственное бюджетное образовательное учреждение\nвысшего образования')
-    run.bold = True
-    run.font.size = Pt(14)
-    
-    # Интервал 0.5 см
-    document.add_paragraph().paragraph_format.space_after = Pt(14)
-    
-    p = document.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.add_run('«Государственный университет управления»')
-    run.bold = True
-    run.font.size = Pt(16)
-    
-    # Интервал 1 см
-    document.add_paragraph().paragraph_format.space_after = Pt(28)
-    
-    # 3. ПРИКАЗ
-    p = document.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.add_run('ПРИКАЗ')
-    run.bold = True
-    run.font.size = Pt(16)
-    
-    # Интервал 1 см
-    document.add_paragraph().paragraph_format.space_after = Pt(28)
-    
-    # 4. Дата, город и номер приказа
-    from django.utils.formats import date_format
-    order_date_str = date_format(order.order_date, format='«d» E Y г.')
-    
-    table = document.add_table(rows=1, cols=3)
-    table.alignment = WD_TABLE_ALIGNMENT.LEFT
-    
-    # Настройка ширины колонок
-    widths = [Inches(2), Inches(3), Inches(2)]
-    for i, width in enumerate(widths):
-        table.columns[i].width = width
-    
-    row = table.rows[0]
-    row.cells[0].text = order_date_str
-    row.cells[1].text = 'г. Москва'
-    row.cells[2].text = f'№ {order.order_number}'
-    
-    # Выравнивание
-    row.cells[0].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.LEFT
-    row.cells[1].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-    row.cells[2].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    
-    # Интервал 1 см
-    document.add_paragraph().paragraph_format.space_after = Pt(28)
-    
-    # 5. Заголовок приказа
-    p = document.add_paragraph()
-    run = p.add_run('ОБ утверждении тем выпускных\nквалификационных работ и назначении руководителей')
-    run.bold = True
-    run.font.size = Pt(14)
-    
-    # Интервал 1 см
-    document.add_paragraph().paragraph_format.space_after = Pt(28)
-    
-    # 6. ПРИКАЗЫВАЮ:
-    p = document.add_paragraph()
-    run = p.add_run('ПРИКАЗЫВАЮ:')
-    run.bold = True
-    run.font.size = Pt(14)
-    
-    # Интервал 1 см
-    document.add_paragraph().paragraph_format.space_after = Pt(28)
-    
-    # 7. Текст приказа
-    p = document.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-    run = p.add_run(f'1. Утвердить темы выпускных квалификационных работ и назначить научных руководителей для студентов группы {order.group.name} ({order.get_study_form_display()} форма обучения) направления подготовки {order.direction}:')
-    run.font.size = Pt(14)
-    
-    # 8. Таблица с данными
-    table = document.add_table(rows=1, cols=3)
-    table.style = 'Table Grid'
-    
-    # Заголовки таблицы
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = '№ п/п'
-    hdr_cells[1].text = 'ФИО студента, тема ВКР'
-    hdr_cells[2].text = 'Научный руководитель'
-    
-    # Настройка ширины колонок
-    table.columns[0].width = Cm(2)
-    table.columns[1].width = Cm(10)
-    table.columns[2].width = Cm(6)
-    
-    # Добавляем студентов
-    for i, student in enumerate(students, 1):
-        row_cells = table.add_row().cells
-        row_cells[0].text = str(i)
-        
-        if student.diploma_project:
-            student_info = f'{student.get_full_name()}\nТема: {student.diploma_project.topic}'
-            supervisor_info = f'{student.diploma_project.supervisor.get_full_name()},\n{student.diploma_project.supervisor.academic_degree},\n{student.diploma_project.supervisor.position}'
-        else:
-            student_info = f'{student.get_full_name()}\nТема: не назначена'
-            supervisor_info = 'не назначен'
-        
-        row_cells[1].text = student_info
-        row_cells[2].text = supervisor_info
-    
-    # Интервал 1 см
-    document.add_paragraph().paragraph_format.space_after = Pt(28)
-    
-    # 9. Пункт 2 приказа
-    p = document.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-    run = p.add_run('2. Контроль за исполнением настоящего приказа возложить на и.о. заведующего кафедрой информационных систем Д.В. Стефановского.')
-    run.font.size = Pt(14)
-    
-    # Интервал 2 см для подписей
-    document.add_paragraph().paragraph_format.space_after = Pt(56)
-    
-    # 10. Подписи
-    # Левая колонка
-    table = document.add_table(rows=6, cols=2)
-    table.alignment = WD_TABLE_ALIGNMENT.LEFT
-    
-    # Настройка ширины колонок
-    table.columns[0].width = Cm(9)
-    table.columns[1].width = Cm(9)
-    
-    # Убираем границы у таблицы
-    tbl = table._tbl
-    tblPr = tbl.tblPr
-    tblBorders = OxmlElement('w:tblBorders')
-    
-    for border_name in ['top', 'left', 'bottom', 'right', 'insideH', 'insideV']:
-        border = OxmlElement(f'w:{border_name}')
-        border.set(qn('w:val'), 'nil')
-        tblBorders.append(border)
-    
-    tblPr.append(tblBorders)
-    
-    # Заполняем таблицу
-    rows = table.rows
-    
-    # Строка 1: Проректор слева
-    rows[0].cells[0].text = 'Проректор'
-    rows[0].cells[1].text = ''
-    
-    # Строка 2: Подпись слева
-    rows[1].cells[0].text = '___________________ Д.Ю. Брюханов'
-    rows[1].cells[1].text = ''
-    
-    # Пустая строка
-    rows[2].cells[0].text = ''
-    rows[2].cells[1].text = ''
-    
-    # Строка 3: Проект приказа вносит
-    rows[3].cells[0].text = 'Проект приказа вносит:'
-    rows[3].cells[1].text = 'Согласовано:'
-    
-    # Строка 4: Должности
-    rows[4].cells[0].text = 'И.о. заведующего кафедрой\nинформационных систем'
-    rows[4].cells[1].text = 'И.о. директора Института\nинформационных систем'
-    
-    # Строка 5: Подписи
-    rows[5].cells[0].text = '___________________ Д.В. Стефановский'
-    rows[5].cells[1].text = '___________________ О.М. Писарева'
-    
-    # Добавляем еще подписи справа
-    document.add_paragraph().paragraph_format.space_after = Pt(28)
-    
-    table2 = document.add_table(rows=3, cols=1)
-    table2.alignment = WD_TABLE_ALIGNMENT.RIGHT
-    table2.columns[0].width = Cm(9)
-    
-    # Убираем границы
-    tbl2 = table2._tbl
-    tblPr2 = tbl2.tblPr
-    tblBorders2 = OxmlElement('w:tblBorders')
-    
-    for border_name in ['top', 'left', 'bottom', 'right', 'insideH', 'insideV']:
-        border = OxmlElement(f'w:{border_name}')
-        border.set(qn('w:val'), 'nil')
-        tblBorders2.append(border)
-    
-    tblPr2.append(tblBorders2)
-    
-    rows2 = table2.rows
-    rows2[0].cells[0].text = 'Заместитель директора\nПравового департамента'
-    rows2[1].cells[0].text = '___________________ В.В. Андросенко'
-    rows2[2].cells[0].text = ''
-    
-    document.add_paragraph().paragraph_format.space_after = Pt(28)
-    
-    table3 = document.add_table(rows=3, cols=1)
-    table3.alignment = WD_TABLE_ALIGNMENT.RIGHT
-    table3.columns[0].width = Cm(9)
-    
-    # Убираем границы
-    tbl3 = table3._tbl
-    tblPr3 = tbl3.tblPr
-    tblBorders3 = OxmlElement('w:tblBorders')
-    
-    for border_name in ['top', 'left', 'bottom', 'right', 'insideH', 'insideV']:
-        border = OxmlElement(f'w:{border_name}')
-        border.set(qn('w:val'), 'nil')
-        tblBorders3.append(border)
-    
-    tblPr3.append(tblBorders3)
-    
-    rows3 = table3.rows
-    rows3[0].cells[0].text = 'Директор Департамента академической политики\nи реализации образовательных программ'
-    rows3[1].cells[0].text = '___________________ Н.А. Стракова'
-    rows3[2].cells[0].text = ''
-    
-    # Сохраняем документ
-    file_stream = io.BytesIO()
-    document.save(file_stream)
-    file_stream.seek(0)
+    job = enqueue_group_order_render(order, request.user)
+    return render_job_accepted(request, job)
+
+@login_required
+def bulk_group_orders_download(request):
+    """Приказы всех групп (с фильтром по курсу/факультету) одним ZIP-архивом (через очередь)"""
+    course = request.GET.get('course', '')
+    course = int(course) if course.isdigit() else None
+    faculty = request.GET.get('faculty', '') or None
     
-    # Отправляем файл
-    response = HttpResponse(
-        file_stream.read(),
-        content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-    )
-    response['Content-Disposition'] = f'attachment; filename="приказ_группа_{order.group.name}_{order.order_number}.docx"'
+    if not select_group_orders(course=course, faculty=faculty):
+        messages.warning(request, 'Нет приказов, подходящих под фильтр')
+        return redirect('diploma_orders:group_order_list')
     
-    return response
+    job = enqueue_group_orders_zip(course, faculty, request.user)
+    return render_job_accepted(request, job)
 
 def generate_group_order_preview(request, order_id):
     """Предпросмотр приказа по группе"""
@@ -763,10 +497,7 @@ def generate_document(request, object_type, object_id):
         })
         
         # Генерируем контент
-        content = template.content
-        for key, value in data.items():
-            placeholder = f'{{{{{key}}}}}'
-            content = content.replace(placeholder, str(value))
+        content = render_template(template, data)
         
         # Создаем документ
         doc_number = f"DOC-{object_type.upper()}-{object_id}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
@@ -827,6 +558,10 @@ def document_edit(request, document_id):
         if form.is_valid():
             form.save()
             
+            # Готовые файлы больше не соответствуют содержимому
+            if 'content' in form.changed_data:
+                invalidate_document_artifacts(document)
+            
             # Сохраняем историю изменений
             DocumentHistory.objects.create(
                 document=document,
@@ -886,142 +621,91 @@ def remove_collaborator(request, document_id, collaborator_id):
     return redirect('diploma_orders:document_edit', document_id=document.id)
 
 
+@login_required
 def export_document(request, document_id, format_type):
     """Экспорт документа в разных форматах"""
     document = get_object_or_404(GeneratedDocument, id=document_id)
     
-    if format_type == 'html':
-        # Генерация HTML
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>{document.document_number}</title>
-            <style>
-                body {{ font-family: 'Times New Roman', serif; font-size: 14pt; }}
-                .header {{ text-align: center; margin-bottom: 40px; }}
-                .content {{ line-height: 1.6; }}
-                .signatures {{ margin-top: 100px; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>Документ № {document.document_number}</h1>
-                <p>от {document.document_date.strftime('%d.%m.%Y')}</p>
-            </div>
-            <div class="content">
-                {document.content}
-            </div>
-        </body>
-        </html>
-        """
-        
-        response = HttpResponse(html_content, content_type='text/html')
-        response['Content-Disposition'] = f'attachment; filename="{document.document_number}.html"'
-        return response
+    if format_type not in CONTENT_TYPES:
+        raise Http404
     
-    elif format_type == 'docx':
-        # Генерация DOCX из шаблона
-        if document.template and document.template.docx_template:
-            # Используем существующий шаблон DOCX
-            from docx import Document as DocxDocument
-            import io
-            
-            doc = DocxDocument(document.template.docx_template.path)
-            
-            # Заменяем плейсхолдеры
-            for paragraph in doc.paragraphs:
-                for key, value in document.document_data.items():
-                    placeholder = f'{{{key}}}'
-                    if placeholder in paragraph.text:
-                        paragraph.text = paragraph.text.replace(placeholder, str(value))
-            
-            # Сохраняем в поток
-            file_stream = io.BytesIO()
-            doc.save(file_stream)
-            file_stream.seek(0)
-            
-            response = HttpResponse(
-                file_stream.read(),
-                content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            )
-            response['Content-Disposition'] = f'attachment; filename="{document.document_number}.docx"'
-            return response
-        else:
-            # Генерируем простой DOCX
-            from docx import Document as DocxDocument
-            from docx.shared import Pt, Inches
-            import io
-            
-            doc = DocxDocument()
-            
-            # Заголовок
-            title = doc.add_heading(f'Документ № {document.document_number}', 0)
-            
-            # Дата
-            doc.add_paragraph(f'от {document.document_date.strftime("%d.%m.%Y")}')
-            
-            # Содержимое
-            for line in document.content.split('\n'):
-                if line.strip():
-                    doc.add_paragraph(line)
-            
-            # Сохраняем
-            file_stream = io.BytesIO()
-            doc.save(file_stream)
-            file_stream.seek(0)
-            
-            response = HttpResponse(
-                file_stream.read(),
-                content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            )
-            response['Content-Disposition'] = f'attachment; filename="{document.document_number}.docx"'
-            return response
+    # Готовый файл отдаем сразу, иначе ставим генерацию в очередь
+    artifact = get_document_artifact(document, format_type)
+    if artifact:
+        # Имя файла - хэш исходных данных рендера, он же ETag
+        return serve_file(
+            request, artifact,
+            filename=f'{document.document_number}.{format_type}',
+            content_type=CONTENT_TYPES[format_type],
+            etag=os.path.splitext(os.path.basename(artifact.name))[0],
+        )
     
-    elif format_type == 'pdf':
-        # Генерация PDF (требует библиотеки reportlab или weasyprint)
-        try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.pdfgen import canvas
-            import io
-            
-            buffer = io.BytesIO()
-            p = canvas.Canvas(buffer, pagesize=A4)
-            width, height = A4
-            
-            # Заголовок
-            p.setFont("Helvetica-Bold", 16)
-            p.drawString(50, height - 50, f"Документ № {document.document_number}")
-            
-            p.setFont("Helvetica", 12)
-            p.drawString(50, height - 80, f"от {document.document_date.strftime('%d.%m.%Y')}")
-            
-            # Содержимое
-            p.setFont("Helvetica", 10)
-            y = height - 120
-            for line in document.content.split('\n'):
-                if y < 50:  # Новая страница
-                    p.showPage()
-                    y = height - 50
-                    p.setFont("Helvetica", 10)
-                
-                p.drawString(50, y, line[:100])  # Ограничиваем длину строки
-                y -= 15
-            
-            p.save()
-            buffer.seek(0)
-            
-            response = HttpResponse(buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{document.document_number}.pdf"'
-            return response
-            
-        except ImportError:
-            messages.error(request, 'Для генерации PDF установите reportlab')
-            return redirect('diploma_orders:document_edit', document_id=document_id)
+    job = enqueue_document_render(document, format_type, request.user)
+    return render_job_accepted(request, job)
+
+
+def render_job_accepted(request, job):
+    """Ответ на постановку задания: JSON для AJAX, страница ожидания для браузера"""
+    poll_url = reverse('diploma_orders:render_job_status', args=[job.id])
     
-    else:
-        raise Http404
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({
+            'job_id': job.id,
+            'status': job.status,
+            'poll_url': poll_url,
+        }, status=202)
+    
+    return render(request, 'diploma_orders/render_job_status.html', {
+        'job': job,
+        'poll_url': poll_url,
+        'download_url': reverse('diploma_orders:render_job_download', args=[job.id]),
+    }, status=202)
+
+
+def can_access_render_job(user, job):
+    """Задание видят его автор и сотрудники"""
+    return user.is_staff or job.created_by_id == user.id
+
+
+@login_required
+def render_job_status(request, job_id):
+    """API статуса задания генерации"""
+    job = get_object_or_404(RenderJob, id=job_id)
+    if not can_access_render_job(request.user, job):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    
+    data = {
+        'job_id': job.id,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'download_url': None,
+        'error': job.error,
+    }
+    if job.status == 'completed':
+        data['download_url'] = reverse('diploma_orders:render_job_download', args=[job.id])
+    
+    return JsonResponse(data)
+
+
+@login_required
+def render_job_download(request, job_id):
+    """Скачивание результата задания генерации"""
+    job = get_object_or_404(
+        RenderJob.objects.select_related('document', 'group_order__group'),
+        id=job_id
+    )
+    if not can_access_render_job(request.user, job):
+        return HttpResponseForbidden('Нет доступа к заданию')
+    
+    result_file = job.get_result_file()
+    if job.status != 'completed' or not result_file:
+        raise Http404('Файл еще не готов')
+    
+    return serve_file(
+        request, result_file,
+        filename=job.get_download_filename(),
+        content_type=CONTENT_TYPES.get(job.format_type, ZIP_CONTENT_TYPE)
+    )
 
 
 def document_history(request, document_id):
@@ -1035,12 +719,13 @@ def document_history(request, document_id):
     })
 
 
-class DocumentListView(ListView):
+class DocumentListView(KeysetPaginationMixin, ListView):
     """Список всех документов"""
     model = GeneratedDocument
     template_name = 'diploma_orders/document_list.html'
     context_object_name = 'documents'
     paginate_by = 20
+    keyset_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
         queryset = GeneratedDocument.objects.all()
@@ -1108,6 +793,41 @@ def api_section_detail(request, section_id):
         return JsonResponse({'success': False, 'error': 'Нельзя удалить этот раздел'})
 
 
+def api_autocomplete(request, kind):
+    """Подсказки студентов, руководителей или групп по началу строки (формат Select2)"""
+    if kind not in AUTOCOMPLETE_INDEXES:
+        raise Http404('Неизвестный тип подсказок')
+    try:
+        limit = int(request.GET.get('limit', AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+
+    results = autocomplete(kind, request.GET.get('q', ''), limit)
+    return JsonResponse({
+        'results': [{'id': pk, 'text': label} for pk, label in results],
+        # False - индекс еще строится, запрос стоит повторить
+        'ready': is_index_ready(kind),
+    })
+
+
+def facet_toggle_query(params, name, item):
+    """Строка запроса, выбирающая значение фасета (или снимающая выбор)"""
+    params = params.copy()
+    params.pop(CURSOR_PARAM, None)
+    params.pop('page', None)
+    if item['selected'] or not item['value']:
+        params.pop(name, None)
+    else:
+        params[name] = item['value']
+    return params.urlencode()
+
+
+def api_student_facets(request):
+    """Счетчики фасетов списка студентов для текущих параметров поиска"""
+    total, facets = count_facets(request.GET)
+    return JsonResponse({'total': total, 'facets': facets})
+
+
 def api_section_edit_form(request, section_id):
     """Форма редактирования раздела (HTML)"""
     section = get_object_or_404(TemplateSection, id=section_id)
@@ -1224,15 +944,13 @@ def api_template_preview(request, template_id):
         data['generated_date'] = datetime.now().strftime('%d %B %Y г.')
         
         # Генерируем предпросмотр
-        content = template.content
-        for key, value in data.items():
-            placeholder = f'{{{{{key}}}}}'
-            content = content.replace(placeholder, str(value))
+        content = render_template(template, data)
         
         # Форматируем для отображения
+        content_html = escape(content).replace('\n', '<br>')
         preview_html = f"""
         <div style="font-family: 'Times New Roman', serif; font-size: 14pt; line-height: 1.5;">
-            {content.replace('\n', '<br>')}
+            {content_html}
         </div>
         """
         
@@ -4,17 +4,15 @@ from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST, require_GET
 from django.contrib.auth.decorators import login_required
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 from django.conf import settings
 import json
 import tempfile
-import uuid
-from datetime import datetime
 
 from .models import DiplomaProject, DiplomaAIAnalysis, PageAIInteraction, AIQuestionBank
 from .forms import DiplomaUploadForm, AIAnalysisForm, AIQuestionForm
 from .ai_services import DiplomaAnalyzer, AIChatAssistant
+from .analysis_jobs import enqueue_analysis
+from .views_upload import analysis_job_accepted, idempotency_key
 
 
 @login_required
@@ -25,65 +23,13 @@ def upload_diploma_for_analysis(request, diploma_id):
     if request.method == 'POST':
         form = DiplomaUploadForm(request.POST, request.FILES)
         if form.is_valid():
-            file = request.FILES['file']
-            
-            # Сохраняем файл
-            file_name = f"diploma_{diploma_id}_{uuid.uuid4()}{os.path.splitext(file.name)[1]}"
-            file_path = default_storage.save(f'ai_analysis/{file_name}', ContentFile(file.read()))
-            
-            # Создаем запись анализа
-            analysis = DiplomaAIAnalysis.objects.create(
-                diploma_project=diploma,
-                status='processing',
-                ai_provider=request.POST.get('ai_provider', 'openai')
+            # Файл сохраняется в хранилище с адресацией по содержимому (повторная
+            # загрузка того же файла не создает копию), анализ выполняет ai_worker
+            job = enqueue_analysis(
+                diploma, 'full', request.POST.get('ai_provider', 'openai'), request.user,
+                diploma_file=request.FILES['file'], idempotency_key=idempotency_key(request),
             )
-            
-            # Запускаем анализ в фоне (можно через Celery)
-            # Здесь для простоты делаем синхронно
-            try:
-                analyzer = DiplomaAnalyzer(provider=analysis.ai_provider)
-                
-                diploma_data = {
-                    'topic': diploma.topic,
-                    'student_name': diploma.student.get_full_name(),
-                    'supervisor_name': diploma.supervisor.get_full_name() if diploma.supervisor else 'Не указан'
-                }
-                
-                full_path = os.path.join(settings.MEDIA_ROOT, file_path)
-                result = analyzer.analyze_diploma(full_path, diploma_data)
-                
-                # Сохраняем результаты
-                analysis.format_score = result['format_check']['score']
-                analysis.format_issues = result['format_check']['issues']
-                analysis.format_metadata = result['format_check']['metadata']
-                
-                analysis.review_text = result['review']['text']
-                analysis.review_grade = result['review']['grade']
-                analysis.review_generated_at = datetime.fromisoformat(result['review']['generated_at'])
-                
-                analysis.questions = result['questions']
-                analysis.content_analysis = result['content_analysis']
-                analysis.file_metadata = result['metadata']
-                analysis.raw_response = result
-                
-                analysis.status = 'completed'
-                analysis.save()
-                
-                return JsonResponse({
-                    'success': True,
-                    'message': 'Анализ завершен',
-                    'analysis_id': analysis.id
-                })
-                
-            except Exception as e:
-                analysis.status = 'failed'
-                analysis.raw_response = {'error': str(e)}
-                analysis.save()
-                
-                return JsonResponse({
-                    'success': False,
-                    'error': str(e)
-                }, status=500)
+            return analysis_job_accepted(job, diploma, 'full')
     
     return JsonResponse({'success': False, 'error': 'Invalid request'})
 
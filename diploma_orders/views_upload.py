@@ -1,19 +1,22 @@
 # diploma_orders/views_upload.py - новый файл
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from django.conf import settings
-import os
 import uuid
 import json
-from datetime import datetime
 
-from .models import DiplomaProject, DiplomaAIAnalysis
+from .models import AnalysisJob, DiplomaProject, DiplomaAIAnalysis, UploadSession
 from .forms import DiplomaUploadForm, AIAnalysisRequestForm
-from .ai_services import DiplomaAnalyzer
+from .analysis_jobs import ANALYSIS_TYPES, enqueue_analysis, job_matches
+from .file_serving import serve_file
+from .chunked_upload import (
+    CHUNK_SIZE, OFFSET_HEADER, UploadError, discard_upload, finish_upload, max_upload_size, start_upload,
+    write_chunk,
+)
 
 
 @login_required
@@ -38,7 +41,8 @@ def upload_diploma_file(request, diploma_id):
                     'success': True,
                     'message': 'Файл загружен',
                     'file_url': diploma.file.url if diploma.file else '',
-                    'file_name': os.path.basename(diploma.file.name) if diploma.file else ''
+                    'file_name': diploma.get_file_name(),
+                    'file_sha256': diploma.file_sha256,
                 })
             
             return redirect('diploma_orders:diploma_analysis', diploma_id=diploma.id)
@@ -49,12 +53,112 @@ def upload_diploma_file(request, diploma_id):
     context = {
         'diploma': diploma,
         'form': form,
-        'title': f'Загрузка диплома - {diploma.topic[:50]}...'
+        'title': f'Загрузка диплома - {diploma.topic[:50]}...',
+        'max_upload_size': max_upload_size(),
     }
     
     return render(request, 'diploma_orders/upload_diploma.html', context)
 
 
+def _upload_error(error):
+    response = JsonResponse({'success': False, 'error': str(error), 'offset': error.offset}, status=error.status)
+    if error.offset is not None:
+        response[OFFSET_HEADER] = str(error.offset)
+    return response
+
+
+def _get_upload_session(request, upload_id):
+    """Загрузка текущего пользователя (или любая - для администратора)"""
+    session = get_object_or_404(UploadSession, pk=upload_id)
+    if not (request.user.is_staff or session.user_id == request.user.id):
+        raise Http404('Загрузка не найдена')
+    return session
+
+
+@login_required
+def chunked_upload_init(request, diploma_id):
+    """Начало загрузки по частям: {filename, size, sha256?} -> id загрузки"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=405)
+    
+    diploma = get_object_or_404(DiplomaProject.objects.select_related('student'), id=diploma_id)
+    if not (request.user.is_staff or request.user == diploma.student.user):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    
+    try:
+        data = json.loads(request.body or b'{}')
+        size = int(data.get('size', 0))
+    except (ValueError, TypeError):
+        return JsonResponse({'success': False, 'error': 'Неверный запрос'}, status=400)
+    
+    try:
+        session = start_upload(diploma, request.user, data.get('filename', ''), size, data.get('sha256', ''))
+    except UploadError as error:
+        return _upload_error(error)
+    
+    return JsonResponse({
+        'success': True,
+        'upload_id': str(session.pk),
+        'offset': 0,
+        'size': session.size,
+        'chunk_size': CHUNK_SIZE,
+        'upload_url': reverse('diploma_orders:chunked_upload', args=[session.pk]),
+        'finalize_url': reverse('diploma_orders:chunked_upload_finalize', args=[session.pk]),
+    }, status=201)
+
+
+@login_required
+def chunked_upload(request, upload_id):
+    """GET - сколько байт уже получено, PUT - очередная часть, DELETE - отмена"""
+    session = _get_upload_session(request, upload_id)
+    
+    if request.method == 'PUT':
+        try:
+            offset = int(request.headers.get(OFFSET_HEADER, ''))
+        except ValueError:
+            return JsonResponse({'success': False, 'error': f'Нужен заголовок {OFFSET_HEADER}'}, status=400)
+        content_length = request.META.get('CONTENT_LENGTH')
+        try:
+            write_chunk(session, offset, request, int(content_length) if content_length else None)
+        except UploadError as error:
+            return _upload_error(error)
+    elif request.method == 'DELETE':
+        discard_upload(session)
+        return HttpResponse(status=204)
+    elif request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'error': 'Invalid request method'}, status=405)
+    
+    response = JsonResponse({
+        'success': True,
+        'offset': session.offset,
+        'size': session.size,
+        'status': session.status,
+    })
+    response[OFFSET_HEADER] = str(session.offset)
+    return response
+
+
+@login_required
+def chunked_upload_finalize(request, upload_id):
+    """Завершение загрузки: файл прикрепляется к дипломному проекту"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=405)
+    
+    session = _get_upload_session(request, upload_id)
+    try:
+        sha256 = finish_upload(session)
+    except UploadError as error:
+        return _upload_error(error)
+    
+    diploma = DiplomaProject.objects.get(pk=session.diploma_project_id)
+    return JsonResponse({
+        'success': True,
+        'sha256': sha256,
+        'file_name': diploma.get_file_name(),
+        'redirect_url': reverse('diploma_orders:diploma_analysis', args=[diploma.id]),
+    })
+
+
 @login_required
 def diploma_analysis_dashboard(request, diploma_id):
     """Дашборд анализа диплома"""
@@ -108,98 +212,67 @@ def run_ai_analysis(request, diploma_id):
     # Получаем параметры анализа
     analysis_type = request.POST.get('analysis_type', 'full')
     ai_provider = request.POST.get('ai_provider', 'openai')
+    if analysis_type not in ANALYSIS_TYPES:
+        return JsonResponse({'error': 'Неизвестный тип анализа'}, status=400)
     
-    # Создаем или обновляем запись анализа
-    analysis, created = DiplomaAIAnalysis.objects.update_or_create(
-        diploma_project=diploma,
-        defaults={
-            'status': 'processing',
-            'ai_provider': ai_provider,
-            'diploma_file': diploma.file  # Сохраняем ссылку на файл
-        }
+    force_refresh = request.POST.get('force_refresh') in ('1', 'true', 'on')
+    
+    # Анализ выполняет ai_worker, клиент опрашивает статус задания;
+    # сохраненный результат для того же файла возвращается сразу, а
+    # повторный запрос присоединяется к уже выполняемому заданию
+    job = enqueue_analysis(
+        diploma, analysis_type, ai_provider, request.user, force_refresh=force_refresh,
+        idempotency_key=idempotency_key(request),
     )
+    return analysis_job_accepted(job, diploma, analysis_type)
+
+
+def idempotency_key(request):
+    return request.headers.get('Idempotency-Key', '').strip()[:255]
+
+
+def analysis_job_accepted(job, diploma, analysis_type):
+    """Ответ 202 с номером задания анализа и адресом для опроса (200, если результат уже готов)"""
+    if not job_matches(job, diploma, analysis_type):
+        return JsonResponse({'error': 'Idempotency-Key уже использован для другого запроса'}, status=422)
     
-    try:
-        # Запускаем анализ
-        analyzer = DiplomaAnalyzer(provider=ai_provider)
-        
-        diploma_data = {
-            'topic': diploma.topic,
-            'student_name': diploma.student.get_full_name(),
-            'supervisor_name': diploma.supervisor.get_full_name() if diploma.supervisor else 'Не указан'
-        }
-        
-        # Получаем путь к файлу
-        if hasattr(diploma.file, 'path'):
-            file_path = diploma.file.path
-        else:
-            file_path = os.path.join(settings.MEDIA_ROOT, diploma.file.name)
-        
-        # Выполняем анализ в зависимости от типа
-        if analysis_type == 'format':
-            text, metadata = analyzer.extract_text_from_file(file_path)
-            format_check = analyzer.check_format_compliance(text, metadata)
-            
-            analysis.format_score = format_check['score']
-            analysis.format_issues = format_check['issues']
-            analysis.format_metadata = format_check['metadata']
-            analysis.file_metadata = metadata
-            analysis.status = 'completed'
-            
-        elif analysis_type == 'review':
-            text, metadata = analyzer.extract_text_from_file(file_path)
-            review = analyzer.generate_review(text, diploma_data)
-            
-            analysis.review_text = review['text']
-            analysis.review_grade = review['grade']
-            analysis.review_generated_at = datetime.now()
-            analysis.file_metadata = metadata
-            analysis.status = 'completed'
-            
-        elif analysis_type == 'questions':
-            text, metadata = analyzer.extract_text_from_file(file_path)
-            questions = analyzer.generate_page_questions(text)
-            
-            analysis.questions = questions
-            analysis.file_metadata = metadata
-            analysis.status = 'completed'
-            
-        else:  # full analysis
-            result = analyzer.analyze_diploma(file_path, diploma_data)
-            
-            analysis.format_score = result.get('format_check', {}).get('score', 0)
-            analysis.format_issues = result.get('format_check', {}).get('issues', [])
-            analysis.format_metadata = result.get('format_check', {}).get('metadata', {})
-            
-            review = result.get('review', {})
-            analysis.review_text = review.get('text', '')
-            analysis.review_grade = review.get('grade', '')
-            analysis.review_generated_at = datetime.now()
-            
-            analysis.questions = result.get('questions', [])
-            analysis.content_analysis = result.get('content_analysis', {})
-            analysis.file_metadata = result.get('metadata', {})
-            analysis.raw_response = result
-            analysis.status = 'completed'
-        
-        analysis.save()
-        
-        return JsonResponse({
-            'success': True,
-            'message': 'Анализ успешно завершен',
-            'analysis_id': analysis.id,
-            'redirect_url': f'/diploma/{diploma_id}/analysis/'
-        })
-        
-    except Exception as e:
-        analysis.status = 'failed'
-        analysis.raw_response = {'error': str(e)}
-        analysis.save()
-        
-        return JsonResponse({
-            'success': False,
-            'error': f'Ошибка анализа: {str(e)}'
-        }, status=500)
+    status_url = reverse('diploma_orders:analysis_job_status', args=[job.id])
+    completed = job.status == 'completed'
+    response = JsonResponse({
+        'success': True,
+        'message': 'Анализ выполнен' if completed else 'Анализ поставлен в очередь',
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': status_url,
+        'redirect_url': reverse('diploma_orders:diploma_analysis', args=[job.diploma_project_id]),
+    }, status=200 if completed else 202)
+    response['Location'] = status_url
+    return response
+
+
+@login_required
+def analysis_job_status(request, job_id):
+    """API статуса задания ИИ-анализа"""
+    job = get_object_or_404(AnalysisJob.objects.select_related('diploma_project__student'), id=job_id)
+    diploma = job.diploma_project
+    if not (request.user.is_staff or request.user == diploma.student.user):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    
+    # Статус - самого задания, а не общий DiplomaAIAnalysis.status всех типов анализа
+    data = {
+        'job_id': job.id,
+        'analysis_type': job.analysis_type,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'error': job.error,
+        'analysis_id': None,
+    }
+    if job.status == 'completed':
+        # Результаты всех типов анализа пишутся в единственный анализ диплома (OneToOne)
+        data['analysis_id'] = DiplomaAIAnalysis.objects.filter(
+            diploma_project_id=job.diploma_project_id
+        ).values_list('id', flat=True).first()
+    return JsonResponse(data)
 
 
 @login_required
@@ -214,11 +287,11 @@ def delete_diploma_file(request, diploma_id):
     if not (request.user.is_staff or request.user == diploma.student.user):
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
-    # Удаляем файл
+    # Снимаем ссылку на файл; сам файл удаляется из хранилища, когда на него
+    # не остается ссылок (diploma_orders/blobs.py)
     if diploma.file:
-        file_path = diploma.file.path
-        diploma.file.delete(save=False)
         diploma.file = None
+        diploma.file_original_name = ''
         diploma.save()
         
         # Также удаляем связанный анализ
@@ -252,9 +325,11 @@ def download_diploma_file(request, diploma_id):
         messages.error(request, "У вас нет прав для скачивания файла")
         return redirect('diploma_orders:home')
     
-    response = HttpResponse(diploma.file, content_type='application/octet-stream')
-    response['Content-Disposition'] = f'attachment; filename="{os.path.basename(diploma.file.name)}"'
-    return response
+    # Потоковая отдача с докачкой (Range) и условными запросами
+    return serve_file(
+        request, diploma.file, filename=diploma.get_file_name(),
+        content_type='application/octet-stream', etag=diploma.file_sha256,
+    )
 
 
 def public_diploma_view(request, diploma_id, token):
@@ -0,0 +1,32 @@
+# diploma_orders/workers.py
+"""
+Пул процессов для тяжелой генерации документов.
+
+Используется метод запуска spawn: дочерние процессы не наследуют открытые
+соединения с БД родителя и сами инициализируют Django.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+
+
+def default_process_count():
+    """Число процессов по умолчанию (настройка RENDER_PROCESSES или число CPU)"""
+    return getattr(settings, 'RENDER_PROCESSES', None) or os.cpu_count() or 1
+
+
+def init_worker_process():
+    """Инициализация Django в процессе пула"""
+    django.setup()
+
+
+def create_process_pool(processes=None):
+    """Пул процессов с инициализированным Django"""
+    return ProcessPoolExecutor(
+        max_workers=processes or default_process_count(),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker_process,
+    )